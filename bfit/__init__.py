@@ -1,9 +1,3 @@
-import matplotlib
-try:
-    matplotlib.use('TkAgg')
-except ImportError:
-    pass
-
 from .fitting.functions import lorentzian, bilorentzian, gaussian, quadlorentzian
 from .fitting.functions import pulsed_exp, pulsed_strexp, pulsed_biexp
 from .fitting.global_fitter import global_fitter
@@ -17,7 +11,6 @@ import logging, os, sys, argparse, subprocess, requests, json, code
 from logging.handlers import RotatingFileHandler
 from textwrap import dedent
 from pkg_resources import parse_version 
-from tkinter import messagebox
 
 __all__ = ['gui', 'fitting', 'backend', 'test']
 __author__ = 'Derek Fujimoto'
@@ -38,7 +31,16 @@ __all__.extend(("lorentzian",
                 "gen_init_par",
                 ))
 
-from bfit.gui.bfit import bfit
+# =========================================================================== #
+def __getattr__(name):
+    """
+        Import the gui only when needed, such that fitting from the command
+        line does not need tkinter
+    """
+    if name == 'bfit':
+        from bfit.gui.bfit import bfit
+        return bfit
+    raise AttributeError("module 'bfit' has no attribute '%s'" % name)
 
 # RUN BFIT ================================================================== #
 def main():
@@ -72,6 +74,25 @@ def main():
                         action='store_true', 
                         default=False)
 
+    # headless fitting
+    subparsers = parser.add_subparsers(dest='command')
+    parser_fit = subparsers.add_parser('fit', 
+                        help='Fit runs from a yaml job file without the gui',
+                        description=dedent("""\
+        Fit runs from a yaml job file without the gui. Job files use the same 
+        keys as the gui's saved state files."""))
+    parser_fit.add_argument("job", 
+                        help='yaml job file')
+    parser_fit.add_argument("-n", "--n_jobs", 
+                        help='Number of fitting processes (default: job fit_n_jobs)', 
+                        dest='n_jobs', 
+                        type=int,
+                        default=None)
+    parser_fit.add_argument("-o", "--output", 
+                        help='Output .csv, .parquet, or .h5 file (default: <job>_par.csv)', 
+                        dest='output', 
+                        default=None)
+
     # parse
     args = parser.parse_args()
 
@@ -105,6 +126,15 @@ def main():
     logger.setLevel(level)
     logger.propagate = False
     
+    # fit without gui -------------------------------------------------------
+    if args.command == 'fit':
+        fit_job(args.job, args.n_jobs, args.output)
+        return
+
+    # start gui
+    from tkinter import messagebox
+    from bfit.gui.bfit import bfit
+
     # testing
     testfn = None
     # ~ def testfn(self):
@@ -136,7 +166,35 @@ def main():
     if args.commandline:
         code.interact(local=locals())
         print('bfit object set to variable "b"')
-    
 
-    
-        
+# FIT FROM JOB FILE ========================================================= #
+def fit_job(filename, n_jobs=None, output=None):
+    """
+        Fit runs from a yaml job file and write the parameters to csv.
+
+        filename:   path to yaml job file
+        n_jobs:     number of fitting processes. If None use job fit_n_jobs
+        output:     path to output csv file. If None use <job>_par.csv
+    """
+
+    import matplotlib
+    matplotlib.use('Agg')
+    from bfit.fitting.fit_job import read_job, run_job, write_table
+
+    if output is None:
+        output = os.path.splitext(filename)[0] + '_par.csv'
+
+    job = read_job(filename)
+
+    def callback(key, diagnostics):
+        if diagnostics['error'] is not None:
+            print('%s: failed (%s)' % (key, diagnostics['error']))
+        elif diagnostics['fallback'] is not None:
+            print('%s: done (%s)' % (key, diagnostics['fallback']))
+        else:
+            print('%s: done' % key)
+
+    df, gchi = run_job(job, n_jobs=n_jobs, callback=callback)
+    write_table(df, output, job, gchi)
+    print('Global chi-squared: %g' % gchi)
+    print('Parameters written to %s' % output)
@@ -0,0 +1,122 @@
+# Least-recently-used cache of calculated asymmetries
+# Derek Fujimoto
+# Oct 2026
+
+from collections import OrderedDict
+import numpy as np
+import threading
+import copy
+import sys
+
+# =========================================================================== #
+class AsymCache(object):
+    """
+        Cache asymmetry calculations, keyed by run id and calculation inputs.
+        The least recently used entries are dropped once the total size of the
+        cached arrays exceeds max_bytes. The cache may be shared by worker
+        threads; calculations are done outside of the lock.
+
+        cache:          OrderedDict {key: (asym, nbytes)}, most recent last
+        lock:           threading.RLock, guards the cache
+        max_bytes:      int, memory budget in bytes
+        nbytes:         int, total size of cached asymmetries in bytes
+        nhits:          int, number of calls returning a cached asymmetry
+        nmisses:        int, number of calls needing a new calculation
+    """
+
+    # ======================================================================= #
+    def __init__(self, max_bytes=256*1024**2):
+        self.cache = OrderedDict()
+        self.lock = threading.RLock()
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.nhits = 0
+        self.nmisses = 0
+
+    # ======================================================================= #
+    def __contains__(self, key):
+        return key in self.cache
+
+    # ======================================================================= #
+    def __len__(self):
+        return len(self.cache)
+
+    # ======================================================================= #
+    def clear(self):
+        """Remove all entries"""
+        with self.lock:
+            self.cache.clear()
+            self.nbytes = 0
+
+    # ======================================================================= #
+    def get(self, key, calculate):
+        """
+            Get the cached asymmetry, calculating it if needed.
+
+            key:        hashable, first element is the run id
+            calculate:  function handle with no inputs, returns asymmetry
+
+            Returns a copy of the asymmetry so that it may be modified freely
+        """
+
+        # unhashable inputs: don't cache
+        try:
+            hash(key)
+        except TypeError:
+            return calculate()
+
+        # cached value
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.nhits += 1
+                return copy.deepcopy(self.cache[key][0])
+            self.nmisses += 1
+
+        # new value
+        asym = calculate()
+        size = _get_nbytes(asym)
+
+        if size <= self.max_bytes:
+            with self.lock:
+                if key in self.cache:
+                    self.nbytes -= self.cache[key][1]
+                self.cache[key] = (copy.deepcopy(asym), size)
+                self.nbytes += size
+                self.trim()
+
+        return asym
+
+    # ======================================================================= #
+    def get_nbytes(self, run_id):
+        """Get total size in bytes of cached entries for a run"""
+        with self.lock:
+            return sum(v[1] for k, v in self.cache.items() if k[0] == run_id)
+
+    # ======================================================================= #
+    def invalidate(self, run_id):
+        """Remove all entries for a run"""
+        with self.lock:
+            for key in [k for k in self.cache.keys() if k[0] == run_id]:
+                self.nbytes -= self.cache.pop(key)[1]
+
+    # ======================================================================= #
+    def trim(self):
+        """Drop least recently used entries until within the memory budget"""
+        with self.lock:
+            while self.nbytes > self.max_bytes and self.cache:
+                self.nbytes -= self.cache.popitem(last=False)[1][1]
+
+# =========================================================================== #
+def _get_nbytes(obj):
+    """
+        Get approximate size in bytes of an asymmetry output
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, dict):
+        return sum(_get_nbytes(v) for v in obj.values())
+    elif isinstance(obj, (tuple, list)):
+        return sum(_get_nbytes(v) for v in obj)
+    else:
+        return sys.getsizeof(obj)
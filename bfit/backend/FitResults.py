@@ -0,0 +1,230 @@
+# Columnar store of fit results
+# Derek Fujimoto
+# Oct 2026
+
+import numpy as np
+import pandas as pd
+import numbers
+import os
+
+# file extensions for each export format
+file_formats = {'.csv':     'csv',
+                '.parquet': 'parquet',
+                '.pq':      'parquet',
+                '.h5':      'hdf',
+                '.hdf':     'hdf',
+                '.hdf5':    'hdf',
+                }
+
+# =========================================================================== #
+class FitResults(object):
+    """
+        Store fit results of many runs as columns, with one row per run.
+        Rows are appended as each run is fitted, and replaced if the run is
+        refitted.
+
+        Columns for each parameter par are:
+
+            par, Error- par, Error+ par, fixed par, shared par
+
+        as well as Chi-Squared and any metadata columns.
+
+        columns:        dict {name: list of values}
+        index:          dict {run id: row number}
+        ids:            list of run ids, in row order
+        parnames:       dict {run id: list of fitted parameter names}
+    """
+
+    # ======================================================================= #
+    def __init__(self):
+        self.clear()
+
+    # ======================================================================= #
+    def __contains__(self, id):
+        return id in self.index
+
+    # ======================================================================= #
+    def __len__(self):
+        return len(self.index)
+
+    # ======================================================================= #
+    def append(self, id, results, meta=None):
+        """
+            Add or replace the fit results of a run
+
+            id:         run id
+            results:    DataFrame of fit results as from fitter, indexed by
+                        parameter name, with columns res, dres-, dres+, chi,
+                        and optionally fixed, shared
+            meta:       dict of other values to store {column: value}
+        """
+
+        # get row values
+        row = {}
+        for par in results.index:
+            row[par] = float(results.loc[par, 'res'])
+            row['Error- '+par] = float(results.loc[par, 'dres-'])
+            row['Error+ '+par] = float(results.loc[par, 'dres+'])
+
+            for c in ('fixed', 'shared'):
+                if c in results.columns:
+                    row['%s %s' % (c, par)] = bool(results.loc[par, c])
+
+        if len(results.index):
+            row['Chi-Squared'] = float(results['chi'].iloc[0])
+
+        if meta is not None:
+            row.update(meta)
+
+        self.parnames[id] = list(results.index)
+
+        # new row
+        if id not in self.index:
+            self.index[id] = len(self.ids)
+            self.ids.append(id)
+            for c, val in self.columns.items():
+                val.append(self.fill[c])
+
+        # set values, clearing those from previous fits
+        i = self.index[id]
+        for c, val in self.columns.items():
+            val[i] = row.pop(c, self.fill[c])
+
+        # new columns
+        for c, value in row.items():
+            self.fill[c] = _get_fill(value)
+            self.columns[c] = [self.fill[c]]*len(self.ids)
+            self.columns[c][i] = value
+
+    # ======================================================================= #
+    def clear(self):
+        """Remove all results"""
+        self.columns = {}
+        self.fill = {}
+        self.index = {}
+        self.ids = []
+        self.parnames = {}
+
+    # ======================================================================= #
+    def export(self, filename, ids=None, header=None):
+        """
+            Write results to file, see write_frame
+
+            filename:   str, path to file
+            ids:        list of run ids to write, if None write all
+            header:     list of str, lines to write as comments in csv files
+        """
+        write_frame(self.to_frame(ids), filename, header)
+
+    # ======================================================================= #
+    def matches(self, id, fitpar):
+        """
+            Check if the stored results of a run are its current fit results
+
+            id:         run id
+            fitpar:     DataFrame of fit parameters of the run, indexed by
+                        parameter name, with column res
+
+            Returns False if the run has no results or they differ from fitpar
+        """
+
+        if id not in self.index:
+            return False
+
+        i = self.index[id]
+        parnames = self.parnames[id]
+        pars = list(dict.fromkeys(list(parnames) + list(fitpar.index)))
+
+        stored = [self.columns[p][i] if p in parnames else np.nan for p in pars]
+        current = fitpar['res'].reindex(pars).astype(float).values
+
+        return np.array_equal(stored, current, equal_nan=True)
+
+    # ======================================================================= #
+    def remove(self, id):
+        """
+            Remove the results of a run, if present
+
+            id:         run id
+        """
+
+        if id not in self.index:
+            return
+
+        i = self.index.pop(id)
+        del self.ids[i]
+        del self.parnames[id]
+        for val in self.columns.values():
+            del val[i]
+
+        self.index = {k: n for n, k in enumerate(self.ids)}
+
+    # ======================================================================= #
+    def to_frame(self, ids=None):
+        """
+            Get results as a DataFrame indexed by run id.
+
+            ids:    list of run ids to get rows for, in that order. Runs
+                    without results are filled with missing values. If None,
+                    get all runs.
+        """
+
+        df = pd.DataFrame(self.columns, index=pd.Index(self.ids, name='id'))
+
+        if ids is not None:
+            df = df.reindex(ids)
+
+            # keep flags as bool
+            for c in df.columns:
+                if self.fill[c] is False:
+                    df[c] = df[c].where(df[c].notna(), False).astype(bool)
+
+        return df
+
+# =========================================================================== #
+def _get_fill(value):
+    """
+        Get the missing value for a column, based on one of its values
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return False
+    elif isinstance(value, numbers.Number):
+        return np.nan
+    else:
+        return None
+
+# =========================================================================== #
+def write_frame(df, filename, header=None):
+    """
+        Write DataFrame to file, with the format set by the file extension:
+
+            .csv:                   comma-separated text, with header
+            .parquet, .pq:          parquet, needs pyarrow or fastparquet
+            .h5, .hdf, .hdf5:       HDF5 table, needs pytables
+
+        Files with unknown extensions are written as csv.
+
+        df:         DataFrame to write
+        filename:   str, path to file
+        header:     list of str, lines to write as comments in csv files
+    """
+
+    fmt = file_formats.get(os.path.splitext(filename)[1].lower(), 'csv')
+
+    # text
+    if fmt == 'csv':
+        with open(filename, 'w') as fid:
+            if header:
+                fid.write('\n'.join(header))
+        df.to_csv(filename, mode='a+')
+        return
+
+    # binary
+    try:
+        if fmt == 'parquet':
+            df.to_parquet(filename)
+        elif fmt == 'hdf':
+            df.to_hdf(filename, key='fit_results', mode='w', format='table')
+
+    except ImportError as err:
+        raise RuntimeError('Writing %s files failed: %s' % (fmt, err)) from None
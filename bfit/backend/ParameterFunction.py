@@ -2,14 +2,9 @@
 # Derek Fujimoto
 # Nov 2020
 
-import jax
-import jax.numpy as jnp
 import numpy as np
 from bfit.global_variables import KEYVARS
-from bfit.backend.get_derror import get_derror
-
-jax.config.update('jax_platform_name', 'cpu')
-jax.config.update("jax_enable_x64", True)
+from bfit.backend.get_derror import get_derror_batch, get_function
 
 # =========================================================================== # 
 class ParameterFunction(object):
@@ -58,7 +53,9 @@ class ParameterFunction(object):
         # make equation
         input_str = ', '.join(self.inputs)
         equation = equation.replace('np.', 'jnp.')
-        self.equation = eval('lambda %s : %s' % (input_str, equation))
+        equation = 'lambda %s : %s' % (input_str, equation)
+
+        self.equation = get_function(equation)
         
         # add name to draw_components
         draw_comp = self.bfit.fit_files.draw_components
@@ -71,33 +68,48 @@ class ParameterFunction(object):
         """ 
             Get data and calculate the parameter
         """
+        val, err = self.get_values([run_id])
+        return (val[0], err[0])
         
-        inputs_val = {}
-        inputs_err = {}
-        for var in self.inputs:
+    # ======================================================================= # 
+    def get_values(self, run_ids):
+        """ 
+            Get data and calculate the parameter for many runs at once
+            
+            run_ids: list of run ids
             
-            # get value for all data
-            if var in KEYVARS:
-                value, error = self._get_value(self.bfit.data[run_id], var)
-            elif var in self.parnames:
+            Returns (values, errors) as arrays, in order of run_ids
+        """
+        
+        inputs_val = {var: [] for var in self.inputs}
+        inputs_err = {var: [] for var in self.inputs}
+        for run_id in run_ids:
+            for var in self.inputs:
                 
-                var_par = var.replace('lambda1', '1_T1')
-                value = self.bfit.data[run_id].fitpar['res'][var_par]
-                error1 = self.bfit.data[run_id].fitpar['dres+'][var_par]
-                error2 = self.bfit.data[run_id].fitpar['dres-'][var_par]
-                error = (error1+error2)/2
+                # get value for all data
+                if var in KEYVARS:
+                    value, error = self._get_value(self.bfit.data[run_id], var)
+                elif var in self.parnames:
                     
-            # set up inputs
-            inputs_val[var] = value
-            inputs_err[var] = error
-                            
-        # calculate the parameter
-        val = self.equation(**inputs_val)
+                    var_par = var.replace('lambda1', '1_T1')
+                    value = self.bfit.data[run_id].fitpar['res'][var_par]
+                    error1 = self.bfit.data[run_id].fitpar['dres+'][var_par]
+                    error2 = self.bfit.data[run_id].fitpar['dres-'][var_par]
+                    error = (error1+error2)/2
+                        
+                # set up inputs
+                inputs_val[var].append(value)
+                inputs_err[var].append(np.mean(error))
         
         order = self.equation.__code__.co_varnames
-        inputs_val = [inputs_val[k] for k in order]
-        inputs_err = [inputs_err[k] for k in order]
-        err = get_derror(self.equation, inputs_val, inputs_err)
+        shape = (len(order), len(run_ids))
+        inputs_val = np.array([inputs_val[k] for k in order], dtype=float).reshape(shape)
+        inputs_err = np.array([inputs_err[k] for k in order], dtype=float).reshape(shape)
+        
+        # calculate the parameter
+        val = np.asarray(self.equation(*inputs_val), dtype=float)
+        val = np.broadcast_to(val, (len(run_ids), )).copy()
+        err = get_derror_batch(self.equation, inputs_val.T, inputs_err.T)
         
         return (val, err)
         
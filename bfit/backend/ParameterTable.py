@@ -0,0 +1,86 @@
+# Table of plottable values of many runs
+# Derek Fujimoto
+# Oct 2026
+
+import numpy as np
+
+# =========================================================================== #
+class ParameterTable(object):
+    """
+        Columnar table of plottable values, with one column per selectable
+        quantity (as in fitdata.get_values) and one row per run. Values are
+        calculated on first request and kept until the run is invalidated, when
+        its file is read or its fit parameters change.
+
+        columns:        dict {select: {run id: (value, error)}}
+        nhits:          int, number of values taken from the table
+        nmisses:        int, number of values needing a new calculation
+    """
+
+    # ======================================================================= #
+    def __init__(self):
+        self.columns = {}
+        self.nhits = 0
+        self.nmisses = 0
+
+    # ======================================================================= #
+    def __contains__(self, key):
+        """key: (select, run id)"""
+        select, id = key
+        return id in self.columns.get(select, {})
+
+    # ======================================================================= #
+    def __len__(self):
+        return sum(len(c) for c in self.columns.values())
+
+    # ======================================================================= #
+    def clear(self):
+        """Remove all entries"""
+        self.columns.clear()
+
+    # ======================================================================= #
+    def drop(self, select):
+        """Remove a column"""
+        self.columns.pop(select, None)
+
+    # ======================================================================= #
+    def get(self, select, data, ids):
+        """
+            Get values of a quantity for many runs, calculating those not in
+            the table.
+
+            select:     str, name of quantity, as in fitdata.get_values
+            data:       dict {run id: fitdata}
+            ids:        list of run ids
+
+            Returns (values, errors) as arrays in order of ids. If the errors
+            are asymmetric, errors is a tuple of arrays (lower, upper).
+        """
+
+        column = self.columns.setdefault(select, {})
+
+        # calculate missing values
+        for id in ids:
+            if id in column:
+                self.nhits += 1
+            else:
+                column[id] = data[id].get_values(select)
+                self.nmisses += 1
+
+        # slice column
+        out = np.empty((len(ids), 2), dtype=object)
+        for i, id in enumerate(ids):
+            out[i, 0], out[i, 1] = column[id]
+
+        val = out[:, 0]
+        err = np.array(out[:, 1].tolist())
+        if len(err.shape) > 1:
+            err = (err[:, 0], err[:, 1])
+
+        return (val, err)
+
+    # ======================================================================= #
+    def invalidate(self, id):
+        """Remove all values of a run"""
+        for column in self.columns.values():
+            column.pop(id, None)
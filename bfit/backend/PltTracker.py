@@ -4,11 +4,14 @@
 
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from contextlib import contextmanager
 
 # =========================================================================== #
 class PltTracker(object):
     """
         active:         dictionary, id number of active plot
+        held:           dictionary, {style: {function name: (args, kwargs)}}
+                        of legend and layout calls deferred by hold
         plots:          dictionary, list of plots drawn for type
     """
 
@@ -21,6 +24,9 @@ class PltTracker(object):
         # track the active plot
         self.active = {'inspect':0, 'data':0, 'fit':0, 'param':0, 'periodic':0}
 
+        # deferred figure updates
+        self.held = {}
+
     # ======================================================================= #
     def _close_figure(self, event):
         """Remove figure from list"""
@@ -339,8 +345,35 @@ class PltTracker(object):
         if not self.plots[style]: self.figure(style)
         return self._decorator(style, plt.gcf)
 
+    # ======================================================================= #
+    @contextmanager
+    def hold(self, style):
+        """
+            Defer legend and layout updates of the active figure to the end of
+            the block, such that drawing many objects updates them only once.
+            The canvas is then redrawn once.
+        """
+
+        if style in self.held:
+            yield
+            return
+
+        self.held[style] = {}
+        try:
+            yield
+        finally:
+            pending = self.held.pop(style)
+
+            if self.active[style] in self.plots[style]:
+                for name, (args, kwargs) in pending.items():
+                    getattr(self, name)(style, *args, **kwargs)
+                plt.figure(self.active[style]).canvas.draw_idle()
+
     # ======================================================================= #
     def legend(self, style, *args, **kwargs):
+        if style in self.held:
+            self.held[style]['legend'] = (args, kwargs)
+            return
         self._decorator(style, plt.legend, *args, **kwargs)
 
     # ======================================================================= #
@@ -384,8 +417,18 @@ class PltTracker(object):
     def text(self, style, *args, id=None, unique=True, **kwargs):
         return self._decorator(style, plt.text, *args, id=id, unique=unique, **kwargs)
 
+    # ======================================================================= #
+    def remove(self, style, id):
+        """Remove objects drawn with a given id from the active figure"""
+        if self.active[style] in self.plots[style]:
+            ax = self._decorator(style, plt.gca)
+            self._remove_drawn_object(ax, id)
+
     # ======================================================================= #
     def tight_layout(self, style, *args, **kwargs):
+        if style in self.held:
+            self.held[style]['tight_layout'] = (args, kwargs)
+            return
         return self._decorator(style, plt.tight_layout, *args, **kwargs)
 
     # ======================================================================= #
@@ -0,0 +1,191 @@
+# Calculate and write tables of many runs for export, in parallel
+# Derek Fujimoto
+# Oct 2026
+
+from bfit import logger_name
+from bfit.backend.FitResults import file_formats, write_frame
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import logging
+import os
+import re
+
+# file extensions for formats holding all runs in one file
+bundle_formats = {**{k: v for k, v in file_formats.items() if v != 'csv'},
+                  '.npz':   'npz',
+                 }
+
+# =========================================================================== #
+class RunExporter(object):
+    """
+        Export a table for each of many runs, such as asymmetries or fit
+        curves. Each run is a job which calculates a DataFrame. Jobs are
+        calculated in a thread pool and written either as one csv file per run
+        or to one file with a group per run.
+
+        Formats for one file, set by the file extension:
+
+            .npz:                   numpy archive, with arrays "<id>/<column>"
+                                    and the header lines in "<id>/header"
+            .parquet, .pq:          parquet, one table with a "run" column,
+                                    needs pyarrow or fastparquet
+            .h5, .hdf, .hdf5:       HDF5, one table per run with key
+                                    "run_<id>", needs pytables
+
+        jobs:       list of (id, calculate, filename, header), see add
+        logger:     logger
+        n_jobs:     max number of runs calculated concurrently
+    """
+
+    # ======================================================================= #
+    def __init__(self, n_jobs=4):
+        self.jobs = []
+        self.n_jobs = n_jobs
+        self.logger = logging.getLogger(logger_name)
+
+    # ======================================================================= #
+    def __len__(self):
+        return len(self.jobs)
+
+    # ======================================================================= #
+    def add(self, id, calculate, filename=None, header=None):
+        """
+            Add a run to export
+
+            id:         str, run id
+            calculate:  function handle with no inputs, returns DataFrame to
+                        write. Called from worker threads, so it should not
+                        use Tk objects.
+            filename:   str, csv file of this run, if writing one file per run
+            header:     list of str, comment lines for the file
+        """
+        self.jobs.append((id, calculate, filename, header))
+
+    # ======================================================================= #
+    def run(self, filename=None, out=None):
+        """
+            Calculate all tables and write them
+
+            filename:   str, if None write each run to its own csv file. Else
+                        write all runs to this file, with format set by the
+                        extension (see bundle_formats).
+            out:        queue, put ('run', id) as each run is done, and
+                        ('done', failed) once all runs are written. If writing
+                        the single file fails, put ('error', message) instead
+                        of raising.
+
+            Returns list of ids of runs which failed
+        """
+
+        tables = {}
+        failed = []
+
+        def calculate(job):
+            id, fn, fname, header = job
+            df = fn()
+
+            if filename is None:
+                write_frame(df, fname, (header or []) + [''])
+                return (id, None)
+            return (id, df)
+
+        n_jobs = max(1, min(self.n_jobs, len(self.jobs)))
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            jobs = {pool.submit(calculate, job): job[0] for job in self.jobs}
+
+            for job in as_completed(jobs):
+                id = jobs[job]
+                try:
+                    df = job.result()[1]
+                except Exception as err:
+                    self.logger.warning('Export of run %s failed: %s', id, err)
+                    failed.append(id)
+                else:
+                    if df is not None:
+                        tables[id] = df
+
+                if out is not None:
+                    out.put(('run', id))
+
+        # write all runs to one file, in the order added
+        if filename is not None:
+            headers = {job[0]: job[3] or [] for job in self.jobs}
+            tables = {id: tables[id] for id, *_ in self.jobs if id in tables}
+
+            try:
+                write_bundle(tables, filename, headers)
+            except Exception as err:
+                if out is None:
+                    raise err from None
+                self.logger.exception('Export to %s failed', filename)
+                out.put(('error', str(err)))
+                return failed
+
+            self.logger.info('Exported %d runs to %s', len(tables), filename)
+
+        if out is not None:
+            out.put(('done', failed))
+
+        return failed
+
+# =========================================================================== #
+def _get_key(id):
+    """Get HDF5 key of a run id"""
+    return 'run_' + re.sub(r'\W', '_', str(id))
+
+# =========================================================================== #
+def write_bundle(tables, filename, headers=None):
+    """
+        Write the tables of many runs to one file, with the format set by the
+        file extension, see RunExporter.
+
+        tables:     dict {id: DataFrame}
+        filename:   str, path to file
+        headers:    dict {id: list of str}, header lines of each run
+    """
+
+    fmt = bundle_formats.get(os.path.splitext(filename)[1].lower(), None)
+    headers = {} if headers is None else headers
+
+    if fmt is None:
+        raise RuntimeError('Unknown file type for single file export: "%s". '\
+                           'Use one of %s' % (filename,
+                                              ', '.join(bundle_formats.keys())))
+
+    if not tables:
+        raise RuntimeError('No runs to export to "%s"' % filename)
+
+    # numpy archive: arrays keyed by run and column
+    if fmt == 'npz':
+        arrays = {}
+        for id, df in tables.items():
+            df = df.reset_index() if df.index.name is not None else df
+            for c in df.columns:
+                arrays['%s/%s' % (id, c)] = df[c].values
+            arrays['%s/header' % id] = np.array('\n'.join(headers.get(id, [])))
+        np.savez(filename, **arrays)
+        return
+
+    try:
+        # one table, with run id column
+        if fmt == 'parquet':
+            df = pd.concat([df.reset_index() if df.index.name is not None else df
+                            for df in tables.values()],
+                           keys=list(tables.keys()), names=['run', None])
+            df = df.reset_index(level=0).reset_index(drop=True)
+            df.attrs['header'] = {str(k): '\n'.join(headers.get(k, []))
+                                  for k in tables.keys()}
+            df.to_parquet(filename)
+
+        # one table per run
+        elif fmt == 'hdf':
+            with pd.HDFStore(filename, mode='w') as store:
+                for id, df in tables.items():
+                    key = _get_key(id)
+                    store.put(key, df, format='table')
+                    store.get_storer(key).attrs.header = headers.get(id, [])
+                    store.get_storer(key).attrs.id = id
+
+    except ImportError as err:
+        raise RuntimeError('Writing %s files failed: %s' % (fmt, err)) from None
@@ -0,0 +1,189 @@
+# Boolean run filter expressions, evaluated over many runs at once
+# Derek Fujimoto
+# Oct 2026
+
+from bfit.global_variables import KEYVARS
+from bfit.backend.fitdata import fitdata
+import numpy as np
+import ast
+import operator
+
+# =========================================================================== #
+class RunFilter(object):
+    """
+        Boolean expression on run variables, such as "10 < BIAS < 15". The
+        expression is parsed once into a syntax tree, checked to contain only
+        numbers, variable names, arithmetic, comparisons and logic, and then
+        evaluated on arrays of variable values, one element per run.
+
+        Variable names are the keys of KEYVARS, in addition to nan and inf.
+
+        expression: str, filter expression
+        tree:       ast.Expression, parsed expression
+        variables:  list of KEYVARS keys used in the expression
+    """
+
+    constants = {'nan': np.nan, 'inf': np.inf}
+
+    binops = {  ast.Add:        operator.add,
+                ast.Sub:        operator.sub,
+                ast.Mult:       operator.mul,
+                ast.Div:        operator.truediv,
+                ast.FloorDiv:   operator.floordiv,
+                ast.Mod:        operator.mod,
+                ast.Pow:        operator.pow,
+             }
+
+    unaryops = {ast.USub:       operator.neg,
+                ast.UAdd:       operator.pos,
+                ast.Not:        np.logical_not,
+               }
+
+    compareops = {  ast.Lt:     operator.lt,
+                    ast.LtE:    operator.le,
+                    ast.Gt:     operator.gt,
+                    ast.GtE:    operator.ge,
+                    ast.Eq:     operator.eq,
+                    ast.NotEq:  operator.ne,
+                 }
+
+    boolops = { ast.And:        np.logical_and,
+                ast.Or:         np.logical_or,
+              }
+
+    # ======================================================================= #
+    def __init__(self, expression):
+
+        self.expression = expression.strip()
+
+        try:
+            self.tree = ast.parse(self.expression, mode='eval')
+        except SyntaxError:
+            raise RuntimeError('Bad syntax in "%s"' % self.expression) from None
+
+        self.variables = []
+        self._check(self.tree.body)
+
+        if not self.variables:
+            raise RuntimeError('Variable not recognized in "%s"' % self.expression)
+
+    # ======================================================================= #
+    def __call__(self, table):
+        return self.evaluate(table)
+
+    # ======================================================================= #
+    def __repr__(self):
+        return 'RunFilter(%s)' % repr(self.expression)
+
+    # ======================================================================= #
+    def _check(self, node):
+        """Raise RuntimeError if the expression has disallowed elements"""
+
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float, bool):
+                self._raise(node)
+
+        elif isinstance(node, ast.Name):
+            if node.id in KEYVARS.keys():
+                if node.id not in self.variables:
+                    self.variables.append(node.id)
+            elif node.id not in self.constants.keys():
+                raise RuntimeError('Variable "%s" not recognized in "%s"' % \
+                                   (node.id, self.expression))
+
+        elif isinstance(node, ast.BinOp) and type(node.op) in self.binops:
+            self._check(node.left)
+            self._check(node.right)
+
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in self.unaryops:
+            self._check(node.operand)
+
+        elif isinstance(node, ast.Compare) and \
+             all(type(op) in self.compareops for op in node.ops):
+            self._check(node.left)
+            for n in node.comparators:
+                self._check(n)
+
+        elif isinstance(node, ast.BoolOp) and type(node.op) in self.boolops:
+            for n in node.values:
+                self._check(n)
+
+        else:
+            self._raise(node)
+
+    # ======================================================================= #
+    def _raise(self, node):
+        raise RuntimeError('"%s" not allowed in "%s"' % \
+                           (ast.get_source_segment(self.expression, node) or
+                            type(node).__name__, self.expression))
+
+    # ======================================================================= #
+    def _evaluate(self, node, table):
+        """Evaluate a checked node"""
+
+        if isinstance(node, ast.Constant):
+            return node.value
+
+        elif isinstance(node, ast.Name):
+            if node.id in self.constants.keys():
+                return self.constants[node.id]
+            return table[node.id]
+
+        elif isinstance(node, ast.BinOp):
+            return self.binops[type(node.op)](self._evaluate(node.left, table),
+                                              self._evaluate(node.right, table))
+
+        elif isinstance(node, ast.UnaryOp):
+            return self.unaryops[type(node.op)](self._evaluate(node.operand, table))
+
+        # chained comparisons: a < b < c is (a < b) and (b < c)
+        elif isinstance(node, ast.Compare):
+            left = self._evaluate(node.left, table)
+            out = True
+            for op, n in zip(node.ops, node.comparators):
+                right = self._evaluate(n, table)
+                out = np.logical_and(out, self.compareops[type(op)](left, right))
+                left = right
+            return out
+
+        elif isinstance(node, ast.BoolOp):
+            values = [self._evaluate(n, table) for n in node.values]
+            out = values[0]
+            for v in values[1:]:
+                out = self.boolops[type(node.op)](out, v)
+            return out
+
+    # ======================================================================= #
+    def evaluate(self, table):
+        """
+            Evaluate the expression for many runs
+
+            table:  dict or DataFrame {KEYVARS key: array of values}, with at
+                    least the variables in the expression, one element per run
+
+            Returns boolean array, true for runs satisfying the expression
+        """
+
+        table = {k: np.asarray(table[k], dtype=float) for k in self.variables}
+        n = len(next(iter(table.values())))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out = self._evaluate(self.tree.body, table)
+
+        return np.broadcast_to(np.asarray(out, dtype=bool), (n,)).copy()
+
+# =========================================================================== #
+def get_table(data, variables, ids=None):
+    """
+        Get the values of run variables for many runs
+
+        data:       dict {run id: fitdata}
+        variables:  list of KEYVARS keys
+        ids:        list of run ids, if None use all in data
+
+        Returns dict {KEYVARS key: array of values in order of ids}
+    """
+
+    ids = list(data.keys()) if ids is None else ids
+    return {k: fitdata.param_table.get(KEYVARS[k], data, ids)[0]
+            for k in variables}
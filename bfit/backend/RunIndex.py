@@ -0,0 +1,296 @@
+# Persistent index of run header fields for searching
+# Derek Fujimoto
+# Oct 2026
+
+from bfit import logger_name
+from bdata import bdata
+from bdata.calc import nqr_B0_hh6, nqr_B0_hh3
+import bdata as bd
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+import multiprocessing
+import logging
+import sqlite3
+import os
+
+# indexed fields and their sqlite types
+columns = { 'year':             'INTEGER',
+            'run':              'INTEGER',
+            'filename':         'TEXT',
+            'mtime':            'REAL',
+            'area':             'TEXT',
+            'mode':             'TEXT',
+            'title':            'TEXT',
+            'sample':           'TEXT',
+            'orientation':      'TEXT',
+            'experimenter':     'TEXT',
+            'duration':         'REAL',
+            'start_time':       'INTEGER',
+            'start_date':       'TEXT',
+            'temperature':      'REAL',
+            'temperature_std':  'REAL',
+            'field':            'REAL',
+            'field_std':        'REAL',
+            'beam_keV':         'REAL',
+            'beam_keV_err':     'REAL',
+          }
+
+# default location of the index
+default_filename = os.path.join(bd._mud_data, 'run_index.sqlite')
+
+# =========================================================================== #
+class RunIndex(object):
+    """
+        Persistent SQLite index of the header and summary fields of runs, such
+        that runs can be searched without opening the MUD files. Entries are
+        refreshed when the modification time of their file changes.
+
+        filename:   str, path to the sqlite file
+    """
+
+    table = 'runs'
+
+    # ======================================================================= #
+    def __init__(self, filename=None):
+
+        self.filename = default_filename if filename is None else filename
+
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as con:
+            cols = ', '.join('%s %s' % (c, t) for c, t in columns.items())
+            con.execute('CREATE TABLE IF NOT EXISTS %s (%s, PRIMARY KEY (year, run))' % \
+                        (self.table, cols))
+
+    # ======================================================================= #
+    def __len__(self):
+        with self._connect() as con:
+            return con.execute('SELECT COUNT(*) FROM %s' % self.table).fetchone()[0]
+
+    # ======================================================================= #
+    @contextmanager
+    def _connect(self):
+        """Open connection, committing on success and closing after"""
+        con = sqlite3.connect(self.filename)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    # ======================================================================= #
+    def get_mtimes(self):
+        """
+            Returns dict {(year, run): mtime} of all indexed runs
+        """
+        with self._connect() as con:
+            rows = con.execute('SELECT year, run, mtime FROM %s' % self.table)
+            return {(y, r): m for y, r, m in rows}
+
+    # ======================================================================= #
+    def to_frame(self, runs=None, years=None):
+        """
+            Get indexed fields as a DataFrame, one row per run, sorted by year
+            and run number.
+
+            runs:   list of run numbers to select, if None get all
+            years:  list of years to select, if None get all
+        """
+
+        query = 'SELECT * FROM %s' % self.table
+        where = []
+        params = []
+        for name, values in (('run', runs), ('year', years)):
+            if values is not None:
+                values = [int(v) for v in values]
+                where.append('%s IN (%s)' % (name, ', '.join('?'*len(values))))
+                params.extend(values)
+
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' ORDER BY year, run'
+
+        with self._connect() as con:
+            return pd.read_sql_query(query, con, params=params)
+
+    # ======================================================================= #
+    def update(self, runs, years, n_jobs=1):
+        """
+            Add runs to the index, or refresh those whose files have changed
+            since they were indexed. Runs without a local file are downloaded
+            by bdata. Runs which cannot be read are skipped.
+
+            runs:   list of run numbers
+            years:  list of years
+            n_jobs: number of processes for reading files
+
+            Returns number of runs read
+        """
+
+        # find files which are new or changed
+        mtimes = self.get_mtimes()
+        jobs = []
+        for y in years:
+            for r in runs:
+                filename = get_filename(int(r), int(y))
+
+                # not in local archive: download when read
+                if filename is None:
+                    jobs.append((int(r), int(y), None, None))
+                    continue
+
+                mtime = os.path.getmtime(filename)
+                if mtimes.get((int(y), int(r)), None) != mtime:
+                    jobs.append((int(r), int(y), filename, mtime))
+
+        if not jobs:
+            return 0
+
+        # read headers
+        if n_jobs > 1 and len(jobs) > 1:
+            pool = multiprocessing.get_context('fork').Pool(min(n_jobs, len(jobs)))
+            try:
+                rows = pool.map(_read_job, jobs)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            rows = list(map(_read_job, jobs))
+
+        rows = [row for row in rows if row is not None]
+
+        # write
+        names = list(columns.keys())
+        with self._connect() as con:
+            con.executemany('INSERT OR REPLACE INTO %s (%s) VALUES (%s)' % \
+                            (self.table, ', '.join(names), ', '.join('?'*len(names))),
+                            [[row.get(n, None) for n in names] for row in rows])
+
+        return len(rows)
+
+# =========================================================================== #
+def get_filename(run, year):
+    """
+        Get the path to the MUD file of a run in the local archive, as found by
+        bdata.
+
+        Returns str, or None if the file is not found
+    """
+
+    # spectrometer
+    if 40000 <= run <= 44999:
+        directory = os.environ.get(bdata.evar_bnmr,
+                                   os.path.join(bd._mud_data, 'bnmr'))
+    elif 45000 <= run <= 49999:
+        directory = os.environ.get(bdata.evar_bnqr,
+                                   os.path.join(bd._mud_data, 'bnqr'))
+    else:
+        return None
+
+    filename = os.path.join(directory, str(year), '%06d.msr' % run)
+
+    if os.path.isfile(filename):
+        return filename
+    return None
+
+# =========================================================================== #
+def download(run, year):
+    """
+        Fetch the MUD file of a run which is not in the local archive. bdata
+        downloads missing runs from musr.ca.
+
+        Returns str, path to the file
+    """
+    bdata(run, year)
+    return get_filename(run, year)
+
+# =========================================================================== #
+def read_header(filename):
+    """
+        Read the indexed fields from a MUD file
+
+        Returns dict {field: value}
+    """
+
+    b = bdata(filename=filename)
+
+    def get(obj, attr, default=np.nan):
+        try:
+            return getattr(obj, attr)
+        except (AttributeError, KeyError):
+            return default
+
+    def get_camp(name, stat):
+        try:
+            return getattr(b.camp[name], stat)
+        except (AttributeError, KeyError):
+            return np.nan
+
+    row = {'year':          int(b.year),
+           'run':           int(b.run),
+           'area':          str(get(b, 'area', '')),
+           'mode':          str(get(b, 'mode', '')),
+           'title':         str(get(b, 'title', '')),
+           'sample':        str(get(b, 'sample', '')),
+           'orientation':   str(get(b, 'orientation', '')),
+           'experimenter':  str(get(b, 'experimenter', '')),
+           'duration':      float(get(b, 'duration')),
+           'start_time':    int(get(b, 'start_time', 0)),
+           'start_date':    str(get(b, 'start_date', '')),
+           'temperature':   get_camp('smpl_read_A', 'mean'),
+           'temperature_std': get_camp('smpl_read_A', 'std'),
+           'beam_keV':      float(get(b, 'beam_keV')),
+           'beam_keV_err':  float(get(b, 'beam_keV_err')),
+          }
+
+    # field in T, as in fitdata
+    try:
+        if row['area'].upper() == 'BNMR':
+            row['field'] = b.camp.b_field.mean
+            row['field_std'] = b.camp.b_field.std
+        else:
+            if hasattr(b.epics, 'hh6_current'):
+                field, err = nqr_B0_hh6(amps=b.epics.hh6_current.mean)
+                field_std, err = nqr_B0_hh6(amps=b.epics.hh6_current.std)
+            else:
+                field, err = nqr_B0_hh3(amps=b.epics.hh_current.mean)
+                field_std, err = nqr_B0_hh3(amps=b.epics.hh_current.std)
+
+            row['field'] = field*1e-4
+            row['field_std'] = ((err**2 + field_std**2)**0.5)*1e-4
+
+    except AttributeError:
+        row['field'] = np.nan
+        row['field_std'] = np.nan
+
+    return row
+
+# =========================================================================== #
+def _read_job(job):
+    """
+        Read the header of a run for RunIndex.update, from a pool
+
+        job:    (run, year, filename, mtime), if filename is None download
+                the file first
+
+        Returns dict {field: value}, or None if the file could not be read
+    """
+    run, year, filename, mtime = job
+
+    try:
+        if filename is None:
+            filename = download(run, year)
+            mtime = os.path.getmtime(filename)
+
+        row = read_header(filename)
+
+    except (RuntimeError, ValueError) as err:
+        logging.getLogger(logger_name).warning('Failed to read run %d (%d): %s',
+                                               run, year, err)
+        return None
+
+    row.update({'run': run, 'year': year, 'filename': filename, 'mtime': mtime})
+    return row
@@ -0,0 +1,142 @@
+# Periodically re-read fetched runs in the background
+# Derek Fujimoto
+# Oct 2026
+
+from bfit import logger_name
+import threading
+import logging
+import queue
+
+# =========================================================================== #
+class RunRefresher(object):
+    """
+        Periodically check the files of fetched runs and re-read those which
+        have changed. Files are checked and read in a background thread, and
+        the new bdata objects are handed to the fitdata objects on the Tk main
+        thread through root.after, such that the GUI is not blocked.
+
+        bfit:       pointer to bfit, the refresh period is bfit.update_period
+        callback:   function handle called on the main thread with the list of
+                    ids of updated runs after each check which updated any
+        after_id:   id of the scheduled Tk callback
+        is_running: if true, keep checking periodically
+        poll_ms:    period in ms for handing finished runs to Tk
+        queue:      queue.Queue of (id, bdata, file_stats) read in the background
+        thread:     threading.Thread of the ongoing check, or None
+    """
+
+    poll_ms = 100
+
+    # ======================================================================= #
+    def __init__(self, bfit, callback=None):
+        self.bfit = bfit
+        self.callback = callback
+        self.after_id = None
+        self.is_running = False
+        self.queue = queue.Queue()
+        self.thread = None
+        self.logger = logging.getLogger(logger_name)
+
+    # ======================================================================= #
+    def start(self):
+        """Start checking periodically"""
+        if self.is_running:
+            return
+
+        self.logger.info('Starting refresh of fetched runs every %s s',
+                         self.bfit.update_period)
+        self.is_running = True
+        self._schedule(self.bfit.update_period*1000, self.check)
+
+    # ======================================================================= #
+    def stop(self):
+        """Stop checking. An ongoing check is finished but not applied."""
+        self.logger.info('Stopping refresh of fetched runs')
+        self.is_running = False
+
+        if self.after_id is not None:
+            self.bfit.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    # ======================================================================= #
+    def _schedule(self, ms, fn):
+        self.after_id = self.bfit.root.after(int(ms), fn)
+
+    # ======================================================================= #
+    def check(self):
+        """Start a background check of all fetched runs"""
+
+        self.after_id = None
+        if not self.is_running:
+            return
+
+        # don't start a new check until the last one is done
+        if self.thread is not None and self.thread.is_alive():
+            self._schedule(self.poll_ms, self.check)
+            return
+
+        data = dict(self.bfit.data)
+        self.thread = threading.Thread(target=read_changed,
+                                       args=(data, self.queue), daemon=True)
+        self.thread.start()
+        self._schedule(self.poll_ms, self.apply)
+
+    # ======================================================================= #
+    def apply(self, updated=None):
+        """
+            Hand runs read in the background to their fitdata objects, on the
+            main thread
+
+            updated:    list of ids updated so far in this check
+        """
+
+        self.after_id = None
+        updated = [] if updated is None else updated
+
+        while True:
+            try:
+                id, bd, file_stats = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if self.is_running and id in self.bfit.data.keys():
+                self.bfit.data[id].set_bd(bd, file_stats)
+                updated.append(id)
+
+        if not self.is_running:
+            return
+
+        # check ongoing: keep handing over runs as they finish
+        if self.thread.is_alive() or not self.queue.empty():
+            self._schedule(self.poll_ms, lambda: self.apply(updated))
+            return
+
+        # check done
+        if updated:
+            self.logger.info('Refreshed runs %s', updated)
+            if self.callback is not None:
+                self.callback(updated)
+
+        self._schedule(self.bfit.update_period*1000, self.check)
+
+# =========================================================================== #
+def read_changed(data, out):
+    """
+        Read runs whose files have changed since they were last read, for
+        running in a background thread
+
+        data:   dict {id: fitdata}
+        out:    queue.Queue, put (id, bdata, file_stats) for each changed run
+    """
+
+    logger = logging.getLogger(logger_name)
+
+    for id, dat in data.items():
+        stats = dat.get_file_stats()
+        if stats is None or stats == dat.file_stats:
+            continue
+
+        try:
+            out.put((id, dat._open(), stats))
+        except Exception as err:
+            logger.warning('Failed to refresh run %s: %s', id, err)
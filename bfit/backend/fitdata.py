@@ -12,13 +12,19 @@ from scipy.special import gamma, polygamma
 
 from bfit.backend.raise_window import raise_window
 from bfit.backend.get_derror import get_derror
+from bfit.backend.AsymCache import AsymCache
+from bfit.backend.ParameterTable import ParameterTable
+from bfit.backend.RunIndex import get_filename
 
 import numpy as np
 import pandas as pd
 
 import bfit
 import logging
+import os
 import textwrap
+import threading
+import time
 
 # =========================================================================== #
 # =========================================================================== #
@@ -29,6 +35,8 @@ class fitdata(object):
 
         Data Fields:
 
+            asym_cache: cache of asymmetry calculations shared by all runs,
+                        keyed by run id (AsymCache, class attribute)
             base_bins:  n bins to use in baseline flatten (IntVar)
             bd:         bdata object for data and asymmetry (bdata)
             bfit:       pointer to top level parent object (bfit)
@@ -49,17 +57,25 @@ class fitdata(object):
             drawarg:    drawing arguments for errorbars (dict)
             field:      magnetic field in T (float)
             field_std:  magnetic field standard deviation in T (float)
+            fit_cache:  cache of evaluated fit curves shared by all runs,
+                        keyed by run id (AsymCache, class attribute)
             fitfn:      function (function pointer)
             fitfnname:  function (str)
+            file_stats: (size, mtime) of each run file when last read, used to
+                        skip reading unchanged files (list)
             fitpar:     initial parameters {column:{parname:float}} and results
                         Columns are fit_files.fitinputtab.collist
             id:         key for unique idenfication (str)
             label:      label for drawing (StringVar)
+            last_access: time of last asymmetry request, for unloading the
+                        least recently used runs (float)
             manually_updated_var: dict of epics, camp, ppg, containing dict of
                         mvar which will not be updated on read
             mode:       run mode (str, ex: 1f)
             omit:       omit bins, 1f only (StringVar)
             omit_scan:  if true omit incomplete scan (BoolVar)
+            param_table: table of get_values outputs shared by all runs
+                        (ParameterTable, class attribute)
             parnames:   parameter names in the order needed by the fit function
             rebin:      rebin factor (IntVar)
             run:        run number (int)
@@ -67,6 +83,15 @@ class fitdata(object):
 
     """
 
+    # asymmetry calculations shared between fitting and drawing
+    asym_cache = AsymCache()
+
+    # fit curves shared between drawing and exporting
+    fit_cache = AsymCache(max_bytes=64*1024**2)
+
+    # plottable values of all runs
+    param_table = ParameterTable()
+
     # ======================================================================= #
     def __init__(self, bfit, bd):
 
@@ -111,6 +136,7 @@ class fitdata(object):
 
         # key for IDing file
         self.id = self.bfit.get_run_key(data=bd)
+        self.last_access = time.time()
 
         # initialize fitpar
         self.reset_fitpar()
@@ -122,7 +148,10 @@ class fitdata(object):
         # set area as upper
         self.area = self.area.upper()
 
-        self.read()
+        # the bdata object is new: don't read it again
+        self.asym_cache.invalidate(self.id)
+        self.file_stats = self.get_file_stats()
+        self.read(force=self.file_stats is None)
 
     # ======================================================================= #
     def __getattr__(self, name):
@@ -130,23 +159,86 @@ class fitdata(object):
         try:
             return self.__dict__[name]
         except KeyError:
+
+            # histograms dropped by unload
+            if name == 'hist':
+                self.load()
+
             return getattr(self.bd, name)
 
     # ======================================================================= #
-    def asym(self, *args, **kwargs):
+    def asym(self, *args, options=None, **kwargs):
         """
-            Get asymmetry
+            Get asymmetry. Calculations are cached until the next read.
+
+            options:    dict from get_asym_options. If None, get the options
+                        from kwargs and the GUI settings.
         """
-        deadtime = 0
 
-        # check if deadtime corrections are needed
-        if self.bfit.deadtime_switch.get():
+        if options is None:
+            options = self.get_asym_options(**kwargs)
 
-            # check if corrections should be calculated for each run
-            if self.bfit.deadtime_global.get():
-                deadtime = self.bfit.deadtime
-            else:
-                deadtime = self.bd.get_deadtime(c=self.bfit.deadtime, fixed='c')
+        kwargs = dict(options)
+        deadtime_switch = kwargs.pop('deadtime_switch')
+        deadtime_global = kwargs.pop('deadtime_global')
+        deadtime_c = kwargs.pop('deadtime_c')
+        flip = kwargs.pop('flip')
+
+        key = (self.id, args, tuple(sorted(kwargs.items())), deadtime_switch,
+               deadtime_global, deadtime_c, flip)
+        self.last_access = time.time()
+
+        def calculate():
+            self.load()
+            deadtime = 0
+
+            # check if deadtime corrections are needed
+            if deadtime_switch:
+
+                # check if corrections should be calculated for each run
+                if deadtime_global:
+                    deadtime = deadtime_c
+                else:
+                    deadtime = self.bd.get_deadtime(c=deadtime_c, fixed='c')
+
+            # check for errors
+            try:
+                asym = self.bd.asym(*args, deadtime=deadtime,
+                                    **kwargs)
+            except Exception as err:
+                if threading.current_thread() is threading.main_thread():
+                    messagebox.showerror(title=type(err).__name__, message=str(err))
+                self.logger.exception(str(err))
+                raise err from None
+
+            # check if inversion is needed
+            if flip:
+                if type(asym) in (tuple, np.ndarray):
+                    asym[1] = -1 * asym[1]
+
+                else: # assume mdict
+
+                    for k, val in asym.items():
+                        if k in 'pnfbc':
+                            val = list(val)
+                            val[0] = -1*val[0]
+                            asym[k] = tuple(val)
+
+            return asym
+
+        return self.asym_cache.get(key, calculate)
+
+    # ======================================================================= #
+    def get_asym_options(self, **kwargs):
+        """
+            Get the asymmetry keyword arguments with defaults from the GUI
+            settings. Pass the output to asym as options to calculate
+            asymmetries away from the Tk main thread.
+
+            kwargs: keyword arguments of bdata.asym
+
+            Returns dict of kwargs, including the deadtime and flip settings
+        """
 
         # set repair options
         if 'scan_repair_options' not in kwargs.keys():
@@ -174,29 +266,13 @@ class fitdata(object):
         if 'hist_select' not in kwargs.keys():
             kwargs['hist_select'] = self.bfit.hist_select
 
-        # check for errors
-        try:
-            asym = self.bd.asym(*args, deadtime=deadtime,
-                                **kwargs)
-        except Exception as err:
-            messagebox.showerror(title=type(err).__name__, message=str(err))
-            self.logger.exception(str(err))
-            raise err from None
-
-        # check if inversion is needed
-        if self.flip_asym.get():
-            if type(asym) in (tuple, np.ndarray):
-                asym[1] = -1 * asym[1]
-
-            else: # assume mdict
+        # deadtime settings
+        kwargs['deadtime_switch'] = self.bfit.deadtime_switch.get()
+        kwargs['deadtime_global'] = self.bfit.deadtime_global.get()
+        kwargs['deadtime_c'] = self.bfit.deadtime
+        kwargs['flip'] = self.flip_asym.get()
 
-                for k, val in asym.items():
-                    if k in 'pnfbc':
-                        val = list(val)
-                        val[0] = -1*val[0]
-                        asym[k] = tuple(val)
-
-        return asym
+        return kwargs
 
     # ======================================================================= #
     @property
@@ -846,9 +922,6 @@ class fitdata(object):
 
         self.logger.info('Drawing fit for run %s. %s', id, drawargs)
 
-        # get data and fit results
-        fit_par = self.fitpar.loc[self.parnames, 'res'].values
-
         # get draw style
         style = self.bfit.draw_style.get()
 
@@ -885,7 +958,9 @@ class fitdata(object):
         # draw
         t, a, da = self.asym('c')
 
-        fitx = np.linspace(min(t), max(t), self.bfit.fit_files.n_fitx_pts)
+        fitx, fity = self.get_fit_curve(min(t), max(t),
+                                        self.bfit.fit_files.n_fitx_pts,
+                                        asym_mode=asym_mode)
 
         if self.mode in self.bfit.units:
             unit = self.bfit.units[self.mode]
@@ -893,9 +968,6 @@ class fitdata(object):
         else:
             xlabel = self.bfit.xlabel_dict[self.mode]
 
-        # get fity
-        fity = self.fitfn(fitx, *fit_par)
-
         # draw relative to peak 0
         if self.bfit.draw_rel_peak0.get():
 
@@ -1065,6 +1137,7 @@ class fitdata(object):
         """
         present = [p for p in parnames if p in self.fitpar.index]
         self.fitpar.drop(present, axis='index', inplace=True)
+        self.param_table.invalidate(self.id)
 
     # ======================================================================= #
     def drop_unused_param(self, parnames):
@@ -1073,45 +1146,24 @@ class fitdata(object):
         """
         unused = [p for p in self.fitpar.index if p not in parnames]
         self.fitpar.drop(unused, axis='index', inplace=True)
+        self.param_table.invalidate(self.id)
 
     # ======================================================================= #
-    def gen_set_from_var(self, pname, col, obj):
-        """Make function to set fitting initial parameters from StringVar or
-            BooleanVarobject
-
-            pname: string, name of parameter
-            col: string, one of 'p0', 'blo', 'bhi'
-            obj: the StringVar or BooleanVar to fetch from
+    def get_nbytes(self):
         """
+            Get memory used by the run
 
-        if pname in self.fitpar.index and col in self.fitpar.columns:
-            if type(obj) is StringVar:
-
-                def set_from_var(*args):
-                    try:
-                        value = float(obj.get())
-                    except ValueError:
-                        pass
-                    else:
-                        self.fitpar.loc[pname, col] = value
-                        if pname not in self.constrained.keys():
-                            self.set_constrained(col)
-
-            elif type(obj) is BooleanVar:
-
-                def set_from_var(*args):
-                    try:
-                        value = bool(obj.get())
-                    except ValueError:
-                        pass
-                    else:
-                        self.fitpar.loc[pname, col] = value
-
-            else:
+            Returns dict {'hist': size of raw histograms,
+                          'cache': size of cached asymmetries and fit curves}
+                    in bytes
+        """
 
-                raise RuntimeError('Bad obj input')
+        hist = self.bd.__dict__.get('hist', {})
+        nhist = sum(h.data.nbytes for h in hist.values())
+        ncache = self.asym_cache.get_nbytes(self.id) + \
+                 self.fit_cache.get_nbytes(self.id)
 
-            return set_from_var
+        return {'hist': nhist, 'cache': ncache}
 
     # ======================================================================= #
     def get_norm(self, asym_type, asym, dasym):
@@ -1388,12 +1440,14 @@ class fitdata(object):
             err = fetch(self, ['target_bias', 'std'])
 
         elif 'NBM Rate (count/s)' in select:
+            self.load()
             rate = lambda b : np.sum([b.hist['NBM'+h].data \
                                     for h in ('F+', 'F-', 'B-', 'B+')])/b.duration
             val = rate(self.bd)
             err = np.nan
 
         elif 'Sample Rate (count/s)' in select:
+            self.load()
             hist = ('F+', 'F-', 'B-', 'B+') if self.area.upper() == 'BNMR' \
                                          else ('L+', 'L-', 'R-', 'R+')
 
@@ -1402,12 +1456,14 @@ class fitdata(object):
             err = np.nan
 
         elif 'NBM Counts' in select:
+            self.load()
             counts = lambda b : np.sum([b.hist['NBM'+h].data \
                                     for h in ('F+', 'F-', 'B-', 'B+')])
             val = counts(self.bd)
             err = np.nan
 
         elif 'Sample Counts' in select:
+            self.load()
             hist = ('F+', 'F-', 'B-', 'B+') if self.area.upper() == 'BNMR' \
                                          else ('L+', 'L-', 'R-', 'R+')
 
@@ -1457,24 +1513,140 @@ class fitdata(object):
             raise AttributeError('Selection "%s" not found' % select) from None
 
     # ======================================================================= #
-    def read(self):
-        """Read data file"""
+    def get_fit_curve(self, xmin, xmax, npts, asym_mode=None):
+        """
+            Evaluate the fit function with the fit results, caching the curve
+            such that redrawing and exporting does not evaluate it again.
+
+            xmin, xmax: range of x values
+            npts:       number of points
+            asym_mode:  asymmetry type the curve is drawn for
+
+            Returns (fitx, fity)
+        """
+
+        fit_par = self.fitpar.loc[self.parnames, 'res'].values.astype(float)
+        key = (self.id, tuple(fit_par), float(xmin), float(xmax), int(npts),
+               asym_mode)
+
+        def calculate():
+            fitx = np.linspace(xmin, xmax, npts)
+            return (fitx, self.fitfn(fitx, *fit_par))
+
+        return self.fit_cache.get(key, calculate)
+
+    # ======================================================================= #
+    def get_file_stats(self):
+        """
+            Get the size and modification time of the run files, one per
+            constituent run for merged runs.
+
+            Returns list of (size, mtime), or None if a file is not found
+        """
+
+        if type(self.bd) is bmerged:
+            years = list(map(int, textwrap.wrap(str(self.year), 4)))
+            runs = list(map(int, textwrap.wrap(str(self.run), 5)))
+        else:
+            years = [self.year]
+            runs = [self.run]
+
+        stats = []
+        for r, y in zip(runs, years):
+            filename = get_filename(r, y)
+            if filename is None:
+                return None
+
+            st = os.stat(filename)
+            stats.append((st.st_size, st.st_mtime))
+
+        return stats
+
+    # ======================================================================= #
+    @property
+    def is_loaded(self):
+        """True if the raw histograms are in memory"""
+        return 'hist' in self.bd.__dict__
+
+    # ======================================================================= #
+    def load(self):
+        """
+            Read the raw histograms dropped by unload. Cached asymmetries and
+            header values are kept.
+        """
+
+        if self.is_loaded:
+            return
+
+        self.logger.info('Reloading histograms of run %s', self.id)
+        self.bd.hist = self._open().hist
+
+    # ======================================================================= #
+    def _open(self):
+        """
+            Open the data file(s) of this run
+
+            Returns new bdata or bmerged object
+        """
 
-        # bdata access
         if type(self.bd) is bdata:
 
             # load real run
             try:
-                self.bd = bdata(self.run, self.year)
+                return bdata(self.run, self.year)
 
             # load test run
             except ValueError:
-                self.bd = bdata(filename = self.bfit.fileviewer.filename)
+                return bdata(filename = self.bfit.fileviewer.filename)
 
         elif type(self.bd) is bmerged:
             years = list(map(int, textwrap.wrap(str(self.year), 4)))
             runs = list(map(int, textwrap.wrap(str(self.run), 5)))
-            self.bd = bmerged([bdata(r, y) for r, y in zip(runs, years)])
+            return bmerged([bdata(r, y) for r, y in zip(runs, years)])
+
+        return self.bd
+
+    # ======================================================================= #
+    def read(self, force=False):
+        """
+            Read data file, if it has changed since last read
+
+            force:  if true, always read the file
+
+            Returns true if the file was read
+        """
+
+        # skip unchanged files
+        stats = self.get_file_stats()
+        if not force and stats is not None and stats == self.file_stats:
+            self.set_new_var()
+            return False
+
+        # bdata access
+        self.set_bd(self._open(), stats)
+
+        return True
+
+    # ======================================================================= #
+    def reset_fitpar(self):
+        self.fitpar = pd.DataFrame([], columns=['p0', 'blo', 'bhi', 'res',
+                                    'dres+', 'dres-', 'chi', 'fixed', 'shared'])
+        self.param_table.invalidate(self.id)
+
+    # ======================================================================= #
+    def set_bd(self, bd, file_stats=None):
+        """
+            Replace the bdata object with a newly read one
+
+            bd:         bdata or bmerged object
+            file_stats: output of get_file_stats from when bd was read
+        """
+
+        # cached asymmetries are out of date
+        self.asym_cache.invalidate(self.id)
+
+        self.bd = bd
+        self.file_stats = file_stats
 
         # set manually updated variables
         for key, dic in self.manually_updated_var.items():
@@ -1484,11 +1656,6 @@ class fitdata(object):
         # set new variables
         self.set_new_var()
 
-    # ======================================================================= #
-    def reset_fitpar(self):
-        self.fitpar = pd.DataFrame([], columns=['p0', 'blo', 'bhi', 'res',
-                                    'dres+', 'dres-', 'chi', 'fixed', 'shared'])
-
     # ======================================================================= #
     def set_fitpar(self, values):
         """Set fitting initial parameters
@@ -1502,6 +1669,7 @@ class fitdata(object):
         for v in self.parnames:
             for c in values.columns:
                 self.fitpar.loc[v, c] = values.loc[v, c]
+        self.param_table.invalidate(self.id)
 
         self.logger.debug('Fit initial parameters set to %s', self.fitpar)
 
@@ -1535,6 +1703,28 @@ class fitdata(object):
                         val = self.constrained[par][0](*inputs)
                         self.fitline.set(par, **{col:val})
 
+    # ======================================================================= #
+    def set_fitpar_value(self, pname, col, value):
+        """
+            Set one value of the fitting parameters, as typed in the fit tab.
+            Values of constrained parameters are updated to match.
+
+            pname: string, name of parameter
+            col: string, one of 'p0', 'blo', 'bhi', 'res', 'dres-', 'dres+', 
+                 'chi', 'fixed', 'shared'
+            value: float or bool
+        """
+
+        if pname not in self.fitpar.index or col not in self.fitpar.columns:
+            return
+
+        self.fitpar.loc[pname, col] = value
+        self.param_table.invalidate(self.id)
+
+        if col not in ('chi', 'fixed', 'shared') and \
+           pname not in self.constrained.keys():
+            self.set_constrained(col)
+
     # ======================================================================= #
     def set_fitresult(self, values):
         """
@@ -1551,6 +1741,7 @@ class fitdata(object):
 
         # set function
         self.fitfn = values['fn']
+        self.fit_cache.invalidate(self.id)
 
         # get data frame
         df = values['results']
@@ -1565,6 +1756,7 @@ class fitdata(object):
         for v in self.parnames:
             for c in df.columns:
                 self.fitpar.loc[v, c] = df.loc[v, c]
+        self.param_table.invalidate(self.id)
         self.logger.debug('Setting fit results to %s', self.fitpar)
 
     # ======================================================================= #
@@ -1573,6 +1765,9 @@ class fitdata(object):
             Set new variables for easy access
         """
 
+        # plottable values are out of date
+        self.param_table.invalidate(self.id)
+
         # set temperature
         try:
             self.temperature = temperature_class(*self.get_temperature(self.bfit.thermo_channel.get()))
@@ -1622,6 +1817,17 @@ class fitdata(object):
         # set area as upper
         self.area = self.area.upper()
 
+    # ======================================================================= #
+    def unload(self):
+        """
+            Drop the raw histograms to save memory, keeping header values and
+            cached asymmetries. The histograms are read again when needed.
+        """
+
+        if self.is_loaded:
+            self.logger.info('Unloading histograms of run %s', self.id)
+            del self.bd.hist
+
 # ========================================================================== #
 class temperature_class(object):
     """
@@ -3,27 +3,97 @@
 # Nov 2021
 
 import numpy as np
-import jax
-jax.config.update('jax_platform_name', 'cpu')
+from functools import lru_cache
 
+# jax is imported on first use
+jax = None
+
+# equation function handles, keyed by the equation string, such that their
+# compiled jacobians can be reused
+equations = {}
+
+# ======================================================================= #
+def get_jax():
+    """
+        Import and configure jax
+
+        Returns jax module
+    """
+    global jax
+
+    if jax is None:
+        import jax as _jax
+        _jax.config.update('jax_platform_name', 'cpu')
+        _jax.config.update("jax_enable_x64", True)
+        jax = _jax
+
+    return jax
+
+# ======================================================================= #
+def get_function(equation):
+    """
+        Get the function handle of an equation, evaluated with jax.numpy as
+        jnp. Handles are reused for the same equation string.
+
+        equation: str, such as "lambda a, b : a*jnp.exp(b)"
+
+        Returns function handle
+    """
+    if equation not in equations.keys():
+        equations[equation] = eval(equation, {'jnp': get_jax().numpy, 'np': np})
+    return equations[equation]
+
+# ======================================================================= #
+@lru_cache(maxsize=256)
+def get_jacobian(fn, npar):
+    """
+        Get compiled jacobian of fn, vectorized over many sets of parameters.
+        Cached by function handle, such that each expression is compiled once.
+
+        fn: function handle with prototype fn(*par), returns scalar
+        npar: number of parameters
+
+        Returns function handle with prototype jac(par), with par an array of
+        shape (nsets, npar), returning array of shape (nsets, npar)
+    """
+    jax = get_jax()
+    jac = jax.jacfwd(lambda p: fn(*[p[i] for i in range(npar)]))
+    return jax.jit(jax.vmap(jac))
+
+# ======================================================================= #
 def get_derror(fn, par, err):
     """
         Propagate errors through a function with the Monte Carlo method
-        
+
         fn: function handle with prototype fn(*par), returns scalar
             note: the function must call jax.numpy functions, not numpy functions
         par: list of parameters passed to fn
         err: list of errors for each parameter (same length and order)
     """
-    
-    # get gradient functions
-    grad_fns = [jax.grad(fn, i) for i in range(len(par))]
-    
+    return float(get_derror_batch(fn, [par], [err])[0])
+
+# ======================================================================= #
+def get_derror_batch(fn, par, err):
+    """
+        Propagate errors through a function for many sets of parameters
+        (i.e. runs) in one call
+
+        fn: function handle with prototype fn(*par), returns scalar
+            note: the function must call jax.numpy functions, not numpy functions
+        par: 2D array of parameters passed to fn, shape (nsets, npar)
+        err: 2D array of errors for each parameter (same shape and order)
+
+        Returns 1D array of errors, one per parameter set
+    """
+
+    par = np.atleast_2d(np.asarray(par, dtype=float))
+    err = np.broadcast_to(np.asarray(err, dtype=float), par.shape)
+
+    if par.shape[0] == 0:
+        return np.zeros(0)
+
     # evaluate gradients
-    par = np.array(par, dtype=float)
-    grad_val = np.array([g(*par) for g in grad_fns])
-    
+    grad_val = np.asarray(get_jacobian(fn, par.shape[1])(par))
+
     # calculate error
-    err = np.sqrt(np.sum((grad_val*err)**2))
-    
-    return err
+    return np.sqrt(np.sum((grad_val*err)**2, axis=1))
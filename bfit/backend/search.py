@@ -3,6 +3,7 @@
 # Sep 2024
 
 from bdata import bdata
+from bfit.backend.RunIndex import RunIndex
 import numpy as np
 import mudpy as mp
 import pandas as pd
@@ -26,42 +27,261 @@ class searchable_bdata(bdata):
         else:
             return val
 
+class condition(object):
+    """Condition on run attributes for database.query. Conditions are combined
+    with & (and), | (or), and ~ (not), and are evaluated for all runs at once.
+
+    Example:
+        (condition('temperature', between=(10, 20)) |
+         condition('title', match=r'Pt\\d')) & ~condition('mode', eq='1f')
+
+    Args:
+        parname (str): name of attribute
+        case (bool): if False, string matches ignore case
+        eq, ne, lt, le, gt, ge: compare attribute to value
+        between (tuple): (low, high), attribute within range, inclusive
+        isin (iterable): attribute is one of these values
+        contains (str): attribute contains this substring
+        match (str): attribute matches this regular expression, anywhere
+    """
+
+    operators = ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'between', 'isin',
+                 'contains', 'match')
+
+    def __init__(self, parname=None, case=True, **tests):
+
+        for op in tests.keys():
+            if op not in self.operators:
+                raise RuntimeError(f'Bad search operator "{op}"')
+
+        self.parname = parname
+        self.case = case
+        self.tests = tests
+        self.logic = None       # 'and', 'or', 'not' for combined conditions
+        self.children = []
+
+    def _combine(self, logic, *children):
+        obj = condition()
+        obj.logic = logic
+        obj.children = list(children)
+        return obj
+
+    def __and__(self, other):
+        return self._combine('and', self, other)
+
+    def __or__(self, other):
+        return self._combine('or', self, other)
+
+    def __invert__(self):
+        return self._combine('not', self)
+
+    def get_parnames(self):
+        """Get names of all attributes used in the condition
+
+        Returns:
+            list: of str
+        """
+        if self.logic is None:
+            return [self.parname]
+        return [p for c in self.children for p in c.get_parnames()]
+
+    def evaluate(self, table):
+        """Find the runs which satisfy the condition
+
+        Args:
+            table (pd.DataFrame): attributes, one column per parname
+
+        Returns:
+            np.ndarray: of bool, one per row in table
+        """
+
+        if self.logic == 'and':
+            return self.children[0].evaluate(table) & self.children[1].evaluate(table)
+        elif self.logic == 'or':
+            return self.children[0].evaluate(table) | self.children[1].evaluate(table)
+        elif self.logic == 'not':
+            return ~self.children[0].evaluate(table)
+
+        values = table[self.parname]
+        idx = np.full(len(values), True)
+
+        for op, term in self.tests.items():
+
+            if op in ('contains', 'match'):
+                result = values.astype(str).str.contains(term, case=self.case,
+                                                         regex=op == 'match')
+            elif op == 'between':
+                result = values.between(*term)
+            elif op == 'isin':
+                result = values.isin(term)
+            else:
+                result = getattr(values, op)(term)
+
+            idx &= result.fillna(False).values.astype(bool)
+
+        return idx
+
 class database(object):
+    """Searchable set of runs. Header fields are read from a RunIndex, such that
+    searching on these does not open the run files. Other attributes are read
+    from the run files when first needed.
 
-    def __init__(self, runs=None, years=None):
+    Attributes:
+        table (pd.DataFrame): indexed fields, one row per run
+        data (np.ndarray): searchable_bdata objects, one per row in table
+    """
+
+    def __init__(self, runs=None, years=None, index=None, n_jobs=1):
         """Create object with searchable parameters in order to find runs
 
         Args:
             runs (iterable): list of runs to look into
             years (iterable): list of years to look into
+            index (RunIndex|str): index of header fields, or path to its file.
+                If None, use the default index
+            n_jobs (int): number of processes for reading new or changed runs
+                into the index
         """
 
+        self._data = {}
+        self.table = pd.DataFrame(columns=['year', 'run'])
+
         # get the data
         if runs is not None and years is not None:
-            self.data = []
-            for r in runs:
-                for y in years:
-                    try:
-                        self.data.append(searchable_bdata(r, y))
-                    except RuntimeError:
-                        pass
-            self.data = np.array(self.data)
+
+            if not isinstance(index, RunIndex):
+                index = RunIndex(index)
+
+            index.update(runs, years, n_jobs=n_jobs)
+            self.table = index.to_frame(runs, years)
+
+    @property
+    def data(self):
+        """Run file objects, read on first access"""
+        return np.array([self._get_bdata(r, y) for r, y in \
+                         zip(self.table['run'], self.table['year'])])
+
+    def _get_bdata(self, run, year):
+        """Get searchable_bdata object of a run, reading it if needed"""
+        key = (int(year), int(run))
+        if key not in self._data:
+            self._data[key] = searchable_bdata(int(run), int(year))
+        return self._data[key]
+
+    def get_attribute(self, parname):
+        """Get values of an attribute for all entries, from the index if
+        possible. Attributes read from the run files are added to the table,
+        such that they are read only once.
+
+        Args:
+            parname (str): name of parameter
+        Returns:
+            np.ndarray: corresponding to that parameter's values
+        """
+        if parname not in self.table.columns:
+            self.table[parname] = [self._get_bdata(r, y).get_attribute(parname) \
+                        for r, y in zip(self.table['run'], self.table['year'])]
+
+        return self.table[parname].values
+
+    def load(self, table=None):
+        """Read the run files
+
+        Args:
+            table (pd.DataFrame): runs to read, with columns run and year, as
+                from query. If None, read all runs in the database
+
+        Returns:
+            list: of searchable_bdata objects
+        """
+        if table is None:
+            table = self.table
+        return [self._get_bdata(r, y) for r, y in zip(table['run'], table['year'])]
+
+    def query(self, where=None, order_by=None, ascending=True, limit=None,
+              columns=None):
+        """Find runs satisfying a condition, without reading run files for
+        indexed attributes.
+
+        Args:
+            where (condition): runs must satisfy this. If None, get all runs
+            order_by (str|list): name(s) of attributes to sort by
+            ascending (bool|list): sort order for each of order_by
+            limit (int): max number of runs to return
+            columns (list): names of attributes to include in the output
+
+        Returns:
+            pd.DataFrame: with columns year, run, and those of order_by and
+                columns, one row per run found
+        """
+
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        order_by = list(order_by or [])
+        columns = list(columns or [])
+
+        for p in columns:
+            self.get_attribute(p)
+
+        table = self._find(where, order_by, ascending, limit)
+
+        # output columns
+        out = ['year', 'run']
+        out.extend(c for c in order_by + columns if c not in out)
+        return table[out].reset_index(drop=True)
+
+    def select(self, where=None, order_by=None, ascending=True, limit=None):
+        """Same as query, but return a database of the runs found, for chained
+        searches
+
+        Returns:
+            A copy of this object with a smaller database size
+        """
+
+        if isinstance(order_by, str):
+            order_by = [order_by]
+
+        obj = database()
+        obj.table = self._find(where, list(order_by or []), ascending, limit)
+        obj.table = obj.table.reset_index(drop=True)
+        obj._data = self._data
+
+        return obj
+
+    def _find(self, where, order_by, ascending, limit):
+        """Get rows of the table for query and select"""
+
+        # get attributes needed
+        parnames = where.get_parnames() if where is not None else []
+        for p in parnames + order_by:
+            self.get_attribute(p)
+
+        # search
+        table = self.table
+        if where is not None:
+            table = table[where.evaluate(table)]
+
+        if order_by:
+            table = table.sort_values(order_by, ascending=ascending, kind='stable')
+
+        if limit is not None:
+            table = table.iloc[:limit]
+
+        return table
 
     def get_runs(self):
         """Return a dataframe of runs and years for all entries in the database"""
 
-        runyear = np.zeros((len(self.data), 2), dtype=int)
-
-        for i, d in enumerate(self.data):
-            runyear[i, 0] = d.run
-            runyear[i, 1] = d.year
+        runyear = np.zeros((len(self.table), 2), dtype=int)
+        runyear[:, 0] = self.table['run'].values
+        runyear[:, 1] = self.table['year'].values
         return runyear
         # return pd.DataFrame({'run':runyear[:,0], 'year':runyear[:,1]}, dtype=int)
 
     def print_par(self, parname):
-        for d in self.data:
-            val = getattr(d, parname)
-            print(f'{d.year}  {d.run}  {val}')
+        for y, r, val in zip(self.table['year'], self.table['run'],
+                             self.get_attribute(parname)):
+            print(f'{y}  {r}  {val}')
 
     def search(self, parname, searchterm):
         """Do the search.
@@ -88,25 +308,15 @@ class database(object):
         else:
             raise RuntimeError('bad input')
 
-        # get the parameter
-        values = np.array([b.get_attribute(parname) for b in self.data])
-
-        # index of those that satisfy
-        idx = np.full(len(values), True)
+        # get the condition
+        tests = {}
         if low is not None:
-            idx *= values > low
+            tests['gt'] = low
 
         if high is not None:
-            idx *= values < high
+            tests['lt'] = high
 
         if substr is not None:
-            idx = np.array([substr in v for v in values])
-
-        # get those values
-        data = self.data[idx]
+            tests = {'contains': substr}
 
-        # make new object
-        obj = database()
-        obj.data = data
-
-        return obj
+        return self.select(condition(parname, **tests))
@@ -0,0 +1,221 @@
+# Vectorized Levenberg-Marquardt fitting of many data sets on a shared grid
+# Derek Fujimoto
+# Oct 2026
+
+import numpy as np
+
+# =========================================================================== #
+def batch_fitter(fn, x, y, dy, p0, bounds=None, fixed=None, max_iter=200,
+                 ftol=1e-10, xtol=1e-10):
+    """
+        Fit N data sets with a common x grid simultaneously and independently,
+        using a Levenberg-Marquardt minimizer vectorized over the data sets.
+        Each data set has its own damping factor and convergence flag, and
+        stops updating once converged.
+
+        fn:         function handle, or list of N function handles, with
+                    signature fn(x, *par). If a single function is given and it
+                    broadcasts over arrays of parameters then all data sets are
+                    evaluated in one call.
+        x:          1D array of shared x values, length nbins
+        y:          2D array of y values, shape (N, nbins)
+        dy:         2D array of y errors, shape (N, nbins)
+        p0:         2D array of initial parameters, shape (N, npar)
+        bounds:     2-tuple of (low, high) bounds, each broadcastable to
+                    (N, npar)
+        fixed:      boolean array broadcastable to (N, npar), if true the
+                    parameter is fixed to its p0 value
+        max_iter:   max number of iterations
+        ftol:       converged if the relative decrease in chisquared of an
+                    accepted step is below this value
+        xtol:       converged if the relative parameter step is below this
+                    value
+
+        Returns (par, cov, std, chi, success, niter)
+
+            par:        2D array of best fit parameters, shape (N, npar)
+            cov:        3D array of covariance matrices, NaN for fixed
+                        parameters, shape (N, npar, npar)
+            std:        2D array of parameter errors, shape (N, npar)
+            chi:        1D array of chisquared per degree of freedom
+            success:    1D array of bool, true if the fit converged
+            niter:      1D array of the number of iterations of each fit
+    """
+
+    # set up inputs
+    x = np.asarray(x, dtype=float)
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    dy = np.atleast_2d(np.asarray(dy, dtype=float))
+    p0 = np.atleast_2d(np.asarray(p0, dtype=float))
+    nsets, npar = p0.shape
+
+    if bounds is None:
+        bounds = (-np.inf, np.inf)
+    lo = np.broadcast_to(np.asarray(bounds[0], dtype=float), (nsets, npar))
+    hi = np.broadcast_to(np.asarray(bounds[1], dtype=float), (nsets, npar))
+
+    if fixed is None:
+        fixed = False
+    fixed = np.broadcast_to(np.asarray(fixed, dtype=bool), (nsets, npar))
+    free = ~fixed
+
+    # get model evaluation
+    model = _get_model(fn, x, p0)
+
+    # initial state
+    par = np.clip(p0, lo, hi)
+    res = (y-model(par, np.arange(nsets)))/dy
+    chisq = np.sum(np.square(res), axis=1)
+    jac = _get_jac(model, par, np.arange(nsets), lo, hi, fixed, dy)
+
+    lam = np.full(nsets, 1e-3)
+    active = np.ones(nsets, dtype=bool)
+    success = np.zeros(nsets, dtype=bool)
+    niter = np.zeros(nsets, dtype=int)
+    eye = np.eye(npar, dtype=bool)
+
+    for i in range(max_iter):
+
+        idx = np.where(active)[0]
+        if len(idx) == 0:
+            break
+        niter[idx] += 1
+
+        # normal equations
+        J = jac[idx]
+        A = np.einsum('nbi,nbj->nij', J, J)
+        g = np.einsum('nbi,nb->ni', J, res[idx])
+
+        # damping, with fixed parameters decoupled
+        diag = np.diagonal(A, axis1=1, axis2=2).copy()
+        diag[diag == 0] = 1
+        A = A + (lam[idx, None]*diag)[:, :, None]*eye
+        A[fixed[idx][:, :, None]*eye] = 1
+
+        # get step
+        try:
+            step = np.linalg.solve(A, g[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            step = np.einsum('nij,nj->ni', np.linalg.pinv(A), g)
+        step[fixed[idx]] = 0
+
+        # trial parameters
+        par_new = np.clip(par[idx]+step, lo[idx], hi[idx])
+        res_new = (y[idx]-model(par_new, idx))/dy[idx]
+        chisq_new = np.sum(np.square(res_new), axis=1)
+
+        # accept or reject step
+        accept = np.isfinite(chisq_new) & (chisq_new <= chisq[idx])
+        dchi = chisq[idx]-chisq_new
+        dpar = np.abs(par_new-par[idx])
+
+        acc = idx[accept]
+        par[acc] = par_new[accept]
+        res[acc] = res_new[accept]
+        chisq[acc] = chisq_new[accept]
+        lam[acc] /= 10
+        lam[idx[~accept]] *= 10
+
+        # convergence
+        converged = accept & ((dchi <= ftol*chisq_new) | \
+                    np.all(dpar <= xtol*(np.abs(par_new)+xtol), axis=1))
+        success[idx[converged]] = True
+        active[idx[converged]] = False
+
+        # stalled: stop, but without success
+        stalled = ~converged & (lam[idx] > 1e16)
+        active[idx[stalled]] = False
+
+        # update jacobian for moved, unconverged data sets
+        upd = idx[accept & ~converged]
+        if len(upd):
+            jac[upd] = _get_jac(model, par[upd], upd, lo[upd], hi[upd],
+                                fixed[upd], dy[upd])
+
+    # get errors from final jacobian
+    jac = _get_jac(model, par, np.arange(nsets), lo, hi, fixed, dy)
+    A = np.einsum('nbi,nbj->nij', jac, jac)
+    cov = np.full((nsets, npar, npar), np.nan)
+    for n in range(nsets):
+        f = free[n]
+        cov[n][np.ix_(f, f)] = np.linalg.pinv(A[n][np.ix_(f, f)])
+    std = np.diagonal(cov, axis1=1, axis2=2)**0.5
+
+    # chisquared
+    dof = y.shape[1]-np.sum(free, axis=1)
+    chi = chisq/dof
+
+    return (par, cov, std, chi, success, niter)
+
+# =========================================================================== #
+def _get_model(fn, x, p0):
+    """
+        Get function handle model(par, idx) which evaluates the model for each
+        row of par, with idx the data set index of each row. Returns 2D array
+        of shape (len(par), nbins).
+
+        A single function is evaluated for all rows in one call if it gives the
+        same result as evaluating each row separately at p0.
+    """
+    nsets = len(p0)
+
+    # one function for each data set
+    if callable(fn):
+        fns = [fn]*nsets
+    else:
+        fns = list(fn)
+        if all(f is fns[0] for f in fns):
+            fn = fns[0]
+
+    def model_loop(par, idx):
+        return np.array([fns[i](x, *p) for i, p in zip(idx, par)], dtype=float)
+
+    if not callable(fn):
+        return model_loop
+
+    # check if the function broadcasts over parameter arrays
+    def model_broadcast(par, idx):
+        out = fn(x[None, :], *(par.T[:, :, None]))
+        return np.broadcast_to(out, (len(par), len(x)))
+
+    idx = np.arange(nsets)
+    try:
+        with np.errstate(all='ignore'):
+            is_same = np.allclose(model_broadcast(p0, idx), model_loop(p0, idx),
+                                  equal_nan=True)
+    except Exception:
+        is_same = False
+
+    if is_same:
+        return model_broadcast
+    return model_loop
+
+# =========================================================================== #
+def _get_jac(model, par, idx, lo, hi, fixed, dy):
+    """
+        Get forward difference jacobian of the model, weighted by 1/dy.
+        Steps are reversed where the forward step would exceed the bounds.
+
+        Returns 3D array of shape (len(par), nbins, npar)
+    """
+
+    nrows, npar = par.shape
+
+    # step sizes
+    h = np.sqrt(np.finfo(float).eps)*np.maximum(np.abs(par), 1)
+    h[par+h > hi] *= -1
+
+    # stack all steps to evaluate in one call
+    par_step = np.repeat(par[None, :, :], npar, axis=0)
+    for j in range(npar):
+        par_step[j, :, j] += h[:, j]
+    par_step = par_step.reshape(-1, npar)
+
+    f0 = model(par, idx)
+    f1 = model(par_step, np.tile(idx, npar)).reshape(npar, nrows, -1)
+
+    jac = (f1-f0[None, :, :])/h.T[:, :, None]
+    jac = np.moveaxis(jac, 0, 2)/dy[:, :, None]
+    jac[np.broadcast_to(fixed[:, None, :], jac.shape)] = 0
+
+    return jac
@@ -9,13 +9,16 @@ from scipy.optimize import curve_fit
 from tqdm import tqdm
 from bfit.fitting.global_bdata_fitter import global_bdata_fitter
 from bfit.fitting.minuit import minuit
-import inspect
+from bfit.fitting.batch_fitter import batch_fitter
+import inspect, multiprocessing, time, traceback, warnings
 
 # ========================================================================== #
 def fit_bdata(data, fn, omit=None, rebin=None, slr_bkgd_corr=None, shared=None, hist_select='',
-              xlims=None, asym_mode='c', fixed=None, minimizer='migrad', **kwargs):
+              xlims=None, asym_mode='c', fixed=None, minimizer='migrad', n_jobs=1,
+              max_nfcn=None, max_time=None, **kwargs):
     """
-        Fit combined asymetry from bdata.
+        Fit combined asymetry from bdata. See iter_fit_bdata to get the results
+        of each run as they are fitted.
 
         data:           list of bdata objects (or single object)
 
@@ -57,7 +60,33 @@ def fit_bdata(data, fn, omit=None, rebin=None, slr_bkgd_corr=None, shared=None,
                         parameters omitted. Can be a list of lists with one list
                         for each run.
 
-        minimizer       string. One of "migrad", "minos", "trf", "dogbox"
+        minimizer       string. One of "migrad", "minos", "trf", "dogbox",
+                        "sparse", "alternating", "batch". "sparse" uses the
+                        block-sparse jacobian of the shared fit, "alternating"
+                        fits the shared and run-wise parameters in turn. Both
+                        are equivalent to "trf" for runs fitted individually.
+                        "batch" fits runs with identical x values together
+                        with a vectorized Levenberg-Marquardt minimizer, and is
+                        equivalent to "trf" for shared fits.
+
+        n_jobs:         int, number of processes used to fit the runs when
+                        there are no shared parameters. Each run's asymmetry
+                        is calculated and fitted in a separate process, and
+                        the results are returned in the order of data. A run
+                        which fails to fit is reported and its outputs set
+                        to NaN; the remaining runs are unaffected. Not used by
+                        the "batch" minimizer.
+
+        max_nfcn:       int, max number of function calls for each run
+        max_time:       float, max wall time in seconds for each run
+
+                        Budget for runs fitted independently, not used by the
+                        "batch" minimizer. If a run with "migrad" or "minos"
+                        exceeds the budget while finding errors with MINOS,
+                        the errors are instead found with HESSE. If it exceeds
+                        the budget otherwise, it is refitted with "trf". Each
+                        of these fallbacks has its own budget of the same size.
+                        A run which exceeds all budgets fails.
 
         kwargs:         keyword arguments for curve_fit/minuit.
                         See curve_fit/iminuit docs.
@@ -71,6 +100,134 @@ def fit_bdata(data, fn, omit=None, rebin=None, slr_bkgd_corr=None, shared=None,
             gchi:   global chisquared of fits
     """
 
+    try:
+        ndata = len(data)
+    except TypeError:
+        data = [data]
+        ndata = 1
+
+    is_shared = shared is not None and any(shared) and ndata>1
+
+    pars = [None]*ndata
+    covs = [None]*ndata
+    chis = [None]*ndata
+    stds_l = [None]*ndata
+    stds_h = [None]*ndata
+    failed = []
+    gchi = 0.
+    dof = 0.
+
+    iter_obj = iter_fit_bdata(data, fn, omit=omit, rebin=rebin,
+                              slr_bkgd_corr=slr_bkgd_corr, shared=shared,
+                              hist_select=hist_select, xlims=xlims,
+                              asym_mode=asym_mode, fixed=fixed,
+                              minimizer=minimizer, n_jobs=n_jobs,
+                              max_nfcn=max_nfcn, max_time=max_time, **kwargs)
+
+    if is_shared:
+        print('Running shared parameter fitting... ', flush=True)
+    else:
+        iter_obj = tqdm(iter_obj, total=ndata, desc='Independent Fitting')
+
+    for i, p, sl, sh, c, ch, diagnostics in iter_obj:
+
+        # failed fit: report and continue
+        if diagnostics['error'] is not None:
+            errmsg = 'Fit failed for run %s: %s' % (_get_run_id(data[i]),
+                                                   diagnostics['error'])
+            tqdm.write(errmsg)
+            warnings.warn(errmsg)
+            failed.append(errmsg)
+
+        # bad minimum
+        if diagnostics['message'] is not None:
+            try:
+                tqdm.write(diagnostics['message'])
+            except UnicodeEncodeError:
+                tqdm.write(diagnostics['message'].encode('ascii',
+                                                'backslashreplace').decode())
+
+        # outputs
+        pars[i] = p
+        covs[i] = c
+        stds_l[i] = sl
+        stds_h[i] = sh
+        chis[i] = ch
+
+        # get global chi
+        gchi += diagnostics['chisq']
+        dof += diagnostics['dof']
+
+    if is_shared:
+        gchi = diagnostics['gchi']
+        print('done.', flush=True)
+
+    else:
+
+        # all fits failed
+        if len(failed) == ndata:
+            raise RuntimeError('\n'.join(failed))
+
+        gchi /= dof
+
+    try:    pars = np.asarray(pars)
+    except ValueError: pass
+
+    try:    covs = np.asarray(covs)
+    except ValueError: pass
+
+    try:    stds_l = np.asarray(stds_l)
+    except ValueError: pass
+
+    try:    stds_h = np.asarray(stds_h)
+    except ValueError: pass
+
+    try:    chis = np.asarray(chis)
+    except ValueError: pass
+
+    # single data set fitting
+    if ndata == 1:
+        pars = pars[0]
+        stds_l = stds_l[0]
+        stds_h = stds_h[0]
+        covs = covs[0]
+        chis = chis[0]
+
+    return(pars, stds_l, stds_h, covs, chis, gchi)
+
+# ========================================================================== #
+def iter_fit_bdata(data, fn, omit=None, rebin=None, slr_bkgd_corr=None, shared=None,
+                   hist_select='', xlims=None, asym_mode='c', fixed=None,
+                   minimizer='migrad', n_jobs=1, max_nfcn=None, max_time=None,
+                   **kwargs):
+    """
+        Fit combined asymetry from bdata, yielding the result of each run as
+        soon as it is fitted. Inputs are the same as fit_bdata.
+
+        Runs fitted independently are yielded in the order in which they
+        finish. Runs with shared parameters are yielded together once the
+        global fit is done. Closing the generator stops any ongoing fits.
+
+        Yields: (i, par, std_l, std_h, cov, chi, diagnostics)
+            i:              index of the run in data
+            par:            array of best fit parameters
+            std_l:          array of lower best fit errors
+            std_h:          array of upper best fit errors
+            cov:            2D array, covariance matrix
+            chi:            chisquare of the fit
+            diagnostics:    dict with keys
+                                chisq:      unnormalized chisquared
+                                dof:        degrees of freedom
+                                message:    summary of a bad minimum, or None
+                                error:      reason for a failed fit, or None.
+                                            Failed fits have NaN outputs.
+                                fallback:   None, or the fallback strategy
+                                            used if the fit exceeded its
+                                            budget ("hesse" or "trf")
+                            and for shared fits
+                                gchi:       global chisquared
+    """
+
     try:
         ndata = len(data)
     except TypeError:
@@ -124,7 +281,6 @@ def fit_bdata(data, fn, omit=None, rebin=None, slr_bkgd_corr=None, shared=None,
 
     # fit globally -----------------------------------------------------------
     if any(shared) and ndata>1:
-        print('Running shared parameter fitting... ', flush=True)
         g = global_bdata_fitter(data = data,
                                 fn = fn,
                                 xlims = xlims,
@@ -135,170 +291,105 @@ def fit_bdata(data, fn, omit=None, rebin=None, slr_bkgd_corr=None, shared=None,
                                 slr_bkgd_corr=slr_bkgd_corr
                                 )
 
+        # no batching of shared parameters
+        if minimizer == 'batch':
+            minimizer = 'trf'
+
         g.fit(minimizer=minimizer, **kwargs)
         gchi, chis = g.get_chi() # returns global chi, individual chi squared
         pars, stds_l, stds_h, covs = g.get_par()
 
-        print('done.', flush=True)
+        for i in range(ndata):
+            diagnostics = {'chisq':0., 'dof':0, 'message':None, 'error':None,
+                           'fallback':None, 'gchi':gchi}
+            yield (i, pars[i], stds_l[i], stds_h[i], covs[i], chis[i],
+                   diagnostics)
+        return
 
     # fit runs individually --------------------------------------------------
+
+    # get bounds
+    if 'bounds' in kwargs.keys():
+        bounds = kwargs['bounds']
+        del kwargs['bounds']
+
+        # expand bounds if not one for every list value
+        if len(bounds) != ndata:
+            bounds = [bounds]*ndata
+
     else:
+        bounds = [(-np.inf, np.inf)]*ndata
 
-        # get bounds
-        if 'bounds' in kwargs.keys():
-            bounds = kwargs['bounds']
-            del kwargs['bounds']
-
-            # expand bounds if not one for every list value
-            if len(bounds) != ndata:
-                bounds = [bounds]*ndata
-
-        else:
-            bounds = [(-np.inf, np.inf)]*ndata
-
-        # check p0 dimensionality
-        if len(np.asarray(kwargs['p0']).shape) < 2:
-            p0 = [kwargs['p0']]*ndata
-        else:
-            p0 = kwargs['p0']
-
-        # check xlims shape - should match number of runs
-        if xlims is None:
-            xlims = [None]*ndata
-        elif len(np.asarray(xlims).shape) < 2:
-            xlims = [xlims for i in range(ndata)]
-        else:
-            xlims = list(xlims)
-            xlims.extend([xlims[-1] for i in range(ndata-len(xlims))])
-
-        # check fixed shape
-        if fixed is not None:
-            fixed = np.asarray(fixed)
-            if len(fixed.shape) < 2:
-                fixed = [fixed]*ndata
-        else:
-            fixed = [[False]*npar]*ndata
-
-        pars = []
-        covs = []
-        chis = []
-        stds_l = []
-        stds_h = []
-        gchi = 0.
-        dof = 0.
-
-        iter_obj = tqdm(zip(data, fn, omit, rebin, p0, bounds, xlims, fixed, slr_bkgd_corr),
-                        total=ndata, desc='Independent Fitting')
-        for d, f, om, re, p, b, xl, fix, bkgd in iter_obj:
-
-            # get data for chisq calculations
-            x, y, dy = _get_asym(d, asym_mode, rebin=re, omit=om, slr_bkgd_corr=bkgd)
-
-            # get x limits
-            if xl is None:
-                xl = [-np.inf, np.inf]
-            else:
-                if xl[0] is None: xl[0] = -np.inf
-                if xl[1] is None: xl[1] = np.inf
-
-            # get good data
-            idx = (xl[0]<x)*(x<xl[1])*(dy!=0)
-            x = x[idx]
-            y = y[idx]
-            dy = dy[idx]
-
-            # trivial case: all parameters fixed
-            if all(fix):
-                lenp = len(p)
-                c = np.full((lenp, lenp), np.nan)
-                s = np.diag(c)
-                ch = np.sum(np.square((y-f(x, *p))/dy))/len(y)
-
-            # fit with free parameters
-            else:
-                kwargs['p0'] = p
-                kwargs['bounds'] = b
-                p, c, sl, sh, ch, m = _fit_single(data=d,
-                                                fn=f,
-                                                omit=om,
-                                                rebin=re,
-                                                hist_select=hist_select,
-                                                xlim=xl,
-                                                asym_mode=asym_mode,
-                                                fixed=fix,
-                                                slr_bkgd_corr=bkgd,
-                                                minimizer=minimizer,
-                                                **kwargs)
-
-                # check minuit validity
-                if m is not None:
-
-                    if not all((m.fmin.is_valid,
-                                m.fmin.has_valid_parameters,
-                                not m.fmin.hesse_failed,
-                                m.fmin.has_accurate_covar,
-                                m.fmin.has_covariance,
-                                m.fmin.has_posdef_covar,
-                                not m.fmin.has_made_posdef_covar,
-                                not m.fmin.has_reached_call_limit,
-                                not m.fmin.is_above_max_edm,
-                                )):
-
-                        try:
-                            msg = ('====== %d.%d ======\n' % (d.year, d.run),
-                               str(m.fmin), '\n',
-                               str(m.params), '\n',
-                               )
-
-                            iter_obj.write(''.join(msg))
-                        except UnicodeEncodeError:
-                            msg = ('====== %d.%d ======\n' % (d.year, d.run),
-                               repr(m.fmin), '\n',
-                               repr(m.params), '\n',
-                               )
-                            iter_obj.write(''.join(msg))
-
-            # outputs
-            pars.append(p)
-            covs.append(c)
-            stds_l.append(sl)
-            stds_h.append(sh)
-            chis.append(ch)
-
-            # get global chi
-            gchi += np.sum(np.square((y-f(x, *p))/dy))
-            dof += len(x)-len(p)
-        gchi /= dof
+    # check p0 dimensionality
+    if len(np.asarray(kwargs['p0']).shape) < 2:
+        p0 = [kwargs['p0']]*ndata
+    else:
+        p0 = kwargs['p0']
 
-    try:    pars = np.asarray(pars)
-    except ValueError: pass
+    # check xlims shape - should match number of runs
+    if xlims is None:
+        xlims = [None]*ndata
+    elif len(np.asarray(xlims).shape) < 2:
+        xlims = [xlims for i in range(ndata)]
+    else:
+        xlims = list(xlims)
+        xlims.extend([xlims[-1] for i in range(ndata-len(xlims))])
 
+    # check fixed shape
+    if fixed is not None:
+        fixed = np.asarray(fixed)
+        if len(fixed.shape) < 2:
+            fixed = [fixed]*ndata
+    else:
+        fixed = [[False]*npar]*ndata
+
+    # set up the fits
+    budget = (max_nfcn, max_time)
+    jobs = [(d, f, om, re, p, b, xl, fix, bkgd, asym_mode, hist_select,
+             minimizer, budget, kwargs) for d, f, om, re, p, b, xl, fix, bkgd in \
+            zip(data, fn, omit, rebin, p0, bounds, xlims, fixed, slr_bkgd_corr)]
+
+    # fit all runs together
+    if minimizer == 'batch':
+        pool = None
+        results = enumerate(_fit_batch(jobs))
+
+    # fit in parallel, results in the order they finish
+    elif n_jobs > 1 and ndata > 1:
+        pool = multiprocessing.get_context('fork').Pool(min(n_jobs, ndata),
+                            initializer = _set_pool_jobs,
+                            initargs = (jobs, ))
+        results = pool.imap_unordered(_fit_run_from_pool, range(ndata))
 
-    try:    covs = np.asarray(covs)
-    except ValueError: pass
+    else:
+        pool = None
+        results = ((i, _try_fit_run(job)) for i, job in enumerate(jobs))
 
-    try:    stds_l = np.asarray(stds_l)
-    except ValueError: pass
+    try:
+        for i, (output, errmsg) in results:
 
-    try:    stds_h = np.asarray(stds_h)
-    except ValueError: pass
+            # failed fit
+            if errmsg is not None:
+                lenp = len(p0[i])
+                nan = np.full(lenp, np.nan)
+                output = (nan, np.full((lenp, lenp), np.nan), nan, nan,
+                          np.nan, 0., 0, None, None)
 
-    try:    chis = np.asarray(chis)
-    except ValueError: pass
+            p, c, sl, sh, ch, chisq, dof, msg, fallback = output
+            diagnostics = {'chisq':chisq, 'dof':dof, 'message':msg,
+                           'error':errmsg, 'fallback':fallback}
 
-    # single data set fitting
-    if ndata == 1:
-        pars = pars[0]
-        stds_l = stds_l[0]
-        stds_h = stds_h[0]
-        covs = covs[0]
-        chis = chis[0]
+            yield (i, p, sl, sh, c, ch, diagnostics)
 
-    return(pars, stds_l, stds_h, covs, chis, gchi)
+    # stop unfinished fits if closed early
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
 
 # =========================================================================== #
 def _fit_single(data, fn, omit='', rebin=1, slr_bkgd_corr=True, hist_select='', xlim=None, asym_mode='c',
-               fixed=None, minimizer='migrad', **kwargs):
+               fixed=None, minimizer='migrad', max_nfcn=None, max_time=None, **kwargs):
     """
         Fit combined asymetry from bdata.
 
@@ -331,14 +422,22 @@ def _fit_single(data, fn, omit='', rebin=1, slr_bkgd_corr=True, hist_select='',
                         parameters in order presented, with the fixed
                         parameters omitted.
 
-        minimizer       string. One of "migrad", "minos", "trf", "dogbox"
+        minimizer       string. One of "migrad", "minos", "trf", "dogbox", "sparse",
+                        "alternating", "batch"
+
+        max_nfcn:       max number of function calls, see fit_bdata
+        max_time:       max wall time in seconds, see fit_bdata
 
         kwargs:         keyword arguments for curve_fit. See curve_fit docs.
 
-        Returns: (par, cov, chi)
-            par: best fit parameters
-            cov: covariance matrix
-            chi: chisquared of fit
+        Returns: (par, cov, std_l, std_h, chi, m, fallback)
+            par:        best fit parameters
+            cov:        covariance matrix
+            std_l:      lower errors
+            std_h:      upper errors
+            chi:        chisquared of fit
+            m:          minuit object, or None
+            fallback:   None, "hesse", or "trf" if the budget was exceeded
     """
 
     # Get data input
@@ -365,22 +464,51 @@ def _fit_single(data, fn, omit='', rebin=1, slr_bkgd_corr=True, hist_select='',
                                'Define p0 to resolve.')
         kwargs['p0'] = np.ones(nargs)
 
+    budget = _fit_budget(max_nfcn, max_time)
+    fallback = None
+
     # Fit the function
     if minimizer in ("migrad", "minos"):
-        par, cov, stdl, stdh, chi, m = _fit_single_minuit(fn, x, y, dy, fixed,
+        try:
+            par, cov, stdl, stdh, chi, m, fallback = _fit_single_minuit(fn, x,
+                                                          y, dy, fixed,
                                                           'minos' in minimizer,
+                                                          budget=budget,
                                                           **kwargs)
-    elif minimizer in ('trf', 'dogbox'):
+
+        # over budget: refit with trf
+        except FitBudgetExceeded:
+            fallback = 'trf'
+            budget.reset()
+            kwargs_cf = {'p0':kwargs['p0'],
+                         'bounds':[np.copy(b) for b in kwargs['bounds']]}
+            par, cov, stdl, stdh, chi = _fit_single_curve_fit(fn, x, y, dy,
+                                                    fixed, 'trf',
+                                                    budget=budget,
+                                                    **kwargs_cf)
+            m = None
+
+    elif minimizer in ('trf', 'dogbox', 'sparse', 'alternating', 'batch'):
+
+        # no shared parameters to exploit for a single run
+        if minimizer in ('sparse', 'alternating', 'batch'):
+            minimizer = 'trf'
+
         par, cov, stdl, stdh, chi = _fit_single_curve_fit(fn, x, y, dy, fixed,
-                                                          minimizer, **kwargs)
+                                                          minimizer,
+                                                          budget=budget,
+                                                          **kwargs)
         m = None
 
-    return (par, cov, stdl, stdh, chi, m)
+    return (par, cov, stdl, stdh, chi, m, fallback)
 
 # =========================================================================== #
-def _fit_single_minuit(fn, x, y, dy, fixed, do_minos=True, **kwargs):
+def _fit_single_minuit(fn, x, y, dy, fixed, do_minos=True, budget=None, **kwargs):
     """
         Fit data with minuit minimizer
+
+        budget: _fit_budget, raise FitBudgetExceeded if exceeded in migrad or
+                hesse. If exceeded in minos, errors are found with hesse instead.
     """
 
     # set up minuit inputs
@@ -400,10 +528,14 @@ def _fit_single_minuit(fn, x, y, dy, fixed, do_minos=True, **kwargs):
     else:
         kwargs_minuit['name'] = name
 
-    m = minuit(fn, x, y, dy, **kwargs_minuit)
+    if budget is None:
+        budget = _fit_budget()
+
+    m = minuit(budget.wrap(fn), x, y, dy, **kwargs_minuit)
     m.migrad()
 
     # get errors
+    fallback = None
     if do_minos:
         try:
             m.minos()
@@ -416,6 +548,14 @@ def _fit_single_minuit(fn, x, y, dy, fixed, do_minos=True, **kwargs):
             upper = [mupper[names.index(p)] if not m.fixed[p] else 0 for p in m.parameters]
 
 
+        # over budget: fall back to hesse
+        except FitBudgetExceeded:
+            fallback = 'hesse'
+            budget.reset()
+            m.hesse()
+            err = m.errors
+            lower, upper = (err, err)
+
         except RuntimeError as errmsg: # migrad did not converge
             print(errmsg)
             err = m.errors
@@ -436,14 +576,19 @@ def _fit_single_minuit(fn, x, y, dy, fixed, do_minos=True, **kwargs):
     dof = len(y) - len(kwargs['p0'])
     chi = m.fval/dof
 
-    return (par, cov, lower, upper, chi, m)
+    return (par, cov, lower, upper, chi, m, fallback)
 
 # =========================================================================== #
-def _fit_single_curve_fit(fn, x, y, dy, fixed, minimizer, **kwargs):
+def _fit_single_curve_fit(fn, x, y, dy, fixed, minimizer, budget=None, **kwargs):
     """
         Fit data with curve_fit minimizers
+
+        budget: _fit_budget, raise FitBudgetExceeded if exceeded
     """
 
+    if budget is None:
+        budget = _fit_budget()
+
     # fixed parameters
     did_fixed = False
     if fixed is not None and any(fixed):
@@ -465,7 +610,7 @@ def _fit_single_curve_fit(fn, x, y, dy, fixed, minimizer, **kwargs):
         if bounds is not None:  kwargs['bounds'] = bounds
 
     # do the fit
-    par, cov = curve_fit(fn, x, y, sigma=dy, absolute_sigma=True,
+    par, cov = curve_fit(budget.wrap(fn), x, y, sigma=dy, absolute_sigma=True,
                         method=minimizer, **kwargs)
     dof = len(y) - len(kwargs['p0'])
 
@@ -492,6 +637,297 @@ def _fit_single_curve_fit(fn, x, y, dy, fixed, minimizer, **kwargs):
 
     return (par, cov, std, std, chi)
 
+# =========================================================================== #
+def _fit_run(data, fn, omit, rebin, p0, bounds, xlim, fixed, slr_bkgd_corr,
+             asym_mode, hist_select, minimizer, budget, kwargs):
+    """
+        Fit a single run as part of an independent fit.
+
+        budget: (max_nfcn, max_time)
+
+        Returns (par, cov, std_l, std_h, chi, chisq, dof, msg, fallback) where
+        chisq is the unnormalized chisquared, msg is a summary of the minuit
+        minimum if it is not valid or of the fallback if the budget was
+        exceeded, else None, and fallback is the fallback strategy, else None
+    """
+
+    # get data for chisq calculations
+    x, y, dy, xlim = _get_fit_asym(data, asym_mode, omit, rebin, slr_bkgd_corr,
+                                   xlim)
+
+    msg = None
+    fallback = None
+
+    # trivial case: all parameters fixed
+    if all(fixed):
+        lenp = len(p0)
+        c = np.full((lenp, lenp), np.nan)
+        sl = np.diag(c)
+        sh = sl
+        ch = np.sum(np.square((y-fn(x, *p0))/dy))/len(y)
+        p = p0
+
+    # fit with free parameters
+    else:
+        kwargs = dict(kwargs)
+        kwargs['p0'] = p0
+        kwargs['bounds'] = bounds
+        kwargs['max_nfcn'], kwargs['max_time'] = budget
+        p, c, sl, sh, ch, m, fallback = _fit_single(data=data,
+                                          fn=fn,
+                                          omit=omit,
+                                          rebin=rebin,
+                                          hist_select=hist_select,
+                                          xlim=xlim,
+                                          asym_mode=asym_mode,
+                                          fixed=fixed,
+                                          slr_bkgd_corr=slr_bkgd_corr,
+                                          minimizer=minimizer,
+                                          **kwargs)
+
+        # mark results from fallback
+        if fallback is not None:
+            msg = '====== %s ======\nFit budget exceeded, %s\n' % \
+                    (_get_run_id(data), _fallback_messages[fallback])
+
+        # check minuit validity
+        if m is not None:
+
+            if not all((m.fmin.is_valid,
+                        m.fmin.has_valid_parameters,
+                        not m.fmin.hesse_failed,
+                        m.fmin.has_accurate_covar,
+                        m.fmin.has_covariance,
+                        m.fmin.has_posdef_covar,
+                        not m.fmin.has_made_posdef_covar,
+                        not m.fmin.has_reached_call_limit,
+                        not m.fmin.is_above_max_edm,
+                        )):
+
+                msg = ''.join(('====== %s ======\n' % _get_run_id(data),
+                               str(m.fmin), '\n',
+                               str(m.params), '\n',
+                               ))
+
+            # minuit outputs to arrays
+            p = np.asarray(p)
+            sl = np.asarray(sl)
+            sh = np.asarray(sh)
+            if c is not None:
+                c = np.asarray(c)
+
+    chisq = np.sum(np.square((y-fn(x, *p))/dy))
+    dof = len(x)-len(p)
+
+    return (p, c, sl, sh, ch, chisq, dof, msg, fallback)
+
+# =========================================================================== #
+def _get_fit_asym(data, asym_mode, omit, rebin, slr_bkgd_corr, xlim):
+    """
+        Get asymmetry within the x limits, omitting points with zero error.
+
+        Returns (x, y, dy, xlim) with the None values of xlim replaced by inf
+    """
+
+    x, y, dy = _get_asym(data, asym_mode, rebin=rebin, omit=omit,
+                         slr_bkgd_corr=slr_bkgd_corr)
+
+    # get x limits
+    if xlim is None:
+        xlim = [-np.inf, np.inf]
+    else:
+        xlim = list(xlim)
+        if xlim[0] is None: xlim[0] = -np.inf
+        if xlim[1] is None: xlim[1] = np.inf
+
+    # get good data
+    idx = (xlim[0]<x)*(x<xlim[1])*(dy!=0)
+    x = x[idx]
+    y = y[idx]
+    dy = dy[idx]
+
+    return (x, y, dy, xlim)
+
+# =========================================================================== #
+def _fit_batch(jobs):
+    """
+        Fit runs independently with the vectorized Levenberg-Marquardt
+        minimizer, fitting runs with identical x values and number of
+        parameters together.
+
+        jobs: list of inputs to _fit_run
+
+        Returns list of (output, errmsg) as from _try_fit_run, in the order of
+        jobs.
+    """
+
+    results = [None]*len(jobs)
+    groups = {}
+    asyms = {}
+
+    # get data and group runs
+    for i, job in enumerate(jobs):
+        d, f, om, re, p, b, xl, fix, bkgd, asym_mode = job[:10]
+
+        # trivial case: all parameters fixed
+        if all(fix):
+            results[i] = _try_fit_run(job)
+            continue
+
+        try:
+            x, y, dy, _ = _get_fit_asym(d, asym_mode, om, re, bkgd, xl)
+        except Exception as err:
+            traceback.print_exc()
+            results[i] = (None, '%s: %s' % (type(err).__name__, str(err)))
+            continue
+
+        asyms[i] = (x, y, dy)
+        key = (len(p), len(x), x.tobytes())
+        groups.setdefault(key, []).append(i)
+
+    # options for the minimizer
+    kwargs = jobs[0][-1] if jobs else {}
+    options = {k:kwargs[k] for k in ('max_iter', 'ftol', 'xtol') if k in kwargs}
+
+    # fit each group
+    for idx in groups.values():
+
+        x = asyms[idx[0]][0]
+        y = np.array([asyms[i][1] for i in idx])
+        dy = np.array([asyms[i][2] for i in idx])
+        fn = [jobs[i][1] for i in idx]
+        p0 = np.array([jobs[i][4] for i in idx], dtype=float)
+        fixed = np.array([jobs[i][7] for i in idx], dtype=bool)
+
+        npar = p0.shape[1]
+        lo = np.array([np.broadcast_to(np.asarray(jobs[i][5][0], dtype=float), npar)
+                       for i in idx])
+        hi = np.array([np.broadcast_to(np.asarray(jobs[i][5][1], dtype=float), npar)
+                       for i in idx])
+
+        try:
+            par, cov, std, chi, success, niter = batch_fitter(fn, x, y, dy, p0,
+                                                        bounds=(lo, hi),
+                                                        fixed=fixed,
+                                                        **options)
+        except Exception as err:
+            traceback.print_exc()
+            for i in idx:
+                results[i] = (None, '%s: %s' % (type(err).__name__, str(err)))
+            continue
+
+        # outputs for each run
+        chisq = np.sum(np.square((y-np.array([f(x, *p) for f, p in zip(fn, par)]))/dy),
+                       axis=1)
+        dof = len(x)-npar
+
+        for j, i in enumerate(idx):
+            msg = None
+            if not success[j]:
+                head = '====== %s ======\n' % _get_run_id(jobs[i][0])
+                msg = '%sBatch fit did not converge in %d iterations\n' % \
+                        (head, niter[j])
+
+            results[i] = ((par[j], cov[j], std[j], std[j], chi[j], chisq[j],
+                           dof, msg, None), None)
+
+    return results
+
+# =========================================================================== #
+def _try_fit_run(job):
+    """
+        Fit a single run, catching errors.
+
+        Returns (output, errmsg) where output is as from _fit_run, or None if
+        the fit failed, and errmsg is None or a string describing the failure
+    """
+    try:
+        return (_fit_run(*job), None)
+    except Exception as err:
+        traceback.print_exc()
+        return (None, '%s: %s' % (type(err).__name__, str(err)))
+
+# =========================================================================== #
+# worker process inputs, inherited on fork so that data need not be pickled
+_pool_jobs = None
+
+def _set_pool_jobs(jobs):
+    """
+        Set the list of fitting inputs for the pool workers
+    """
+    global _pool_jobs
+    _pool_jobs = jobs
+
+def _fit_run_from_pool(i):
+    """
+        Fit the ith run from the pool inputs, returns (i, output)
+    """
+    return (i, _try_fit_run(_pool_jobs[i]))
+
+# =========================================================================== #
+# describe results for each fallback strategy
+_fallback_messages = {'hesse': 'errors from HESSE',
+                      'trf': 'refit with trf'}
+
+class FitBudgetExceeded(RuntimeError):
+    """
+        Raised when a fit exceeds its function call or time budget
+    """
+
+class _fit_budget(object):
+    """
+        Count calls to the fit function, raising FitBudgetExceeded if too many
+        calls are made or too much time elapses.
+
+        max_nfcn:   max number of function calls, None for no limit
+        max_time:   max time in seconds, None for no limit
+        nfcn:       number of function calls since reset
+        start:      time of last reset
+    """
+
+    def __init__(self, max_nfcn=None, max_time=None):
+        self.max_nfcn = max_nfcn
+        self.max_time = max_time
+        self.reset()
+
+    def reset(self):
+        """Restart the count and timer"""
+        self.nfcn = 0
+        self.start = time.perf_counter()
+
+    def check(self):
+        """Count a function call and check the budget"""
+        self.nfcn += 1
+
+        if self.max_nfcn is not None and self.nfcn > self.max_nfcn:
+            raise FitBudgetExceeded('Exceeded %d function calls' % self.max_nfcn)
+
+        if self.max_time is not None and \
+                time.perf_counter()-self.start > self.max_time:
+            raise FitBudgetExceeded('Exceeded %g s' % self.max_time)
+
+    def wrap(self, fn):
+        """Get fn with calls counted against the budget"""
+
+        # no limits
+        if self.max_nfcn is None and self.max_time is None:
+            return fn
+
+        def fn_budget(x, *par):
+            self.check()
+            return fn(x, *par)
+        return fn_budget
+
+# =========================================================================== #
+def _get_run_id(data):
+    """
+        Get run identifier string as year.run
+    """
+    try:
+        return '%d.%d' % (data.year, data.run)
+    except (AttributeError, TypeError):
+        return str(data)
+
 # =========================================================================== #
 def _get_asym(data, asym_mode, **asym_kwargs):
     """
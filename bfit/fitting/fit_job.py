@@ -0,0 +1,330 @@
+# Run fits from a job file without the gui
+# Derek Fujimoto
+# Oct 2026
+
+from bdata import bdata, bmerged
+from bfit.global_variables import __version__
+from bfit.backend.FitResults import FitResults, write_frame
+from bfit import logger_name
+import numpy as np
+import pandas as pd
+import importlib
+import datetime
+import logging
+import yaml
+
+# asymmetry types which can be fitted, as labelled in the gui
+asym_modes = {'Combined Helicity'   :'c',
+              'Positive Helicity'   :'p',
+              'Negative Helicity'   :'n',
+              'Combined Hel Slopes' :'sl_c',
+              'Combined Hel Diff'   :'dif_c',
+              }
+
+# default job settings, with the same keys as the gui save_state
+job_defaults = {'minimizer':                'bfit.fitting.fitter_curve_fit',
+                'probe_species':            'Li8',
+                'fit_n_jobs':               1,
+                'fit_max_nfcn':             0,
+                'fit_max_time':             0,
+                'deadtime':                 0,
+                'deadtime_switch':          False,
+                'deadtime_global':          False,
+                'hist_select':              '',
+                'use_nbm':                  False,
+                'correct_bkgd':             True,
+                'fit_asym_type':            'Combined Helicity',
+                'fit_n_component':          1,
+                'fit_use_rebin':            False,
+                'fit_xlo':                  '-inf',
+                'fit_xhi':                  'inf',
+                'fitpar':                   {},
+                }
+
+# =========================================================================== #
+class jobdata(object):
+    """
+        Stand-in for fitdata when fitting without the gui: bdata object with
+        the asymmetry options of a job.
+
+        bd:             bdata or bmerged object
+        id:             str, run key
+        rebin:          int, rebinning factor
+        omit:           str, bins to omit in 1F calcs
+        omit_scan:      bool, omit incomplete scans
+        base_bins:      int, number of bins for baseline correction in scans
+        flip_asym:      bool, invert the asymmetry
+        constrained:    dict, always empty
+        options:        dict of job settings (deadtime, deadtime_switch,
+                        deadtime_global, hist_select, use_nbm)
+    """
+
+    # ======================================================================= #
+    def __init__(self, bd, id, options, rebin=1, omit='', omit_scan=False,
+                 base_bins=0, flip_asym=False):
+        self.bd = bd
+        self.id = id
+        self.options = options
+        self.rebin = rebin
+        self.omit = omit
+        self.omit_scan = omit_scan
+        self.base_bins = base_bins
+        self.flip_asym = flip_asym
+        self.constrained = {}
+
+    # ======================================================================= #
+    def __getattr__(self, name):
+        """Access bdata attributes in the case that jobdata doesn't have it."""
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            return getattr(self.bd, name)
+
+    # ======================================================================= #
+    def asym(self, *args, **kwargs):
+        """
+            Get asymmetry, with defaults set as in fitdata.asym
+        """
+
+        options = self.options
+
+        # set defaults
+        kwargs.setdefault('scan_repair_options', '%s:%d' % \
+                          ('omit' if self.omit_scan else '', self.base_bins))
+        kwargs.setdefault('rebin', self.rebin)
+        kwargs.setdefault('omit', self.omit)
+        kwargs.setdefault('nbm', options['use_nbm'])
+        kwargs.setdefault('hist_select', options['hist_select'])
+
+        # deadtime corrections
+        deadtime = 0
+        if options['deadtime_switch']:
+            if options['deadtime_global']:
+                deadtime = options['deadtime']
+            else:
+                deadtime = self.bd.get_deadtime(c=options['deadtime'], fixed='c')
+
+        asym = self.bd.asym(*args, deadtime=deadtime, **kwargs)
+
+        # inversion
+        if self.flip_asym and type(asym) in (tuple, np.ndarray):
+            asym = list(asym)
+            asym[1] = -1*asym[1]
+            asym = tuple(asym)
+
+        return asym
+
+# =========================================================================== #
+def read_job(filename):
+    """
+        Read a yaml job file. Job files use the same keys as the files made by
+        the gui's save_state, with missing keys set from job_defaults. Required
+        keys:
+
+            fit_fit_function_title: str, name of the fit function
+            data:                   dict {id: {'run':int, 'year':int, ...}}
+
+        Optional keys of each entry in data: rebin, omit, omit_scan, base_bins,
+        flip_asym
+
+        fitpar gives the initial parameters in the format of fitdata.fitpar:
+        {id: {column: {parname: value}}}, with columns p0, blo, bhi, fixed,
+        shared. Parameters not given are set by the fitter's gen_init_par.
+
+        Returns dict of job settings
+    """
+
+    with open(filename, 'r') as fid:
+        job = yaml.safe_load(fid)
+
+    for key in ('fit_fit_function_title', 'data'):
+        if key not in job.keys():
+            raise RuntimeError('Job file %s missing required key "%s"' % \
+                               (filename, key))
+
+    return {**job_defaults, **job}
+
+# =========================================================================== #
+def load_data(job):
+    """
+        Read the runs of a job from the archive.
+
+        Returns dict {id: bdata or bmerged object}
+    """
+
+    data = {}
+    for id, d in job['data'].items():
+
+        # merged runs: id is of the form year.run+year.run
+        if '+' in str(id):
+            runs = [k.split('.') for k in str(id).split('+')]
+            data[id] = bmerged([bdata(int(r), year=int(y)) for y, r in runs])
+
+        else:
+            data[id] = bdata(int(d['run']), year=int(d['year']))
+
+    return data
+
+# =========================================================================== #
+def run_job(job, data=None, n_jobs=None, callback=None):
+    """
+        Fit the runs of a job, as set by the fit tab of the gui.
+
+        job:        dict of job settings, as from read_job
+        data:       dict {id: bdata-like object}. If None, read the runs from
+                    the archive
+        n_jobs:     number of processes for fitting runs without shared
+                    parameters. If None, use the job fit_n_jobs value
+        callback:   function handle called with inputs (id, diagnostics) after
+                    each run is fitted
+
+        Returns (DataFrame of parameters, global chisquared). The DataFrame is
+        indexed by run id, with columns matching the gui parameter export.
+    """
+
+    logger = logging.getLogger(logger_name)
+    job = {**job_defaults, **job}
+
+    if data is None:
+        data = load_data(job)
+
+    if n_jobs is None:
+        n_jobs = job['fit_n_jobs']
+
+    # make fitter
+    routine_mod = importlib.import_module(job['minimizer'])
+    fitter = routine_mod.fitter(keyfn=lambda d: d.id,
+                                probe_species=job['probe_species'],
+                                n_jobs=n_jobs,
+                                max_nfcn=job['fit_max_nfcn'] or None,
+                                max_time=job['fit_max_time'] or None)
+
+    fn_name = job['fit_fit_function_title']
+    ncomp = int(job['fit_n_component'])
+    asym_mode = asym_modes.get(job['fit_asym_type'], job['fit_asym_type'])
+    xlims = tuple(float(x) if x not in ('', None) else np.inf*s
+                  for x, s in zip((job['fit_xlo'], job['fit_xhi']), (-1, 1)))
+
+    # get run data
+    dats = []
+    for id, d in job['data'].items():
+        d = d or {}
+        dats.append(jobdata(data[id], id, options=job,
+                            rebin=d.get('rebin', 1),
+                            omit=d.get('omit', ''),
+                            omit_scan=d.get('omit_scan', False),
+                            base_bins=d.get('base_bins', 0),
+                            flip_asym=d.get('flip_asym', False)))
+
+    # initial parameters of all runs not fully set by the job, in one call
+    parnames = fitter.gen_param_names(fn_name, ncomp)
+    missing = [dat for dat in dats
+               if _is_missing(parnames, job['fitpar'].get(dat.id, {}))]
+    init = {}
+    if missing:
+        init_list = fitter.gen_init_par_batch(fn_name, ncomp, missing, asym_mode)
+        init = {dat.id: v for dat, v in zip(missing, init_list)}
+
+    # build data list
+    data_list = []
+    for dat in dats:
+        pdict = _get_pdict(parnames, job['fitpar'].get(dat.id, {}),
+                           init.get(dat.id, None))
+
+        doptions = {'slr_bkgd_corr': job['correct_bkgd']}
+        if job['fit_use_rebin']:
+            doptions['rebin'] = dat.rebin
+        if '1' in dat.mode:
+            doptions['omit'] = dat.omit
+
+        data_list.append([dat, pdict, doptions])
+
+    logger.info('Fitting %d runs with "%s" with %d components', len(data_list),
+                fn_name, ncomp)
+
+    # fit
+    results = FitResults()
+    pdicts = {dat.id: pdict for dat, pdict, _ in data_list}
+    chisq = [0., 0]
+    gchi = None
+    for key, df, diagnostics in fitter.iter_fit(fn_name=fn_name,
+                                                ncomp=ncomp,
+                                                data_list=data_list,
+                                                hist_select=job['hist_select'],
+                                                asym_mode=asym_mode,
+                                                xlims=xlims):
+        fixed_shared = pd.DataFrame(
+                            [pdicts[key][p][3:] for p in df.index],
+                            index=df.index, columns=['fixed', 'shared'])
+        results.append(key, pd.concat((df, fixed_shared), axis='columns'),
+                       meta={'Run Number': getattr(data[key], 'run', key),
+                             'Year': getattr(data[key], 'year', np.nan)})
+        chisq[0] += diagnostics['chisq']
+        chisq[1] += diagnostics['dof']
+        gchi = diagnostics.get('gchi', gchi)
+
+        if callback is not None:
+            callback(key, diagnostics)
+
+    if gchi is None:
+        gchi = chisq[0]/chisq[1] if chisq[1] else np.nan
+
+    return (results.to_frame(list(job['data'].keys())), gchi)
+
+# =========================================================================== #
+def write_table(df, filename, job, gchi):
+    """
+        Write the output of run_job to file, with the format set by the file
+        extension as in FitResults.write_frame. csv files have a header as in
+        the gui parameter export.
+    """
+
+    header = ['# Fit function : %s' % job['fit_fit_function_title'],
+              '# Number of components: %d' % int(job['fit_n_component']),
+              '# Global Chi-Squared: %s' % np.around(gchi, 2),
+              '# Minimizer: %s' % job['minimizer'],
+              '#\n# Generated by bfit v%s on %s' % (__version__, datetime.datetime.now()),
+              '#\n#\n']
+
+    write_frame(df, filename, header)
+
+# =========================================================================== #
+def _get_pdict(parnames, fitpar, init=None):
+    """
+        Get fitter parameter inputs {par: [p0, blo, bhi, fixed, shared]} from
+        the job fitpar of a run, filling in missing values from init.
+
+        parnames:   list of parameter names
+        fitpar:     dict {column: {parname: value}}
+        init:       DataFrame of initial parameters as from gen_init_par
+    """
+
+    columns = ('p0', 'blo', 'bhi', 'fixed', 'shared')
+    missing = init is not None
+
+    pdict = {}
+    for p in parnames:
+        values = []
+        for c in columns:
+            try:
+                values.append(fitpar[c][p])
+            except KeyError:
+                if c in ('p0', 'blo', 'bhi') or (c == 'fixed' and missing):
+                    values.append(init.loc[p, c])
+                else:
+                    values.append(False)
+
+        values[:3] = map(float, values[:3])
+        values[3:] = map(bool, values[3:])
+        pdict[p] = values
+
+    return pdict
+
+# =========================================================================== #
+def _is_missing(parnames, fitpar):
+    """
+        True if the job fitpar of a run does not set p0 and bounds of all
+        parameters
+    """
+    return any(p not in fitpar.get(c, {}) for p in parnames
+                                          for c in ('p0', 'blo', 'bhi'))
@@ -4,13 +4,15 @@
 
 import bfit.fitting.functions as fns
 from bfit.fitting.decay_31mg import fa_31Mg
-from bfit.fitting.gen_init_par import gen_init_par
+from bfit.fitting.gen_init_par import gen_init_par, gen_init_par_batch
 from functools import partial
 from collections.abc import Iterable
+from collections import OrderedDict
 import numpy as np
 import bdata as bd
 import pandas as pd
 import copy
+import inspect
 
 class fitter(object):
     """
@@ -20,6 +22,9 @@ class fitter(object):
     # needed to tell users what routine this is
     __name__ = 'base'
 
+    # max number of fitting functions kept by get_fn
+    fn_cache_size = 64
+
     # Define possible fit functions for given run modes
     function_names = {  '20':('Exp', 'Bi Exp', 'Str Exp'),
                         '2h':('Exp', 'Bi Exp', 'Str Exp'),
@@ -92,15 +97,26 @@ class fitter(object):
             }
 
     # ======================================================================= #
-    def __init__(self, keyfn, probe_species='Li8'):
+    def __init__(self, keyfn, probe_species='Li8', n_jobs=1, max_nfcn=None,
+                 max_time=None):
         """
             keyfn:          function takes as input bdata or bjoined or bmerged
                             object, returns string corresponding to unique id of
                             that object
             probe_species: one of the keys in the bdata.life dictionary.
+            n_jobs:         number of processes for fitting runs without
+                            shared parameters
+            max_nfcn:       max number of function calls for each run, None
+                            for no limit (see fit_bdata)
+            max_time:       max wall time in seconds for each run, None for no
+                            limit (see fit_bdata)
         """
         self.keyfn = keyfn
         self.probe_species = probe_species
+        self.n_jobs = n_jobs
+        self.max_nfcn = max_nfcn
+        self.max_time = max_time
+        self._fn_cache = OrderedDict()
 
     # ======================================================================= #
     def __call__(self, fn_name, ncomp, data_list, hist_select, asym_mode, xlims):
@@ -142,6 +158,79 @@ class fitter(object):
                                    and global chisquared
         """
 
+        keylist, inputs = self._get_fit_inputs(fn_name, ncomp, data_list,
+                                               hist_select, asym_mode, xlims)
+
+        # fit data
+        pars, stds_l, stds_h, covs, chis, gchi = self._do_fit(**inputs)
+
+        # set up output dataframe
+        if not isinstance(chis, Iterable):   # single run
+            pars = [pars]
+            stds_l = [stds_l]
+            stds_h = [stds_h]
+            chis = [chis]
+
+        output = {}
+        for i, d in enumerate(inputs['data']):
+            key = self.keyfn(d)
+            output[key] = self._get_result_df(keylist, pars[i], stds_l[i],
+                                              stds_h[i], chis[i])
+        return (output, gchi)
+
+    # ======================================================================= #
+    def iter_fit(self, fn_name, ncomp, data_list, hist_select, asym_mode, xlims):
+        """
+            Fitting controller, yielding the results of each run as soon as it
+            is fitted. Inputs are the same as __call__.
+
+            Fitters whose _do_fit does not take a stream argument yield all
+            runs once the whole fit is done.
+
+            yields (runid, DataFrame of results, diagnostics), where the
+            DataFrame is as in the output of __call__, and diagnostics is as in
+            fit_bdata.iter_fit_bdata
+        """
+
+        keylist, inputs = self._get_fit_inputs(fn_name, ncomp, data_list,
+                                               hist_select, asym_mode, xlims)
+        data = inputs['data']
+
+        # streaming fitter
+        if 'stream' in inspect.signature(self._do_fit).parameters:
+            for i, par, std_l, std_h, cov, chi, diagnostics in \
+                                        self._do_fit(stream=True, **inputs):
+                yield (self.keyfn(data[i]),
+                       self._get_result_df(keylist, par, std_l, std_h, chi),
+                       diagnostics)
+
+        # all runs at once
+        else:
+            pars, stds_l, stds_h, covs, chis, gchi = self._do_fit(**inputs)
+
+            if not isinstance(chis, Iterable):   # single run
+                pars = [pars]
+                stds_l = [stds_l]
+                stds_h = [stds_h]
+                chis = [chis]
+
+            for i, d in enumerate(data):
+                diagnostics = {'chisq':0., 'dof':0, 'message':None,
+                               'error':None, 'fallback':None, 'gchi':gchi}
+                yield (self.keyfn(d),
+                       self._get_result_df(keylist, pars[i], stds_l[i],
+                                           stds_h[i], chis[i]),
+                       diagnostics)
+
+    # ======================================================================= #
+    def _get_fit_inputs(self, fn_name, ncomp, data_list, hist_select, asym_mode,
+                        xlims):
+        """
+            Get inputs to _do_fit from the inputs of __call__.
+
+            returns (parameter names, dict of _do_fit keyword arguments)
+        """
+
         # check ncomponents
         if ncomp < 1:
             raise RuntimeError('ncomp needs to be >= 1')
@@ -234,40 +323,37 @@ class fitter(object):
             except KeyError:
                 omit.append('')
 
-        # fit data
-        kwargs = {'p0':p0, 'bounds':bounds}
-        pars, stds_l, stds_h, covs, chis, gchi = self._do_fit(
-                                        bdata_list,
-                                        fn,
-                                        omit=omit,
-                                        rebin=rebin,
-                                        slr_bkgd_corr=slr_bkgd_corr,
-                                        shared=sharelist,
-                                        hist_select=hist_select,
-                                        asym_mode=asym_mode,
-                                        fixed=fixedlist,
-                                        xlims=xlims,
-                                        parnames=keylist,
-                                        **kwargs)
+        inputs = {'data':bdata_list,
+                  'fn':fn,
+                  'omit':omit,
+                  'rebin':rebin,
+                  'slr_bkgd_corr':slr_bkgd_corr,
+                  'shared':sharelist,
+                  'hist_select':hist_select,
+                  'asym_mode':asym_mode,
+                  'fixed':fixedlist,
+                  'xlims':xlims,
+                  'parnames':keylist,
+                  'p0':p0,
+                  'bounds':bounds,
+                  }
+
+        return (keylist, inputs)
 
-        # set up output dataframe
-        if not isinstance(chis, Iterable):   # single run
-            pars = [pars]
-            stds_l = [stds_l]
-            stds_h = [stds_h]
-            chis = [chis]
-
-        output = {}
-        for i, d in enumerate(bdata_list):
-            key = self.keyfn(d)
-            output[key] = pd.DataFrame({'parname':keylist,
-                                        'res': pars[i],
-                                        'dres+': stds_h[i],
-                                        'dres-': stds_l[i],
-                                        'chi': chis[i],
-                                        })
-            output[key].set_index('parname', inplace=True)
-        return (output, gchi)
+    # ======================================================================= #
+    def _get_result_df(self, keylist, par, std_l, std_h, chi):
+        """
+            Get DataFrame of fit results for a single run, indexed by parameter
+            name
+        """
+        df = pd.DataFrame({'parname':keylist,
+                           'res': par,
+                           'dres+': std_h,
+                           'dres-': std_l,
+                           'chi': chi,
+                           })
+        df.set_index('parname', inplace=True)
+        return df
 
     # ======================================================================= #
     def get_fit_fn(self, fn_name, ncomp, data_list):
@@ -348,21 +434,60 @@ class fitter(object):
 
     # ======================================================================= #
     def gen_init_par(self, fn_name, ncomp, bdataobj, asym_mode='combined'):
-        return gen_init_par(fn_name, ncomp, bdataobj, asym_mode)
+        return gen_init_par(fn_name, ncomp, bdataobj, asym_mode,
+                            lifetime=bd.life[self.probe_species],
+                            spin=self.spin[self.probe_species])
+
+    # ======================================================================= #
+    def gen_init_par_batch(self, fn_name, ncomp, bdataobjs, asym_mode='combined'):
+        """
+            Get initial parameters for a list of runs, see gen_init_par_batch
+
+            Returns list of DataFrames, one per run
+        """
+        return gen_init_par_batch(fn_name, ncomp, bdataobjs, asym_mode,
+                                  lifetime=bd.life[self.probe_species],
+                                  spin=self.spin[self.probe_species])
 
     # ======================================================================= #
     def get_fn(self, fn_name, ncomp=1, pulse_len=-1, lifetime=-1, constr=None):
         """
-            Get the fitting function used.
+            Get the fitting function used. Functions are cached such that runs
+            with the same inputs, probe species, and constraints share a single
+            function object. The least recently used functions are dropped
+            once there are more than fn_cache_size.
 
                 fn_name: string of the function name users will select.
                 ncomp: number of components, ex if 2, then return exp+exp
                 pulse_len: duration of beam on in s
                 lifetime: lifetime of probe in s
+                constr: dict {defined (string) : [fn, par names (list of str)]}
 
             Returns python function(x, *pars)
         """
 
+        key = (fn_name, ncomp, pulse_len, lifetime, self.probe_species,
+               _get_constr_key(constr))
+
+        try:
+            fn, self.mode = self._fn_cache[key]
+            self._fn_cache.move_to_end(key)
+        except KeyError:
+            fn = self._make_fn(fn_name, ncomp, pulse_len, lifetime, constr)
+            self._fn_cache[key] = (fn, self.mode)
+            while len(self._fn_cache) > self.fn_cache_size:
+                self._fn_cache.popitem(last=False)
+        except TypeError:   # unhashable inputs
+            fn = self._make_fn(fn_name, ncomp, pulse_len, lifetime, constr)
+
+        return fn
+
+    # ======================================================================= #
+    def _make_fn(self, fn_name, ncomp=1, pulse_len=-1, lifetime=-1, constr=None):
+        """
+            Make a new fitting function. Inputs are the same as get_fn.
+        """
+
         # set fitting function
         if fn_name == 'Lorentzian':
             fn =  fns.lorentzian
@@ -416,4 +541,44 @@ class fitter(object):
 
         return fn
 
+# =========================================================================== #
+def _get_constr_key(constr):
+    """
+        Get hashable key identifying the parameter constraints, based on the
+        compiled code of each constraint function such that identical
+        constraint expressions give the same key.
+    """
+
+    if not constr:
+        return None
+
+    key = []
+    for defined in sorted(constr.keys()):
+        c_fn, c_par = constr[defined]
+
+        try:
+            fn_key = _get_code_key(c_fn.__code__)
+        except AttributeError:
+            fn_key = id(c_fn)
+
+        key.append((defined, fn_key, tuple(c_par)))
+
+    return tuple(key)
+
+# =========================================================================== #
+def _get_code_key(code):
+    """
+        Get hashable key of compiled code. Constants are keyed with their type
+        such that, for example, 1 and 1.0 give different keys.
+    """
+
+    def get_const_key(c):
+        if isinstance(c, type(code)):
+            return _get_code_key(c)
+        elif isinstance(c, (tuple, frozenset)):
+            return (type(c), tuple(get_const_key(v) for v in c))
+        else:
+            return (type(c), repr(c))
 
+    return (code.co_code, tuple(get_const_key(c) for c in code.co_consts),
+            code.co_names, code.co_varnames)
@@ -0,0 +1,31 @@
+# Fitter functions using least_squares with sparse jacobian as the backend
+# Derek Fujimoto
+# Oct 2026
+
+from bfit.fitting.fit_bdata import fit_bdata, iter_fit_bdata
+from bfit.fitting.fitter import fitter as fit_base
+
+class fitter(fit_base):
+    
+    __name__ = 'least_squares (sparse)'
+    
+    def _do_fit(self, data, fn, omit=None, rebin=None, shared=None, slr_bkgd_corr=None, hist_select='', 
+                xlims=None, asym_mode='c', fixed=None, parnames=None, stream=False, 
+                **kwargs):
+        """Inputs match fit_bdata, if stream use iter_fit_bdata"""
+        fit_fn = iter_fit_bdata if stream else fit_bdata
+        return fit_fn(data, 
+                      fn, 
+                      omit=omit, 
+                      rebin=rebin, 
+                      shared=shared, 
+                      slr_bkgd_corr=slr_bkgd_corr,
+                      hist_select=hist_select, 
+                      xlims=xlims, 
+                      asym_mode=asym_mode, 
+                      fixed=fixed, 
+                      minimizer='sparse', 
+                      n_jobs=self.n_jobs,
+                      max_nfcn=self.max_nfcn,
+                      max_time=self.max_time,
+                      **kwargs)
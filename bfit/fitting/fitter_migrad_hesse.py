@@ -2,7 +2,7 @@
 # Derek Fujimoto
 # Nov 2020
 
-from bfit.fitting.fit_bdata import fit_bdata
+from bfit.fitting.fit_bdata import fit_bdata, iter_fit_bdata
 from bfit.fitting.fitter import fitter as fit_base
 
 class fitter(fit_base):
@@ -10,20 +10,25 @@ class fitter(fit_base):
     __name__ = 'migrad (hesse)'
     
     def _do_fit(self, data, fn, omit=None, rebin=None, shared=None, slr_bkgd_corr=None, hist_select='', 
-                xlims=None, asym_mode='c', fixed=None, parnames=None, **kwargs):
-        """Inputs match fit_bdata"""
+                xlims=None, asym_mode='c', fixed=None, parnames=None, stream=False, 
+                **kwargs):
+        """Inputs match fit_bdata, if stream use iter_fit_bdata"""
         
-        return fit_bdata(data, 
-                         fn, 
-                         omit=omit, 
-                         rebin=rebin, 
-                         shared=shared, 
-                         slr_bkgd_corr=slr_bkgd_corr,
-                         hist_select=hist_select, 
-                         xlims=xlims, 
-                         asym_mode=asym_mode, 
-                         fixed=fixed, 
-                         minimizer='migrad', 
-                         name=parnames, 
-                         **kwargs)
+        fit_fn = iter_fit_bdata if stream else fit_bdata
+        return fit_fn(data, 
+                      fn, 
+                      omit=omit, 
+                      rebin=rebin, 
+                      shared=shared, 
+                      slr_bkgd_corr=slr_bkgd_corr,
+                      hist_select=hist_select, 
+                      xlims=xlims, 
+                      asym_mode=asym_mode, 
+                      fixed=fixed, 
+                      minimizer='migrad', 
+                      n_jobs=self.n_jobs,
+                      max_nfcn=self.max_nfcn,
+                      max_time=self.max_time,
+                      name=parnames, 
+                      **kwargs)
             
@@ -2,179 +2,635 @@
 # Derek Fujimoto
 # Oct 2021
 
+from scipy.signal import find_peaks, peak_widths
+from bfit.fitting.functions import qp_1st_order
+import bdata as bd
 import numpy as np
 import pandas as pd
 
+# asymmetry types which cannot be fitted
+bad_asym_modes = (  'h',           # Split Helicity
+                    'hm',          # Matched Helicity
+                    'hs',          # Shifted Split
+                    'cs',          # Shifted Combined
+                    'hp',          # Matched Peak Finding
+                    'r',           # Raw Scans
+                    'rhist',       # Raw Histograms
+                    '2e_raw_c',    # Combined Hel Raw
+                    '2e_raw_h',    # Split Hel Raw
+                    '2e_sl_h',     # Split Hel Slopes
+                    '2e_dif_h',    # Split Hel Diff
+                    'ad',          # Alpha Diffusion
+                    "at_c",        # Combined Hel (Alpha Tag)
+                    "at_h",        # Split Hel (Alpha Tag)
+                    "nat_c",       # Combined Hel (!Alpha Tag)
+                    "nat_h",       # Split Hel (!Alpha Tag)
+                 )
+
+# function names
+exp_names = ('exp', 'bi exp', 'str exp', 'biexp', 'strexp')
+line_names = ('lorentzian', 'gaussian', 'bilorentzian', 'quadlorentz', 'pseudovoigt')
+
+# number of time bins after beam off used in the log-linear regression
+nbins_regression = 25
+
 # ======================================================================= #
-def gen_init_par(fn_name, ncomp, bdataobj, asym_mode='combined'):
+def gen_init_par(fn_name, ncomp, bdataobj, asym_mode='combined', lifetime=None,
+                 spin=2, method='regression'):
     """Generate initial parameters for a given function.
 
         fname: name of function. Should be the same as the param_names keys
         ncomp: number of components
-        bdataobj: a bdata object representative of the fitting group.
+        bdataobj: a bdata or fitdata object representative of the fitting group.
+                  fitdata objects reuse their cached asymmetry.
         asym_mode: what kind of asymmetry to fit
+        lifetime: probe lifetime in s, if None use that of Li8
+        spin: probe spin, sets the line positions of QuadLorentz
+        method: 'regression' or 'heuristic', see gen_init_par_batch
 
         Set and return pd.DataFrame of initial parameters.
             col: p0, blo, bhi, fixed
             index: parameter name
     """
+    return gen_init_par_batch(fn_name, ncomp, [bdataobj], asym_mode,
+                              lifetime=lifetime, spin=spin, method=method)[0]
+
+# ======================================================================= #
+def gen_init_par_batch(fn_name, ncomp, bdataobjs, asym_mode='combined',
+                       lifetime=None, spin=2, method='regression'):
+    """Generate initial parameters for a given function for many runs.
+
+        Inputs are as in gen_init_par, with bdataobjs a list of bdata or
+        fitdata objects.
+
+        method:
+
+            regression: pulsed exponentials are estimated from a weighted
+                        log-linear regression of the asymmetry after beam off,
+                        done for all runs on a shared time grid at once. Line
+                        shapes are estimated from the position, prominence,
+                        and width of the largest peaks, one per component.
+            heuristic:  amplitude from the first bins, T1 from the 1/e
+                        crossing, and the single deepest point for lines.
+
+        Runs for which regression is not possible fall back to heuristics.
+
+        Returns list of pd.DataFrame of initial parameters, as in gen_init_par
+    """
 
     fn_name = fn_name.lower()
 
     # asym_mode un-used types
-    if asym_mode in (   'h',           # Split Helicity
-                        'hm',          # Matched Helicity
-                        'hs',          # Shifted Split
-                        'cs',          # Shifted Combined
-                        'hp',          # Matched Peak Finding
-                        'r',           # Raw Scans
-                        'rhist',       # Raw Histograms
-                        '2e_raw_c',    # Combined Hel Raw
-                        '2e_raw_h',    # Split Hel Raw
-                        '2e_sl_h',     # Split Hel Slopes
-                        '2e_dif_h',    # Split Hel Diff
-                        'ad',          # Alpha Diffusion
-                        "at_c",        # Combined Hel (Alpha Tag)
-                        "at_h",        # Split Hel (Alpha Tag)
-                        "nat_c",       # Combined Hel (!Alpha Tag)
-                        "nat_h",       # Split Hel (!Alpha Tag)
-                    ):
+    if asym_mode in bad_asym_modes:
         errmsg = "Asymmetry calculation type not implemented for fitting"
         raise RuntimeError(errmsg)
 
+    if method not in ('regression', 'heuristic'):
+        raise RuntimeError(f'gen_init_par: Bad method "{method}".')
+
     # get asymmetry
-    x, a, da = bdataobj.asym(asym_mode)
+    asyms = [b.asym(asym_mode) for b in bdataobjs]
 
     # set pulsed exp fit initial parameters
-    if fn_name in ('exp', 'bi exp', 'str exp', 'biexp', 'strexp'):
-        # ampltitude average of first 5 bins
-        amp = abs(np.mean(a[0:5])/ncomp)
-
-        # T1: time after beam off to reach 1/e
-        idx = int(bdataobj.ppg.beam_on.mean)
-        beam_duration = x[idx]
-        amp_beamoff = a[idx]
-        target = amp_beamoff/np.exp(1)
-
-        x_target = x[np.sum(a>target)]
-        T1 = abs(x_target-beam_duration)
-
-        # bounds and amp
-        if asym_mode == 'n':
-            amp_bounds = (-np.inf, np.inf)
-            amp = -amp
-        else:
-            amp_bounds = (0, np.inf)
+    if fn_name in exp_names:
 
-        # set values
-        if fn_name == 'exp':
-            par_values = {  '1_T1':(1./T1, 0, np.inf, False),
-                            'amp':(amp, *amp_bounds, False),
-                         }
+        if lifetime is None:
+            lifetime = bd.life['Li8']
 
-        elif fn_name in ('bi exp', 'biexp'):
-            par_values = {  '1_T1':(1./T1, 0, np.inf, False),
-                            '1_T1b':(10./T1, 0, np.inf, False),
-                            'fraction_b':(0.5, 0, 1, False),
-                            'amp':(amp, *amp_bounds, False),
-                         }
+        pulses = [_get_pulse(b, x) for b, (x, a, da) in zip(bdataobjs, asyms)]
+        values = [_init_exp_heuristic(fn_name, ncomp, x, a, pulse, asym_mode)
+                  for (x, a, da), pulse in zip(asyms, pulses)]
 
-        elif fn_name in ('str exp', 'strexp'):
-            par_values = {  '1_T1':(1./T1, 0, np.inf, False),
-                            'beta':(0.5, 0, 1, False),
-                            'amp':(amp, *amp_bounds, False),
-                         }
+        if method == 'regression':
+            _init_exp_regression(fn_name, ncomp, asyms, pulses, lifetime, values)
 
     # set time integrated fit initial parameters
-    elif fn_name in ('lorentzian', 'gaussian', 'bilorentzian', 'quadlorentz', 'pseudovoigt'):
+    elif fn_name in line_names:
+        values = [_init_line(fn_name, ncomp, x, a, da, asym_mode, spin, method)
+                  for x, a, da in asyms]
+
+    else:
+        raise RuntimeError(f'gen_init_par: Bad function name "{fn_name}".')
+
+    return [_get_frame(*v) for v in values]
+
+# ======================================================================= #
+def _get_frame(components, shared):
+    """
+        Make DataFrame of initial parameters.
+
+        components: list of dict {name: (p0, blo, bhi, fixed)}, one per
+                    component
+        shared:     dict {name: (p0, blo, bhi, fixed)}, parameters common to
+                    all components (baselines)
+    """
+
+    # do multicomponent
+    if len(components) > 1:
+        par_values = {}
+        for c, comp in enumerate(components):
+            for n, v in comp.items():
+                par_values[n+'_%d' % c] = v
+    else:
+        par_values = dict(components[0])
+
+    par_values.update(shared)
+
+    return pd.DataFrame(par_values, index=['p0', 'blo', 'bhi', 'fixed']).transpose()
+
+# ======================================================================= #
+def _get_pulse(bdataobj, x):
+    """Get beam pulse duration in s"""
+    try:
+        return float(bdataobj.pulse_s)
+    except (AttributeError, TypeError):
+        return x[int(bdataobj.ppg.beam_on.mean)]
+
+# ======================================================================= #
+def _init_exp_heuristic(fn_name, ncomp, x, a, beam_duration, asym_mode):
+    """
+        Pulsed exponential initial parameters from the first bins and the 1/e
+        crossing after beam off.
+
+        Returns (components, shared) as in _get_frame
+    """
+
+    # ampltitude average of first 5 bins
+    amp = abs(np.mean(a[0:5])/ncomp)
+
+    # T1: time after beam off to reach 1/e
+    idx = min(np.sum(x < beam_duration), len(x)-1)
+    amp_beamoff = a[idx]
+    target = amp_beamoff/np.exp(1)
+
+    x_target = x[min(np.sum(a>target), len(x)-1)]
+    T1 = abs(x_target-beam_duration)
 
-        # get baseline
+    # bounds and amp
+    if asym_mode == 'n':
+        amp_bounds = (-np.inf, np.inf)
+        amp = -amp
+    else:
+        amp_bounds = (0, np.inf)
+
+    # set values
+    if fn_name == 'exp':
+        par_values = {  '1_T1':(1./T1, 0, np.inf, False),
+                        'amp':(amp, *amp_bounds, False),
+                     }
+
+    elif fn_name in ('bi exp', 'biexp'):
+        par_values = {  '1_T1':(1./T1, 0, np.inf, False),
+                        '1_T1b':(10./T1, 0, np.inf, False),
+                        'fraction_b':(0.5, 0, 1, False),
+                        'amp':(amp, *amp_bounds, False),
+                     }
+
+    elif fn_name in ('str exp', 'strexp'):
+        par_values = {  '1_T1':(1./T1, 0, np.inf, False),
+                        'beta':(0.5, 0, 1, False),
+                        'amp':(amp, *amp_bounds, False),
+                     }
+
+    return ([par_values]*ncomp, {})
+
+# ======================================================================= #
+def _init_exp_regression(fn_name, ncomp, asyms, pulses, lifetime, values):
+    """
+        Pulsed exponential initial parameters from a weighted log-linear
+        regression after beam off. Runs with the same time bins and pulse
+        length are estimated together.
+
+        asyms:      list of (x, a, da) for each run
+        pulses:     list of beam pulse durations in s for each run
+        lifetime:   probe lifetime in s
+        values:     list of (components, shared) from _init_exp_heuristic,
+                    updated in place for runs where the regression succeeds
+    """
+
+    # group runs on a shared time grid
+    groups = {}
+    for i, ((x, a, da), pulse) in enumerate(zip(asyms, pulses)):
+        key = (len(x), np.asarray(x, dtype=float).tobytes(), pulse)
+        groups.setdefault(key, []).append(i)
+
+    for idx in groups.values():
+
+        x = np.asarray(asyms[idx[0]][0], dtype=float)
+        a = np.array([asyms[i][1] for i in idx], dtype=float)
+        da = np.array([asyms[i][2] for i in idx], dtype=float)
+        pulse = pulses[idx[0]]
+
+        # initial polarization from the first bins, and that at the end of
+        # the beam pulse
+        before = np.where(x <= pulse)[0][-5:]
+        amp0 = _wmean(a[:, :5], da[:, :5])
+        amp_end = _wmean(a[:, before], da[:, before])
+
+        # polarization after beam off, with the sign of the asymmetry
+        after = np.where(x > pulse)[0]
+        if len(after) < 3:
+            continue
+
+        t = x[after]-pulse
+        a = a[:, after]
+        da = da[:, after]
+
+        sign = np.sign(np.sum(a, axis=1))
+        sign[sign == 0] = 1
+        z = sign[:, None]*a
+        amp0 = sign*amp0
+        amp_end = sign*amp_end
+
+        # combine into coarse bins so that the log is not taken of noise
+        t, z, dz = _rebin(t, z, da, min(nbins_regression, len(t)))
+
+        # only bins well above noise
+        with np.errstate(all='ignore'):
+            mask = (dz > 0) & (z > 3*dz) & np.isfinite(z)
+            lnz = np.log(np.where(mask, z, 1))
+            w = np.where(mask, np.square(z/dz), 0)
+
+        # single rate
+        rate, amp_off, ok = _loglinear(t, lnz, w)
+
+        # initial polarization from that at beam off
+        amp = sign*amp_off/_get_pulsed_scale(rate, pulse, lifetime)
+
+        # too few bins after beam off for fast relaxation: use the drop in
+        # polarization over the beam pulse
+        rate_p = _solve_pulsed_scale(amp_end/amp0, pulse, lifetime)
+        use_p = ~ok & np.isfinite(rate_p)
+        rate = np.where(use_p, rate_p, rate)
+        amp = np.where(use_p, sign*amp0, amp)
+        ok = ok | use_p
+
+        # two rates: slow rate from the late half of the usable decay, fast
+        # rate from the early half after subtracting the slow component
+        two_rates = fn_name in ('bi exp', 'biexp') or \
+                    (fn_name == 'exp' and ncomp > 1)
+        if two_rates:
+            tmid = np.array([np.median(t[m]) if m.any() else 0 for m in mask])
+            late = t[None, :] > tmid[:, None]
+            rate_s, amp_s, ok_s = _loglinear(t, lnz, np.where(late, w, 0))
+
+            with np.errstate(all='ignore'):
+                r = z-amp_s[:, None]*np.exp(-rate_s[:, None]*t)
+                mask_f = mask & ~late & (r > 3*dz)
+                w_f = np.where(mask_f, np.square(r/dz), 0)
+                rate_f, amp_f, ok_f = _loglinear(t, np.log(np.where(mask_f, r, 1)), w_f)
+
+            ok_s = ok_s & ~use_p
+            rate_s = np.where(ok_s, rate_s, rate)
+
+            # the fast component is mostly seen during the beam pulse: its
+            # fraction is the part of the initial polarization not accounted
+            # for by the slow component
+            scale_s = _get_pulsed_scale(rate_s, pulse, lifetime)
+            amp_s = np.where(ok_s, amp_s/scale_s, np.abs(amp))
+            use0 = ok_s & np.isfinite(amp0) & (amp0 > amp_s)
+            amp_f = np.where(use0, amp0-amp_s, amp_s)
+
+            # fast rate from the polarization at the end of the pulse if it
+            # was not seen after beam off
+            with np.errstate(all='ignore'):
+                rate_e = _solve_pulsed_scale((amp_end-amp_s*scale_s)/amp_f,
+                                             pulse, lifetime)
+            fast = ok_f & (rate_f > 2*rate_s)
+            rate_f = np.where(fast, rate_f, rate_e)
+            fast = np.isfinite(rate_f) & (rate_f > 2*rate_s)
+            rate_f = np.where(fast, rate_f, 10*rate_s)
+
+            rate = rate_s
+            amp = sign*(amp_s+amp_f)
+            with np.errstate(all='ignore'):
+                frac_b = np.clip(amp_f/(amp_s+amp_f), 0.05, 0.95)
+
+        ok = ok & np.isfinite(amp)
+
+        # set values
+        for j, i in enumerate(idx):
+            if not ok[j]:
+                continue
+
+            # check bounds
+            comp0 = values[i][0][0]
+            if not comp0['amp'][1] <= amp[j] <= comp0['amp'][2]:
+                continue
+
+            # rate and amplitude of each component
+            if fn_name == 'exp' and ncomp > 1:
+                rates = [rate[j], rate_f[j]]
+                amps = [amp[j]*(1-frac_b[j]), amp[j]*frac_b[j]]
+                rates.extend(rate[j]*10.**-np.arange(1, ncomp-1))
+                amps.extend([amp[j]/ncomp]*(ncomp-2))
+            else:
+                spread = 10**(np.arange(ncomp)-(ncomp-1)/2)
+                rates = rate[j]*spread
+                amps = [amp[j]/ncomp]*ncomp
+
+            comps = []
+            for c in range(ncomp):
+                comp = dict(comp0)
+                comp['1_T1'] = (rates[c], *comp0['1_T1'][1:])
+                comp['amp'] = (amps[c], *comp0['amp'][1:])
+
+                if fn_name in ('bi exp', 'biexp'):
+                    comp['1_T1b'] = (rate_f[j]*spread[c], *comp0['1_T1b'][1:])
+                    comp['fraction_b'] = (frac_b[j], *comp0['fraction_b'][1:])
+
+                comps.append(comp)
+
+            values[i] = (comps, values[i][1])
+
+# ======================================================================= #
+def _get_pulsed_scale(rate, pulse, lifetime):
+    """
+        Ratio of the polarization at beam off to that at implantation for a
+        pulsed exponential with relaxation rate rate
+    """
+    lambda1 = rate+1/lifetime
+    with np.errstate(all='ignore'):
+        return (1-np.exp(-lambda1*pulse))/(1-np.exp(-pulse/lifetime))/ \
+               (lambda1*lifetime)
+
+# ======================================================================= #
+def _solve_pulsed_scale(ratio, pulse, lifetime, niter=50):
+    """
+        Find the relaxation rate for which _get_pulsed_scale equals ratio, by
+        bisection in log(rate). NaN where no rate between 1e-4 and 1e4 matches.
+    """
+
+    ratio = np.asarray(ratio, dtype=float)
+    lo = np.full(ratio.shape, -4.)
+    hi = np.full(ratio.shape, 4.)
+
+    # scale decreases with rate
+    for i in range(niter):
+        mid = (lo+hi)/2
+        above = _get_pulsed_scale(10**mid, pulse, lifetime) > ratio
+        lo = np.where(above, mid, lo)
+        hi = np.where(above, hi, mid)
+
+    rate = 10**((lo+hi)/2)
+    bad = (_get_pulsed_scale(1e-4, pulse, lifetime) < ratio) | \
+          (_get_pulsed_scale(1e4, pulse, lifetime) > ratio) | ~np.isfinite(ratio)
+    return np.where(bad, np.nan, rate)
+
+# ======================================================================= #
+def _wmean(a, da):
+    """Weighted mean of each row of a"""
+    with np.errstate(all='ignore'):
+        w = np.where(da > 0, 1/np.square(da), 0)
+        return np.sum(w*a, axis=1)/np.sum(w, axis=1)
+
+# ======================================================================= #
+def _rebin(t, z, dz, nbins):
+    """
+        Combine consecutive time bins into about nbins bins, with weighted
+        averages for each row of z. Bin widths grow logarithmically with time,
+        so that both fast and slow relaxation are resolved.
+
+        Returns (t, z, dz) of the combined bins
+    """
+
+    edges = np.geomspace(t[0], t[-1], nbins+1)[:-1]
+    start = np.unique(np.searchsorted(t, edges))
+    counts = np.diff(np.append(start, len(t)))
+
+    with np.errstate(all='ignore'):
+        w = np.where(dz > 0, 1/np.square(dz), 0)
+        sumw = np.add.reduceat(w, start, axis=1)
+        zb = np.add.reduceat(w*z, start, axis=1)/sumw
+        dzb = 1/np.sqrt(sumw)
+
+    tb = np.add.reduceat(t, start)/counts
+
+    return (tb, zb, dzb)
+
+# ======================================================================= #
+def _loglinear(t, lnz, w):
+    """
+        Weighted linear regression of lnz = ln(A) - rate*t, for each row of lnz
+        and w.
+
+        Returns (rate, A, success)
+    """
+
+    S = np.sum(w, axis=1)
+    Sx = np.sum(w*t, axis=1)
+    Sy = np.sum(w*lnz, axis=1)
+    Sxx = np.sum(w*t*t, axis=1)
+    Sxy = np.sum(w*t*lnz, axis=1)
+
+    with np.errstate(all='ignore'):
+        det = S*Sxx-Sx*Sx
+        rate = -(S*Sxy-Sx*Sy)/det
+        A = np.exp((Sxx*Sy-Sx*Sxy)/det)
+
+    npts = np.sum(w > 0, axis=1)
+    success = (npts >= 3) & (det > 0) & (rate > 0) & np.isfinite(rate) & \
+              np.isfinite(A)
+
+    return (rate, A, success)
+
+# ======================================================================= #
+def _init_line(fn_name, ncomp, x, a, da, asym_mode, spin, method):
+    """
+        Line shape initial parameters for one run.
+
+        Returns (components, shared) as in _get_frame
+    """
+
+    x = np.asarray(x, dtype=float)
+    a = np.asarray(a, dtype=float)
+    da = np.asarray(da, dtype=float)
+
+    # sort by frequency
+    idx = np.argsort(x)
+    x, a, da = x[idx], a[idx], da[idx]
+
+    # get baseline
+    if method == 'heuristic':
         base = np.mean(a[:5])
+    else:
+        base = np.median(np.concatenate((a[:5], a[-5:])))
 
-        # check for upside down helicities (peak going up)
-        avg = np.mean(a)
-        if base < avg:
-            amin = max(a[a!=0])
-        else:
-            amin = min(a[a!=0])
+    # check for upside down helicities (peak going up)
+    avg = np.mean(a)
+    if base < avg:
+        amin = max(a[a!=0])
+        sign = -1
+    else:
+        amin = min(a[a!=0])
+        sign = 1
 
-        # get peak asym value
-        peak = x[np.where(a==amin)[0][0]]
-        height = base-amin
-        width = 2*abs(peak-x[np.where(a<amin+height/2)[0][0]])
+    # get peak asym value
+    peak = x[np.where(a==amin)[0][0]]
+    height = base-amin
+    width = 2*abs(peak-x[np.where(a<amin+height/2)[0][0]])
 
-        # bounds
-        if asym_mode == 'n':
-            height_bounds = [-np.inf, 0]
-        else:
-            height_bounds = [0, np.inf]
+    # peaks as (position, height, fwhm), largest first
+    peaks = [(peak, height, width)]
+    if method == 'regression':
+        found = _find_peaks(x, sign*(base-a), da)
+        if found:
+            peaks = [(p, sign*h, w) for p, h, w in found]
+            peak, height, width = peaks[0]
+
+    # bounds
+    if asym_mode == 'n':
+        height_bounds = [-np.inf, 0]
+    else:
+        height_bounds = [0, np.inf]
 
-        # check bounds validity
-        if height < height_bounds[0]:
-            height_bounds[0] = -np.inf
+    # check bounds validity
+    if height < height_bounds[0]:
+        height_bounds[0] = -np.inf
 
-        if height > height_bounds[1]:
-            height_bounds[1] = np.inf
+    if height > height_bounds[1]:
+        height_bounds[1] = np.inf
+
+    # one peak per component, extra components are broader copies of the
+    # largest peak
+    if method == 'regression':
+        comp_peaks = list(peaks[:ncomp])
+        for c in range(len(comp_peaks), ncomp):
+            comp_peaks.append((peak, height/ncomp, width*3**c))
+    else:
+        comp_peaks = [(peak, height, width)]*ncomp
+
+    shared = {'baseline':(base, -np.inf, np.inf, False)}
+
+    # set values (value, low bnd, high bnd, fixed)
+    components = []
+    for pk, ht, wd in comp_peaks:
 
-        # set values (value, low bnd, high bnd, fixed)
         if fn_name == 'lorentzian':
-            par_values = {'peak':(peak, min(x), max(x), False),
-                          'fwhm':(width, 0, np.inf, False),
-                          'height':(height, *height_bounds, False),
-                          'baseline':(base, -np.inf, np.inf, False)
+            par_values = {'peak':(pk, min(x), max(x), False),
+                          'fwhm':(wd, 0, np.inf, False),
+                          'height':(ht, *height_bounds, False),
                          }
         elif fn_name == 'gaussian':
-            par_values = {'mean':(peak, min(x), max(x), False),
-                          'sigma':(width, 0, np.inf, False),
-                          'height':(height, *height_bounds, False),
-                          'baseline':(base, -np.inf, np.inf, False)
+
+            # sigma from fwhm
+            if method == 'regression':
+                wd = wd/(2*np.sqrt(2*np.log(2)))
+
+            par_values = {'mean':(pk, min(x), max(x), False),
+                          'sigma':(wd, 0, np.inf, False),
+                          'height':(ht, *height_bounds, False),
                           }
         elif fn_name == 'bilorentzian':
-            par_values = {'peak':(peak, min(x), max(x), False),
-                          'fwhmA':(width*10, 0, np.inf, False),
-                          'heightA':(height/10, *height_bounds, False),
-                          'fwhmB':(width, 0, np.inf, False),
-                          'heightB':(height*9/10, *height_bounds, False),
-                          'baseline':(base, -np.inf, np.inf, False)
+            par_values = {'peak':(pk, min(x), max(x), False),
+                          'fwhmA':(wd*10, 0, np.inf, False),
+                          'heightA':(ht/10, *height_bounds, False),
+                          'fwhmB':(wd, 0, np.inf, False),
+                          'heightB':(ht*9/10, *height_bounds, False),
                          }
         elif fn_name == 'quadlorentz':
+            par_values = _init_quadlorentz(x, height, peaks, spin, method)
 
-            dx = max(x)-min(x)
-            par_values = {'nu_0':((max(x)+min(x))/2, min(x), max(x), False),
-                          'nu_q':(dx/12, 0, dx, False),
-                          'efgAsym':(0, 0, 1, True),
-                          'efgTheta':(0, 0, 2*np.pi, True),
-                          'efgPhi':(0, 0, 2*np.pi, True),
-                          'amp0':(height, height*0.1, np.inf, False),
-                          'amp1':(height, height*0.1, np.inf, False),
-                          'amp2':(height, height*0.1, np.inf, False),
-                          'amp3':(height, height*0.1, np.inf, False),
-                          'fwhm':(dx/10, 0, dx, False),
-                          'baseline':(base, -np.inf, np.inf, False)
-                         }
         elif fn_name == 'pseudovoigt':
-
-            par_values = {'peak':(peak, min(x), max(x), False),
-                          'fwhm':(width, 0, np.inf, False),
-                          'height':(height, *height_bounds, False),
+            par_values = {'peak':(pk, min(x), max(x), False),
+                          'fwhm':(wd, 0, np.inf, False),
+                          'height':(ht, *height_bounds, False),
                           'fracL':(0.5, 0, 1, False),
-                          'baseline':(base, -np.inf, np.inf, False)
                          }
 
-    else:
-        raise RuntimeError(f'gen_init_par: Bad function name "{fn_name}".')
+        components.append(par_values)
 
-    # do multicomponent
-    par_values2 = {}
-    if ncomp > 1:
-        for c in range(ncomp):
-            for n in par_values.keys():
-                if 'baseline' not in n:
-                    par_values2[n+'_%d' % c] = par_values[n]
-                else:
-                    par_values2[n] = par_values[n]
-    else:
-        par_values2 = par_values
+    return (components, shared)
+
+# ======================================================================= #
+def _find_peaks(x, signal, dsignal):
+    """
+        Find peaks in the signal, with widths at half height.
+
+        x:          sorted 1D array of frequencies
+        signal:     1D array, positive at peaks
+        dsignal:    1D array, errors in signal
+
+        Returns list of (position, height, fwhm), sorted by prominence,
+        largest first
+    """
+
+    if len(x) < 5:
+        return []
+
+    # light smoothing to suppress single-bin noise
+    smooth = np.convolve(signal, np.ones(3)/3, mode='same')
+    smooth[[0, -1]] = signal[[0, -1]]
+
+    noise = np.median(dsignal[dsignal > 0]) if np.any(dsignal > 0) else 0
+    idx, props = find_peaks(smooth, prominence=max(2*noise, 0))
+
+    if len(idx) == 0:
+        return []
+
+    order = np.argsort(props['prominences'])[::-1]
+    idx = idx[order]
+
+    # widths in bins to widths in x
+    widths, _, left, right = peak_widths(smooth, idx, rel_height=0.5)
+    bins = np.arange(len(x))
+    fwhm = np.interp(right, bins, x)-np.interp(left, bins, x)
+    fwhm[fwhm <= 0] = np.mean(np.diff(x))
+
+    return [(x[i], signal[i], w) for i, w in zip(idx, fwhm)]
+
+# ======================================================================= #
+def _init_quadlorentz(x, height, peaks, spin, method):
+    """
+        Initial parameters for the QuadLorentz function.
+
+        peaks: list of (position, height, fwhm), largest first
+
+        Returns dict {name: (p0, blo, bhi, fixed)}
+    """
+
+    dx = max(x)-min(x)
+    nu_0 = (max(x)+min(x))/2
+    nu_q = dx/12
+    fwhm = dx/10
+    amps = [height]*4
+
+    # positions of the four lines per unit nu_q, highest frequency first
+    ms = np.arange(-(spin-1), spin+1)[:4]
+    offsets = np.array([qp_1st_order(1, 0, 0, 0, m) for m in ms])
+
+    # one peak for each line, else use the heuristic
+    n = min(len(peaks), len(offsets))
+
+    if method == 'regression' and n >= 2 and n == len(offsets):
+
+        # largest peaks, matched to lines in order of frequency
+        pk = sorted(peaks[:n], key=lambda p: p[0], reverse=True)
+        pos = np.array([p[0] for p in pk])
+
+        # linear least squares: pos = nu_0 + nu_q*off
+        nu_q_fit, nu_0_fit = np.polyfit(offsets, pos, 1)
+
+        if 0 < nu_q_fit < dx:
+            nu_q = nu_q_fit
+            nu_0 = nu_0_fit
+            fwhm = np.median([p[2] for p in pk])
+
+            # amplitudes from the signal at the predicted line positions
+            for i, o in enumerate(offsets):
+                nearest = np.argmin(np.abs(pos-(nu_0+nu_q*o)))
+                amps[i] = max(abs(pk[nearest][1]), abs(height)*0.1)
 
-    return pd.DataFrame(par_values2, index=['p0', 'blo', 'bhi', 'fixed']).transpose()
+    par_values = {'nu_0':(nu_0, min(x), max(x), False),
+                  'nu_q':(nu_q, 0, dx, False),
+                  'efgAsym':(0, 0, 1, True),
+                  'efgTheta':(0, 0, 2*np.pi, True),
+                  'efgPhi':(0, 0, 2*np.pi, True),
+                  'amp0':(amps[0], height*0.1, np.inf, False),
+                  'amp1':(amps[1], height*0.1, np.inf, False),
+                  'amp2':(amps[2], height*0.1, np.inf, False),
+                  'amp3':(amps[3], height*0.1, np.inf, False),
+                  'fwhm':(fwhm, 0, dx, False),
+                 }
 
+    return par_values
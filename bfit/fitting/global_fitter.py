@@ -5,9 +5,11 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
+from scipy.optimize import curve_fit, least_squares
+from scipy.sparse import coo_matrix
 import os
 import time
+import multiprocessing
 from bfit.fitting.minuit import minuit
 from collections.abc import Iterable
 from bfit.fitting.leastsquares import LeastSquares
@@ -20,6 +22,12 @@ __doc__=\
     Uses scipy.optimize.curve_fit to fit a function or list of functions to a 
     set of data with shared parameters.
     
+    For fits with many data sets, minimizer='sparse' uses 
+    scipy.optimize.least_squares with the block-sparse jacobian structure 
+    given by the sharing links. minimizer='alternating' instead alternates 
+    between fitting the local parameters of each data set and fitting the 
+    shared parameters. 
+    
     Usage: 
         
         Construct fitter:
@@ -70,8 +78,10 @@ class global_fitter(object):
                                     (if len(shared) < len(actual inputs))
             
             minuit                  Minuit object for minimizing with migrad algorithm
-            minimizer               string: one of "curve_fit" or "migrad"
+            minimizer               string: one of "trf", "dogbox", "sparse", "alternating", 
+                                    "migrad", or "minos"
             
+            niter                   number of iterations taken by the alternating minimizer
             npar                    number of parameters in input function
             nsets                   number of data sets
             
@@ -105,6 +115,11 @@ class global_fitter(object):
     draw_modes = ('stack', 's', 'new', 'n', 'append', 'a')   # for checking modes
     ndraw_pts = 500             # number of points to draw fits with
     
+    # least_squares options forwarded to the block fits of the alternating 
+    # minimizer
+    alternating_fitargs = ('ftol', 'xtol', 'gtol', 'x_scale', 'loss', 
+                           'f_scale', 'diff_step', 'max_nfev', 'verbose')
+    
     # ======================================================================= #
     def __init__(self, fn, x, y, dy=None, dx=None, dy_low=None, dx_low=None, 
                 shared=None, fixed=None, metadata=None, fprime_dx=1e-6):
@@ -324,6 +339,194 @@ class global_fitter(object):
         std = np.diag(cov)**0.5
         return (par, std, std, cov)
     
+    # ======================================================================= #
+    def _do_least_squares_sparse(self, master_fn, p0_first, **fitargs):
+        """
+            Run least_squares minimizer, using the known sparsity of the 
+            jacobian. Cost scales with the number of data sets rather than 
+            with the square of the number of free parameters.
+        """
+        
+        if self.dxcat is not None:
+            warnings.warn("sparse minimizer does not account for x errors")
+        
+        if self.dycat_low is not None:
+            warnings.warn("sparse minimizer does not account for asymmetric errors")
+        
+        # weights
+        ycat = self.ycat
+        if self.dycat is not None:  dycat = self.dycat
+        else:                       dycat = np.ones(len(ycat))
+        
+        def residual(par):
+            return (master_fn(None, *par)-ycat)/dycat
+        
+        # bounds
+        bounds = fitargs.pop('bounds', (-np.inf, np.inf))
+        fitargs.pop('print_level', None)
+        
+        result = least_squares(residual, p0_first, 
+                               jac_sparsity = self._get_jac_sparsity(), 
+                               bounds = bounds, 
+                               method = 'trf', 
+                               tr_solver = 'lsmr', 
+                               **fitargs)
+        
+        if not result.success:
+            raise RuntimeError('least_squares failed to converge: %s' % result.message)
+        
+        # covariance matrix: only the (small) normal matrix is made dense
+        jac = result.jac
+        cov = np.linalg.pinv((jac.T @ jac).toarray())
+        
+        # scale covariance as in curve_fit with absolute_sigma=False
+        if self.dycat is None:
+            dof = len(ycat) - len(result.x)
+            if dof > 0:     cov *= 2*result.cost/dof
+            else:           cov.fill(np.inf)
+        
+        std = np.diag(cov)**0.5
+        return (result.x, std, std, cov)
+        
+    # ======================================================================= #
+    def _do_alternating(self, master_fn, master_fnprime, p0_flat_inv, p0_first, 
+                        max_iter=1000, tol=1e-6, n_jobs=1, errors='hesse', 
+                        **fitargs):
+        """
+            Block-coordinate minimization. Fix the shared parameters and fit 
+            the local parameters of each data set independently, then fit the 
+            shared parameters with the local parameters fixed. Repeat until 
+            the decrease in the global chisquared is less than tol. 
+            
+            Errors are from a single HESSE on the full problem.
+            
+            Other fitargs in alternating_fitargs are passed to least_squares 
+            for each block fit, and to the error calculation if errors is 
+            "sparse". Other fitargs raise RuntimeError.
+            
+            max_iter:   maximum number of iterations
+            tol:        tolerance on the decrease in (unnormalized) chisquared
+            n_jobs:     number of processes for fitting the local parameters
+            errors:     one of "hesse" or "sparse". If "sparse", get errors 
+                        from the block-sparse jacobian (see 
+                        _do_least_squares_sparse) rather than the dense 
+                        HESSE, which is much faster for many data sets. 
+        """
+        
+        if self.dxcat is not None:
+            warnings.warn("alternating minimizer does not account for x "+\
+                          "errors prior to the final error calculation")
+        
+        links = self.sharing_links
+        nfree = len(p0_first)
+        
+        # check fit options
+        bounds = fitargs.pop('bounds', None)
+        print_level = fitargs.pop('print_level', 0)
+        bad_keys = [k for k in fitargs if k not in self.alternating_fitargs]
+        if bad_keys:
+            raise RuntimeError('Unsupported fitargs for alternating minimizer: %s'%\
+                               ', '.join(bad_keys))
+        
+        # set bounds
+        if bounds is not None:
+            lo, hi = bounds
+            lo = np.asarray(lo, dtype=float)
+            hi = np.asarray(hi, dtype=float)
+        else:
+            lo = np.full(nfree, -np.inf)
+            hi = np.full(nfree, np.inf)
+        
+        # save for the block fits
+        self._alternating_p0_flat_inv = p0_flat_inv
+        self._alternating_bounds = (lo, hi)
+        self._alternating_fitargs = fitargs
+        
+        # get the free parameters for each block
+        idx_shared = np.unique(links[:, self.shared])
+        idx_shared = idx_shared[idx_shared >= 0]
+        idx_local = [lnk[(~self.shared) & (lnk >= 0)] for lnk in links]
+        sets_local = [i for i in range(self.nsets) if len(idx_local[i]) > 0]
+        sets_all = np.arange(self.nsets)
+        
+        # starting parameters
+        par = np.asarray(p0_first, dtype=float)
+        
+        # set up parallel local fits
+        if n_jobs > 1:
+            pool = multiprocessing.get_context('fork').Pool(n_jobs, 
+                                initializer = _set_alternating_fitter, 
+                                initargs = (self, ))
+            do_map = pool.map
+        else:
+            _set_alternating_fitter(self)
+            do_map = map
+        
+        # iterate
+        chi_last = np.inf
+        try:
+            for i in range(max_iter):
+                
+                par_last = np.copy(par)
+                
+                # fit local parameters, one data set at a time
+                local = do_map(_fit_alternating_local, 
+                               [(par, idx_local[j], [j]) for j in sets_local])
+                for j, p in zip(sets_local, local):
+                    par[idx_local[j]] = p
+                
+                # fit shared parameters
+                if len(idx_shared) > 0:
+                    par[idx_shared] = self._fit_block(par, idx_shared, sets_all)
+                
+                # extrapolate along the direction of the sweep: alternating 
+                # steps zig-zag slowly if local and shared are correlated
+                par, chi = self._extrapolate_alternating(par, par-par_last)
+                
+                # check convergence
+                if chi_last-chi <= tol:
+                    break
+                chi_last = chi
+            
+            else:
+                warnings.warn('Alternating minimizer did not converge in '+\
+                              '%d iterations' % max_iter)
+        finally:
+            if n_jobs > 1:
+                pool.close()
+                pool.join()
+            _set_alternating_fitter(None)
+            
+        self.niter = i+1
+        
+        # get errors from the full problem
+        if errors == 'sparse':
+            return self._do_least_squares_sparse(master_fn, par, 
+                                                 bounds = (lo, hi), 
+                                                 **fitargs)
+        elif errors != 'hesse':
+            raise RuntimeError("Unrecognized errors input '%s'" % errors)
+        
+        m = minuit(master_fn, self.xcat, self.ycat, 
+                            dy = self.dycat, 
+                            dx = self.dxcat, 
+                            dy_low = self.dycat_low, 
+                            dx_low = self.dxcat_low, 
+                            fn_prime = master_fnprime,
+                            start = par, 
+                            limit = np.array((lo, hi)).T, 
+                            print_level = print_level)
+        
+        self.ls = m.ls
+        self.minuit = m
+        
+        try:
+            m.hesse()
+        except UnicodeEncodeError:  # can't print on older machines
+            pass
+        
+        return (m.values, m.errors, m.errors, m.covariance)
+    
     # ======================================================================= #
     def _do_migrad(self, master_fn, master_fnprime, do_minos, p0_first, **fitargs):
                 
@@ -511,8 +714,15 @@ class global_fitter(object):
                             
                             bounds.shape = (2, npars)
                             
-            minimizer:      string. One of "trf", "dogbox", or "migrad" indicating 
-                            which code to use to minimize the function
+            minimizer:      string. One of "trf", "dogbox", "sparse", 
+                            "alternating", "migrad", or "minos" indicating 
+                            which code to use to minimize the function. 
+                            "sparse" uses least_squares with the block-sparse 
+                            jacobian from the sharing links, for fits with 
+                            many data sets. "alternating" fits the local and 
+                            shared parameters in turn, see _do_alternating 
+                            for additional fitargs (max_iter, tol, n_jobs, 
+                            errors).
             
             do_minos:       if true, and if minimizer==migrad, then run minos errors
             
@@ -650,6 +860,20 @@ class global_fitter(object):
             fitargs['method'] = minimizer
             par, std_l, std_u, cov = self._do_curve_fit(master_fn, p0_first, **fitargs)
         
+        # do least_squares with sparse jacobian
+        elif minimizer == 'sparse':
+            par, std_l, std_u, cov = self._do_least_squares_sparse(master_fn, 
+                                                                   p0_first, 
+                                                                   **fitargs)
+        
+        # do block-coordinate fitting
+        elif minimizer == 'alternating':
+            par, std_l, std_u, cov = self._do_alternating(master_fn, 
+                                                          master_fnprime, 
+                                                          p0_flat_inv, 
+                                                          p0_first, 
+                                                          **fitargs)
+        
         # do migrad
         elif minimizer in ('migrad', 'minos'):
             fprime_dx = self.fprime_dx
@@ -835,6 +1059,109 @@ class global_fitter(object):
         # we don't know what's happening
         raise RuntimeError('Unexpected bound size input')
         
+    # ======================================================================= #
+    def _get_jac_sparsity(self):
+        """
+            Get the sparsity structure of the jacobian of the master function: 
+            each data set depends only on the shared parameters and its own 
+            free parameters. 
+            
+            Returns scipy.sparse matrix of shape (len(xcat), nfree parameters)
+        """
+        
+        rows = []
+        cols = []
+        start = 0
+        for x, lnk in zip(self.x, self.sharing_links):
+            
+            # free parameters of this data set
+            free = lnk[lnk >= 0]
+            npts = len(x)
+            
+            # all points depend on all free parameters
+            rows.append(np.repeat(np.arange(start, start+npts), len(free)))
+            cols.append(np.tile(free, npts))
+            start += npts
+            
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        nfree = np.max(self.sharing_links)+1
+        
+        return coo_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), 
+                          shape=(start, nfree)).tocsr()
+    
+    # ======================================================================= #
+    def _extrapolate_alternating(self, par, step):
+        """
+            Line search along step, doubling the step length while the global 
+            chisquared decreases. 
+            
+            Returns (par, chisquared)
+        """
+        
+        lo, hi = self._alternating_bounds
+        sets = np.arange(self.nsets)
+        get_chi = lambda p: np.sum(np.square(self._get_block_residual(p, sets)))
+        
+        chi = get_chi(par)
+        while np.any(step != 0):
+            new_par = np.clip(par+step, lo, hi)
+            new_chi = get_chi(new_par)
+            
+            if not new_chi < chi:
+                break
+            
+            par = new_par
+            chi = new_chi
+            step = step*2
+            
+        return (par, chi)
+        
+    # ======================================================================= #
+    def _fit_block(self, par, idx, sets):
+        """
+            Minimize the chisquared of the selected data sets with respect to 
+            a subset of the free parameters, keeping all others fixed. 
+            
+            par:    flattened array of all free parameters
+            idx:    indexes of par to vary
+            sets:   indexes of data sets to include in the chisquared
+            
+            Returns best values of par[idx]
+        """
+        
+        lo, hi = self._alternating_bounds
+        par = np.copy(par)
+        
+        def residual(p):
+            par[idx] = p
+            return self._get_block_residual(par, sets)
+        
+        result = least_squares(residual, par[idx], bounds=(lo[idx], hi[idx]), 
+                               method='trf', **self._alternating_fitargs)
+        return result.x
+    
+    # ======================================================================= #
+    def _get_block_residual(self, par, sets):
+        """
+            Get normalized residuals of the selected data sets
+            
+            par:    flattened array of all free parameters
+            sets:   indexes of data sets to include
+        """
+        
+        inputs = np.take(np.hstack((par, self._alternating_p0_flat_inv)), 
+                         self.sharing_links[sets], axis=0)
+        
+        res = []
+        for i, inpt in zip(sets, inputs):
+            r = self.fn[i](self.x[i], *inpt, *self.metadata[i]) - self.y[i]
+            if self.dy is not None:
+                r = r/self.dy[i]
+            res.append(r)
+            
+        return np.concatenate(res)
+    
     # ======================================================================= #
     def _flatten(self, arr):
         """
@@ -850,6 +1177,20 @@ class global_fitter(object):
             arr2.extend(arr[i][(~fixed[i])*(~shared)])
         return np.array(arr2)
 
+# =========================================================================== #
+# global fitter for worker processes of the alternating minimizer
+_alternating_fitter = None
+
+def _set_alternating_fitter(fitter):
+    global _alternating_fitter
+    _alternating_fitter = fitter
+
+def _fit_alternating_local(args):
+    """
+        Fit the local parameters of one data set. args: (par, idx, sets)
+    """
+    return _alternating_fitter._fit_block(*args)
+    
 # =========================================================================== #
 def get_depth(lst, _n=0):
     """
@@ -1 +1,7 @@
+import matplotlib
+try:
+    matplotlib.use('TkAgg')
+except ImportError:
+    pass
+
 __all__=['bfit']
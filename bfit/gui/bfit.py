@@ -41,12 +41,16 @@ from bfit.gui.calculator_nmr_atten import calculator_nmr_atten
 from bfit.gui.popup_drawstyle import popup_drawstyle
 from bfit.gui.popup_deadtime import popup_deadtime
 from bfit.gui.popup_redraw_period import popup_redraw_period
+from bfit.gui.popup_fit_n_jobs import popup_fit_n_jobs
+from bfit.gui.popup_memory import popup_memory
 from bfit.gui.popup_terminal import popup_terminal
 from bfit.gui.popup_units import popup_units
 from bfit.gui.popup_set_ppm_reference import popup_set_ppm_reference
 from bfit.gui.popup_ongoing_process import popup_ongoing_process
 from bfit.gui.popup_set_histograms import popup_set_histograms
 from bfit.backend.PltTracker import PltTracker
+from bfit.backend.RunExporter import bundle_formats
+from bfit.backend.FitResults import write_frame
 from bfit.backend.fitdata import fitdata
 import bfit.backend.colors as colors
 
@@ -112,12 +116,17 @@ class bfit(object):
             draw_prebin:    BoolVar, if true draw prebeam bins
             draw_rel_peak0: BoolVar for drawing frequencies relative to peak0
             draw_standardized_res: BoolVar for drawing residuals as standardized
+            fit_max_nfcn:   int, max number of function calls to fit each run, 0 for no limit
+            fit_max_time:   float, max time in s to fit each run, 0 for no limit
+            fit_n_jobs:     int, number of processes for fitting runs independently
             norm_with_param:BoolVar, if true estimate normalization from data only
             hist_select:    histogram selection for asym calcs (blank for defaults)
             label_default:  StringVar() name of label defaults for fetch
             logger:         logging object
             logger_name:    string of unique logger name
             mainframe:      main frame for the object
+            memory_budget:  int, memory in MB for fetched runs above which
+                            unselected runs unload their histograms (0: no limit)
             menus:          dict {title: Menu} of menubar options
             minimizer:      StringVar: path to python module with fitter object
             notebook:       contains all tabs for operations:
@@ -133,7 +142,8 @@ class bfit(object):
             style:          dict, drawing styles
             thermo_channel: StringVar for tracking how temperature is calculated
             units:          dict:(float, str). conversion rate from original to display units
-            update_period:  int, update spacing in s.
+            update_period:  int, update spacing in s, for redrawing the fileviewer
+                            and refreshing fetched runs
             use_nbm:        BooleanVar, use NBM in asym calculations
 
     """
@@ -312,6 +322,8 @@ class bfit(object):
     minimizers = {'curve_fit (trf)':'bfit.fitting.fitter_curve_fit',
                   'migrad (hesse)':'bfit.fitting.fitter_migrad_hesse',
                   'migrad (minos)':'bfit.fitting.fitter_migrad_minos',
+                  'least_squares (sparse)':'bfit.fitting.fitter_least_squares_sparse',
+                  'levenberg-marquardt (batch)':'bfit.fitting.fitter_batch',
                   }
 
     # define draw componeents in draw_param and labels
@@ -340,6 +352,10 @@ class bfit(object):
 
         # default settings
         self.update_period = 10  # s
+        self.fit_n_jobs = 1      # processes for independent fitting
+        self.fit_max_nfcn = 0    # function calls per run, no limit
+        self.fit_max_time = 0    # s per run, no limit
+        self.memory_budget = 0   # MB, no limit
         self.ppm_reference = 41270000 # Hz
         self.hist_select = ''    # histogram selection for asym calculations
         self.use_nbm_settings = {'default':False,
@@ -499,6 +515,10 @@ class bfit(object):
         menu_file.add_command(label='Run Commands', command=lambda:popup_terminal(wref.proxy(self)))
         menu_file.add_command(label='Export Data', command=self.do_export)
         menu_file.add_command(label='Export Fits', command=self.do_export_fit)
+        menu_file.add_command(label='Export Data to Single File',
+                              command=lambda: self.do_export(single_file=True))
+        menu_file.add_command(label='Export Fits to Single File',
+                              command=lambda: self.do_export_fit(single_file=True))
         menu_file.add_command(label='Save State', command=self.save_state)
         menu_file.add_command(label='Load State', command=self.load_state)
         menu_file.add_command(label='Close All Figures', command=self.do_close_all)
@@ -517,9 +537,13 @@ class bfit(object):
         menu_settings.add_cascade(menu=menu_settings_dir, label='Data directory')
         menu_settings.add_command(label='Drawing style',
                 command=self.set_draw_style)
+        menu_settings.add_command(label='Fitting processes and budget',
+                command=self.set_fit_n_jobs)
         menu_settings.add_command(label='Histograms',
                 command=self.set_histograms)
         menu_settings.add_cascade(menu=menu_settings_lab, label='Labels default')
+        menu_settings.add_command(label='Memory budget',
+                command=self.set_memory_budget)
         menu_settings.add_command(label='PPM Reference Frequecy',
                 command=self.set_ppm_reference)
         menu_settings.add_cascade(menu=menu_settings_probe, label='Probe Species')
@@ -729,13 +753,19 @@ class bfit(object):
         for k in self.plt.active:   self.plt.active[k] = 0
 
     # ======================================================================= #
-    def do_export(self):
+    def do_export(self, single_file=False):
         """Export selected files to csv format. Calls the appropriate function
-        depending on what tab is selected. """
+        depending on what tab is selected. If single_file, export all fetched
+        runs to one file."""
 
         idx = self.notebook.index('current')
         self.logger.debug('Exporting for notebook index %d', idx)
-        if idx == 0:        # data viewer
+
+        if single_file:
+            filename = self.get_export_filename()
+            if filename:
+                self.fetch_files.export(filename=filename)
+        elif idx == 0:        # data viewer
             self.fileviewer.export()
         elif idx == 1:        # data fetch_files
             self.fetch_files.export()
@@ -745,7 +775,14 @@ class bfit(object):
             pass
 
     # ======================================================================= #
-    def do_export_fit(self): self.fit_files.export_fit()
+    def do_export_fit(self, single_file=False):
+        """Export fit curves. If single_file, export all runs to one file."""
+        if single_file:
+            filename = self.get_export_filename()
+            if filename:
+                self.fit_files.export_fit(filename=filename)
+        else:
+            self.fit_files.export_fit()
 
     # ======================================================================= #
     def draw_binder(self, *args):
@@ -771,6 +808,91 @@ class bfit(object):
 
         self.logger.info('Exporting single run (%d) as "%s"', data.run, filename)
 
+        calculate, header = self.get_export_job(data, rebin=rebin, omit=omit)
+        write_frame(calculate(), filename, header+[''])
+
+    # ======================================================================= #
+    def export_runs(self, exporter, filename=None):
+        """
+            Calculate and write exported runs in the background, with a
+            progress window
+
+            exporter:   RunExporter
+            filename:   str, if None write one csv file per run, else write all
+                        runs to this file
+
+            Returns list of ids of runs which failed, None if cancelled
+        """
+
+        if len(exporter) == 0:
+            return []
+
+        que = Queue()
+        popup = popup_ongoing_process(self,
+                    target = lambda: exporter.run(filename, que),
+                    message = "Exporting %d runs..." % len(exporter),
+                    queue = que,
+                    nsteps = len(exporter),
+                    callback = lambda out: None if out[0] == 'run' else out,
+                    )
+        output = popup.run()
+
+        # export cancelled
+        if output is None:
+            self.logger.info('Export cancelled')
+            return
+
+        status, value = output
+
+        # single file write failed
+        if status == 'error':
+            self.logger.error(value)
+            messagebox.showerror('Export', value)
+            return
+
+        # print error message
+        if value:
+            s = ['Failed to export run']
+            s.extend(value)
+            s = '\n'.join(s)
+            self.logger.warning(s)
+            messagebox.showinfo(message=s)
+
+        return value
+
+    # ======================================================================= #
+    def get_export_filename(self):
+        """Ask for the name of a file to export many runs to"""
+
+        filetypes = [('numpy', '*.npz'),
+                     ('parquet', '*.parquet'),
+                     ('hdf5', '*.h5'),
+                     ('allfiles', '*')]
+        filename = filedialog.asksaveasfilename(filetypes=filetypes,
+                                                defaultextension='.npz')
+
+        # check extension
+        if filename and os.path.splitext(filename)[1].lower() not in bundle_formats:
+            filename += '.npz'
+
+        return filename
+
+    # ======================================================================= #
+    def get_export_job(self, data, rebin=1, omit=''):
+        """
+            Get the calculation of the exported asymmetry of a run. The GUI
+            settings are read here, such that the calculation can be run in
+            a worker thread.
+
+            data:   fitdata object
+            rebin:  int, rebinning
+            omit:   str, bin omission string
+
+            Returns (calculate, header), where calculate is a function handle
+            returning the DataFrame to write and header is a list of comment
+            lines
+        """
+
         # settings
         title_dict = {'c':"combined",
                       'p':"positive_helicity",
@@ -787,33 +909,39 @@ class bfit(object):
 
         index_list = ['time_s', 'freq_Hz', 'voltage_mV', 'x_parameter']
 
-        # get asymmetry
-        asym = data.asym(hist_select=self.hist_select, omit=omit,
-                         rebin=rebin, nbm=self.use_nbm.get(),
-                         slr_bkgd_corr=self.correct_bkgd.get())
-
-        # get new keys
-        asym_out = {}
-        for k in asym.keys():
-            if k == 'custom':
-                asym_out[data.ppg.customv_name_read.units] = asym[k]
-            elif len(asym[k]) == 2:
-                asym_out[title_dict[k]] = asym[k][0]
-                asym_out[title_dict[k]+"_err"] = asym[k][1]
-            else:
-                asym_out[title_dict[k]] = asym[k]
+        options = data.get_asym_options(hist_select=self.hist_select, omit=omit,
+                                        rebin=rebin, nbm=self.use_nbm.get(),
+                                        slr_bkgd_corr=self.correct_bkgd.get())
 
-        # make pandas dataframe
-        df = pd.DataFrame.from_dict(asym_out)
+        def calculate():
 
-        # set index
-        if 'custom' in asym.keys():
-            df.set_index(data.ppg.customv_name_read.units, inplace=True)
-        else:
-            for i in index_list:
-                if i in asym_out.keys():
-                    df.set_index(i, inplace=True)
-                    break
+            # get asymmetry
+            asym = data.asym(options=options)
+
+            # get new keys
+            asym_out = {}
+            for k in asym.keys():
+                if k == 'custom':
+                    asym_out[data.ppg.customv_name_read.units] = asym[k]
+                elif len(asym[k]) == 2:
+                    asym_out[title_dict[k]] = asym[k][0]
+                    asym_out[title_dict[k]+"_err"] = asym[k][1]
+                else:
+                    asym_out[title_dict[k]] = asym[k]
+
+            # make pandas dataframe
+            df = pd.DataFrame.from_dict(asym_out)
+
+            # set index
+            if 'custom' in asym.keys():
+                df.set_index(data.ppg.customv_name_read.units, inplace=True)
+            else:
+                for i in index_list:
+                    if i in asym_out.keys():
+                        df.set_index(i, inplace=True)
+                        break
+
+            return df
 
         # make header
         header = [  '# %s' % data.id,
@@ -837,15 +965,7 @@ class bfit(object):
                         *header_foot
                      ]
 
-        # write to file
-        with open(filename, 'w') as fid:
-            fid.write('\n'.join(header) + '\n')
-
-        try:
-            df.to_csv(filename, mode='a+')
-        except AttributeError:
-            self.logger.exception('Export file write failed')
-            pass
+        return (calculate, header)
 
     # ======================================================================= #
     def get_asym_mode(self, obj):
@@ -1036,6 +1156,7 @@ class bfit(object):
         # clear loaded runs
         fetch_tab = self.fetch_files
         fetch_tab.remove_all()
+        self.fit_files.fit_results.clear()
 
         # bfit parameters
         self.style = from_file['style']
@@ -1059,6 +1180,13 @@ class bfit(object):
         self.label_default.set(from_file['label_default'])
         self.ppm_reference = from_file['ppm_reference']
         self.update_period = from_file['update_period']
+        self.fit_n_jobs = from_file.get('fit_n_jobs', 1)
+        self.fit_max_nfcn = from_file.get('fit_max_nfcn', 0)
+        self.fit_max_time = from_file.get('fit_max_time', 0)
+        self.fit_files.fitter.n_jobs = self.fit_n_jobs
+        self.fit_files.fitter.max_nfcn = self.fit_max_nfcn or None
+        self.fit_files.fitter.max_time = self.fit_max_time or None
+        self.memory_budget = from_file.get('memory_budget', 0)
         self.bnmr_data_dir = from_file['bnmr_data_dir']
         self.bnqr_data_dir = from_file['bnqr_data_dir']
 
@@ -1162,8 +1290,7 @@ class bfit(object):
         for id, fitpar in fitpar_all.items():
 
             # make sure dataline checkboxes are active
-            fetch_tab.data_lines[id].draw_fit_checkbox['state'] = 'normal'
-            fetch_tab.data_lines[id].draw_res_checkbox['state'] = 'normal'
+            fetch_tab.data_lines[id].set_fit_enabled(True)
 
             # get pulse length
             pulse_len = 0
@@ -1190,6 +1317,15 @@ class bfit(object):
             data[id].drop_unused_param(fitpar.index)
             data[id].fitfn = fitfn1
 
+            # store fitted results
+            if not all(fitpar['res'].isna()):
+                fit_files.fit_results.append(id, fitpar, meta={
+                            'Run Number': data[id].run,
+                            'Year': data[id].year,
+                            'Fit Function': from_file['fit_fit_function_title'],
+                            'Number of Components': from_file['fit_n_component'],
+                            })
+
         fit_files.populate()
 
     # ======================================================================= #
@@ -1250,6 +1386,10 @@ class bfit(object):
         to_file['label_default'] = self.label_default.get()
         to_file['ppm_reference'] = self.ppm_reference
         to_file['update_period'] = self.update_period
+        to_file['fit_n_jobs'] = self.fit_n_jobs
+        to_file['fit_max_nfcn'] = self.fit_max_nfcn
+        to_file['fit_max_time'] = self.fit_max_time
+        to_file['memory_budget'] = self.memory_budget
         to_file['deadtime'] = self.deadtime
         to_file['deadtime_switch'] = self.deadtime_switch.get()
         to_file['deadtime_global'] = self.deadtime_global.get()
@@ -1409,7 +1549,10 @@ class bfit(object):
         self.logger.info('Repopulating fitter...')
         self.fit_files.fitter = self.routine_mod.fitter(
                                     keyfn = self.get_run_key,
-                                    probe_species = self.probe_species.get())
+                                    probe_species = self.probe_species.get(),
+                                    n_jobs = self.fit_n_jobs,
+                                    max_nfcn = self.fit_max_nfcn or None,
+                                    max_time = self.fit_max_time or None)
         self.fit_files.fit_routine_label['text'] = self.fit_files.fitter.__name__
         self.fit_files.populate()
         self.logger.debug('Success.')
@@ -1506,8 +1649,10 @@ class bfit(object):
         self.fetch_files.check_all()
     def set_deadtime(self):          popup_deadtime(wref.proxy(self))
     def set_draw_style(self):        popup_drawstyle(wref.proxy(self))
+    def set_fit_n_jobs(self, *a):    popup_fit_n_jobs(wref.proxy(self))
     def set_histograms(self, *a):    popup_set_histograms(wref.proxy(self))
     def set_focus_tab(self, idn, *a): self.notebook.select(idn)
+    def set_memory_budget(self, *a): popup_memory(wref.proxy(self))
     def set_nbm(self, mode):
         """
             Set the nbm variable based on the run mode
@@ -1604,6 +1749,41 @@ class bfit(object):
         # set list
         parent.entry_asym_type['values'] = modes
 
+    # ======================================================================= #
+    def trim_memory(self):
+        """
+            Unload the histograms of runs not selected for drawing or fitting,
+            least recently used first, until the fetched runs fit within the
+            memory budget.
+
+            Returns list of unloaded run ids
+        """
+
+        if self.memory_budget <= 0:
+            return []
+
+        budget = self.memory_budget*1024**2
+        nbytes = {k: d.get_nbytes() for k, d in self.data.items()}
+        total = sum(sum(n.values()) for n in nbytes.values())
+
+        unused = [k for k, d in self.data.items()
+                  if d.is_loaded and not d.check_state.get()]
+        unused.sort(key=lambda k: self.data[k].last_access)
+
+        unloaded = []
+        for k in unused:
+            if total <= budget:
+                break
+            self.data[k].unload()
+            total -= nbytes[k]['hist']
+            unloaded.append(k)
+
+        if unloaded:
+            self.logger.info('Memory budget of %d MB exceeded, unloaded runs %s',
+                             self.memory_budget, unloaded)
+
+        return unloaded
+
     # ======================================================================= #
     def update_bfit(self):
         """Check pip for updated version"""
@@ -1,11 +1,9 @@
 
 from tkinter import *
 from tkinter import ttk
-from functools import partial
 
 from bfit import logger_name
 from bfit.gui.popup_prepare_data import popup_prepare_data
-from bfit.backend.entry_color_set import on_focusout, on_entry_click
 import bfit.backend.colors as colors
 
 import numpy as np
@@ -14,40 +12,41 @@ import logging
 # =========================================================================== #
 class dataline(object):
     """
-        A line of objects to display run properties and remove bins and whatnot.
+        Run properties shown in one row of the fetch tab, used to select, label,
+        and remove bins and whatnot. Holds no widgets: only the visible 
+        datalines are shown, by binding them to a dataline_row.
         
         bdfit:          fitdata object 
         bfit:           pointer to root 
         bin_remove:     StringVar for specifying which bins to remove in 1f runs
-        check:          Checkbox for selection (related to check_state)
         check_data:     BooleanVar for specifying to draw data
         check_fit:      BooleanVar for specifying to draw fit
         check_res:      BooleanVar for specifying to draw residual
         check_state:    BooleanVar for specifying check state
-        draw_fit_checkbox: Checkbutton linked to check_fit
-        draw_res_checkbox: Checkbutton linked to check_res
+        check_text:     str, run summary shown with the selection checkbox
+        fit_enabled:    bool, if true the fit and residual checkboxes are active
         id:             Str key for unique idenfication
         label:          StringVar for labelling runs in legends
-        label_entry:    Entry object for labelling runs in legends
-        line_frame:     Frame that object is placed in
+        label_is_default: bool, if true the label is the default text (shown in
+                        grey) and is updated with the run
         lines_list:     dictionary of datalines
         lines_list_old: dictionary of datalines
         mode:           bdata run mode
         rebin:          IntVar for SLR rebin
         row:            position in list
         run:            bdata run number
+        view:           dataline_row showing this line, None if not visible
         year:           bdata year
     """
         
     bin_remove_starter_line = '24 100-200 (bins)'
     
     # ======================================================================= #
-    def __init__(self, bfit, lines_list, lines_list_old, fetch_tab_frame, bdfit, row):
+    def __init__(self, bfit, lines_list, lines_list_old, bdfit, row):
         """
             Inputs:
-                fetch_tab_frame: parent in which to place line
                 bdfit: fitdata object corresponding to the file which is placed here. 
-                row: where to grid this object
+                row: position in list
         """
         
         # get logger
@@ -57,10 +56,13 @@ class dataline(object):
         # variables
         self.bfit = bfit
         self.row = row
+        self.view = None
+        self.check_text = ''
+        self.fit_enabled = False
+        self.label_is_default = True
         
         # variables from fitdata object
         self.bdfit = bdfit
-        bd = bdfit.bd
         
         self.bin_remove = bdfit.omit
         self.label = bdfit.label
@@ -78,117 +80,51 @@ class dataline(object):
         self.check_fit = bdfit.check_draw_fit
         self.check_res = bdfit.check_draw_res
         
-        # build objects
-        line_frame = Frame(fetch_tab_frame)
-        line_frame.bind('<Enter>', self.on_line_enter)
-        line_frame.bind('<Leave>', self.on_line_leave)
-        
-        label_label = ttk.Label(line_frame, text="Label:", pad=5)
-        self.label_entry = Entry(line_frame, textvariable=self.label, \
-                width=22)
-                
-        remove_button = ttk.Button(line_frame, text='Remove', \
-                command=self.degrid, pad=1)
-        draw_button = ttk.Button(line_frame, text='Draw', 
-                                 command=lambda:self.draw(figstyle='data'), 
-                                 pad=1)
-        
-        draw_data_checkbox = ttk.Checkbutton(line_frame, text='Data', 
-                variable=self.check_data, onvalue=True, offvalue=False, pad=5, 
-                command=self.do_check_data)
-        
-        self.draw_fit_checkbox = ttk.Checkbutton(line_frame, text='Fit', 
-                variable=self.check_fit, onvalue=True, offvalue=False, pad=5, 
-                state=DISABLED, command=self.do_check_fit)
-        
-        self.draw_res_checkbox = ttk.Checkbutton(line_frame, text='Res', 
-                variable=self.check_res, onvalue=True, offvalue=False, pad=5, 
-                state=DISABLED, command=self.do_check_res)
-        
-        rebin_label = ttk.Label(line_frame, text="Rebin:", pad=5)
-        rebin_box = Spinbox(line_frame, from_=1, to=100, width=3, \
-                            textvariable=self.rebin)
+        # initial values
         self.rebin.set(self.bfit.fetch_files.check_rebin.get())
-                
         self.check_state.set(bfit.fetch_files.check_state.get())
-        self.check = ttk.Checkbutton(line_frame, variable=self.check_state, \
-                onvalue=True, offvalue=False, pad=5)
-         
         self.set_check_text()
-        
-        # add button for data prep
-        button_prep_data = ttk.Button(line_frame, text='Prep Data', 
-                                      command=lambda : popup_prepare_data(self.bfit, self.bdfit), 
-                                      pad=1)
-         
-        # add grey text to label
         self.set_label()
-                
-        # grid
-        c = 1
-        self.check.grid(column=c, row=0, sticky=E); c+=1
-        button_prep_data.grid(column=c, row=0, sticky=E); c+=1
-        rebin_label.grid(column=c, row=0, sticky=E); c+=1
-        rebin_box.grid(column=c, row=0, sticky=E); c+=1
-        label_label.grid(column=c, row=0, sticky=E); c+=1
-        self.label_entry.grid(column=c, row=0, sticky=E); c+=1
-        draw_data_checkbox.grid(column=c, row=0, sticky=E); c+=1
-        self.draw_fit_checkbox.grid(column=c, row=0, sticky=E); c+=1
-        self.draw_res_checkbox.grid(column=c, row=0, sticky=E); c+=1
-        draw_button.grid(column=c, row=0, sticky=E); c+=1
-        remove_button.grid(column=c, row=0, sticky=E); c+=1
         
-        # resizing
-        fetch_tab_frame.grid_columnconfigure(0, weight=1)   # big frame
-        for i in (3, 5, 7):
-            line_frame.grid_columnconfigure(i, weight=100)    # input labels
-        for i in (4, 6, 8):
-            line_frame.grid_columnconfigure(i, weight=1)  # input fields
-        
-        # passing
-        self.line_frame = line_frame
-                
     # ======================================================================= #
-    def __del__(self):
-        
-        # kill buttons and frame
-        try:
-            for child in self.line_frame.winfo_children():
-                child.destroy()
-        except Exception:
-            pass
+    def _update_view(self):
+        """Show changes in the row, if visible"""
+        if self.view is not None:
+            self.view.update()
             
     # ======================================================================= #
     def grid(self, row):
-        """Re-grid a dataline object so that it is in order by run number"""
+        """Place a dataline object in the list so that it is in order by run number"""
         self.row = row
-        self.line_frame.grid(column=0, row=row, columnspan=2, sticky=(W, N))
-        self.line_frame.update_idletasks()
         self.bfit.data[self.id] = self.bdfit
         self.set_check_text()
         
     # ======================================================================= #
-    def degrid(self):
-        """Hide displayed dataline object from file selection. """
+    def degrid(self, refresh=True):
+        """
+            Remove dataline object from file selection. 
+            
+            refresh: if true, update the list in the fetch tab. Set false when 
+                     removing many lines, then call fetch_files.update_lines
+        """
         
         self.logger.info('Degridding run %s', self.id)
         
-        # degrid
-        self.line_frame.grid_forget()
-        self.line_frame.update_idletasks()
-        
         self.lines_list_old[self.id] = self.lines_list[self.id]
         del self.lines_list[self.id]
         del self.bfit.data[self.id]
         
         # uncheck the fit
         self.check_fit.set(False)
-        self.draw_fit_checkbox.config(state='disabled')
+        self.set_fit_enabled(False)
         
         # remove data from storage
         if len(self.lines_list) == 0:
             self.bfit.fetch_files.runmode_label['text'] = ''
             self.bfit.fit_files.pop_fitconstr.constraints_are_set = False
+        
+        if refresh:
+            self.bfit.fetch_files.update_lines()
                 
     # ======================================================================= #
     def do_check_data(self):
@@ -198,7 +134,7 @@ class dataline(object):
         status = self.check_data.get()
             
         # set residuals
-        if str(self.draw_res_checkbox['state']) == 'normal' and status:
+        if self.fit_enabled and status:
             self.check_res.set(False)
     
     # ======================================================================= #
@@ -267,6 +203,32 @@ class dataline(object):
             self.bdfit.draw_residual(figstyle=figstyle, 
                                      rebin=self.rebin.get())
 
+    # ======================================================================= #
+    def get_draw_key(self):
+        """
+            Get the run settings and results which affect how the run is drawn,
+            for skipping redraws of unchanged runs
+        """
+        
+        bdfit = self.bdfit
+        key = ( self.label.get(), 
+                self.check_data.get(), 
+                self.check_fit.get(), 
+                self.check_res.get(), 
+                self.rebin.get(), 
+                bdfit.omit.get(), 
+                bdfit.omit_scan.get(), 
+                bdfit.base_bins.get(), 
+                bdfit.flip_asym.get(), 
+                str(bdfit.file_stats))
+        
+        # fit results
+        if self.check_fit.get() or self.check_res.get():
+            key += (str(bdfit.fitpar['res'].tolist()), 
+                    id(getattr(bdfit, 'fitfn', None)))
+        
+        return key
+        
     # ======================================================================= #
     def set_check_text(self):
         """Update the string for the check state box"""
@@ -320,7 +282,14 @@ class dataline(object):
         info_str = "%s %s, %s, %s, %s" %  (unique_id, 
                                              T, field_text, 
                                              bias_text, duration_text)
-        self.check.config(text=info_str)
+        self.check_text = info_str
+        self._update_view()
+    
+    # ======================================================================= #
+    def set_fit_enabled(self, state):
+        """Activate or deactivate the fit and residual checkboxes"""
+        self.fit_enabled = state
+        self._update_view()
     
     # ======================================================================= #
     def set_label(self):
@@ -332,36 +301,175 @@ class dataline(object):
         except KeyError:
             return
         
-        # clear old text
-        self.label_entry.delete(0, 'end')
+        self.label.set(label)
+        self.set_label_default(True)
         
-        # set
-        self.label_entry.insert(0, label)
+    # ======================================================================= #
+    def set_label_default(self, state):
+        """Mark the label as default text (grey), or as user-defined"""
+        self.label_is_default = state
+        self._update_view()
+
+    # ======================================================================= #
+    def update_label(self):
+        """Set label unless values are user-defined"""
         
-        # make function to clear and replace with default text
-        entry_fn_lab = partial(on_entry_click, text=label, 
-                               entry=self.label_entry)
-        on_focusout_fn_lab = partial(on_focusout, text=label, 
-                                 entry=self.label_entry)
-                                 
-        # bindings
-        self.label_entry.bind('<FocusIn>', entry_fn_lab)
-        self.label_entry.bind('<FocusOut>', on_focusout_fn_lab)
-        self.label_entry.config(foreground=colors.entry_grey)
+        if self.label_is_default:
+            self.set_label()
+
+# =========================================================================== #
+class dataline_row(object):
+    """
+        Widgets showing one dataline in the fetch tab. The rows are reused for 
+        different datalines as the list scrolls. 
+        
+        check:          Checkbox for selection (related to check_state)
+        draw_fit_checkbox: Checkbutton linked to check_fit
+        draw_res_checkbox: Checkbutton linked to check_res
+        frame:          Frame that objects are placed in
+        label_entry:    Entry object for labelling runs in legends
+        line:           dataline shown, or None
+    """
+    
+    # ======================================================================= #
+    def __init__(self, parent):
+        """
+            parent: Frame in which to place the row
+        """
+        
+        self.line = None
+        
+        # build objects
+        frame = Frame(parent)
+        frame.bind('<Enter>', self.on_line_enter)
+        frame.bind('<Leave>', self.on_line_leave)
+        
+        label_label = ttk.Label(frame, text="Label:", pad=5)
+        self.label_entry = Entry(frame, width=22)
+        self.label_entry.bind('<FocusIn>', self.on_entry_click)
+        self.label_entry.bind('<FocusOut>', self.on_focusout)
+                
+        remove_button = ttk.Button(frame, text='Remove', 
+                command=lambda: self.line.degrid(), pad=1)
+        draw_button = ttk.Button(frame, text='Draw', 
+                                 command=lambda: self.line.draw(figstyle='data'), 
+                                 pad=1)
+        
+        self.draw_data_checkbox = ttk.Checkbutton(frame, text='Data', 
+                onvalue=True, offvalue=False, pad=5, 
+                command=lambda: self.line.do_check_data())
+        
+        self.draw_fit_checkbox = ttk.Checkbutton(frame, text='Fit', 
+                onvalue=True, offvalue=False, pad=5, 
+                state=DISABLED, command=lambda: self.line.do_check_fit())
+        
+        self.draw_res_checkbox = ttk.Checkbutton(frame, text='Res', 
+                onvalue=True, offvalue=False, pad=5, 
+                state=DISABLED, command=lambda: self.line.do_check_res())
+        
+        rebin_label = ttk.Label(frame, text="Rebin:", pad=5)
+        self.rebin_box = Spinbox(frame, from_=1, to=100, width=3)
+                
+        self.check = ttk.Checkbutton(frame, onvalue=True, offvalue=False, pad=5)
+        
+        # add button for data prep
+        button_prep_data = ttk.Button(frame, text='Prep Data', 
+                command=lambda : popup_prepare_data(self.line.bfit, 
+                                                    self.line.bdfit), 
+                pad=1)
+         
+        # grid
+        c = 1
+        self.check.grid(column=c, row=0, sticky=E); c+=1
+        button_prep_data.grid(column=c, row=0, sticky=E); c+=1
+        rebin_label.grid(column=c, row=0, sticky=E); c+=1
+        self.rebin_box.grid(column=c, row=0, sticky=E); c+=1
+        label_label.grid(column=c, row=0, sticky=E); c+=1
+        self.label_entry.grid(column=c, row=0, sticky=E); c+=1
+        self.draw_data_checkbox.grid(column=c, row=0, sticky=E); c+=1
+        self.draw_fit_checkbox.grid(column=c, row=0, sticky=E); c+=1
+        self.draw_res_checkbox.grid(column=c, row=0, sticky=E); c+=1
+        draw_button.grid(column=c, row=0, sticky=E); c+=1
+        remove_button.grid(column=c, row=0, sticky=E); c+=1
+        
+        # resizing
+        for i in (3, 5, 7):
+            frame.grid_columnconfigure(i, weight=100)    # input labels
+        for i in (4, 6, 8):
+            frame.grid_columnconfigure(i, weight=1)  # input fields
+        
+        # passing
+        self.frame = frame
+        
+    # ======================================================================= #
+    def bind(self, line):
+        """Show a dataline in this row"""
+        
+        if line is self.line:
+            self.update()
+            return
+        
+        # finish editing the label of the old line
+        if self.line is not None and self.label_entry.focus_get() == self.label_entry:
+            self.on_focusout()
+            self.frame.focus_set()
+        
+        self.unbind()
+        self.line = line
+        line.view = self
+        
+        # link variables
+        self.check.config(variable=line.check_state)
+        self.rebin_box.config(textvariable=line.rebin)
+        self.label_entry.config(textvariable=line.label)
+        self.draw_data_checkbox.config(variable=line.check_data)
+        self.draw_fit_checkbox.config(variable=line.check_fit)
+        self.draw_res_checkbox.config(variable=line.check_res)
+        
+        self.update()
+        
+    # ======================================================================= #
+    def unbind(self):
+        """Stop showing the dataline"""
+        if self.line is not None and self.line.view is self:
+            self.line.view = None
+        self.line = None
         
+    # ======================================================================= #
+    def update(self):
+        """Show the state of the dataline"""
+        
+        line = self.line
+        self.check.config(text=line.check_text)
+        
+        state = 'normal' if line.fit_enabled else 'disabled'
+        self.draw_fit_checkbox.config(state=state)
+        self.draw_res_checkbox.config(state=state)
+        
+        if line.label_is_default:
+            self.label_entry.config(foreground=colors.entry_grey)
+        else:
+            self.label_entry.config(foreground=colors.entry_white)
+    
+    # ======================================================================= #
+    def on_entry_click(self, *args):
+        """Vanish default label text on click"""
+        if self.line is not None and self.line.label_is_default:
+            self.line.label.set('')
+            self.line.set_label_default(False)
+        
+    # ======================================================================= #
+    def on_focusout(self, *args):
+        """Set default label text on exit if empty"""
+        if self.line is not None and self.line.label.get() == '':
+            self.line.set_label()
+            
     # ======================================================================= #
     def on_line_enter(self, *args):
         """Make the dataline grey on mouseover"""
-        self.line_frame.config(bg=colors.focusbackground)
+        self.frame.config(bg=colors.focusbackground)
     
     # ======================================================================= #
     def on_line_leave(self, *args):
         """Make the dataline black on stop mouseover"""
-        self.line_frame.config(bg=colors.background)
-
-    # ======================================================================= #
-    def update_label(self):
-        """Set label unless values are user-defined"""
-        
-        if str(self.label_entry.config()['foreground'][4]) == colors.entry_grey:
-            self.set_label()
+        self.frame.config(bg=colors.background)
@@ -1,5 +1,6 @@
 from tkinter import *
 from tkinter import ttk, messagebox
+from functools import partial
 from bfit import logger_name
 from bdata import bdata, bmerged
 from bfit.gui.InputLine import InputLine
@@ -14,31 +15,30 @@ import logging, textwrap
 # =========================================================================== #
 class fitline(object):
     """
+        Fit parameters of one run, shown in the fit tab as a title row followed
+        by one row per parameter. Holds no widgets: only the visible rows are
+        shown, by binding them to a fitline_row.
+
         Instance variables
 
             bfit            pointer to top class
             data            fitdata object in bfit.data dictionary
-            disable_entry_callback  disables copy of entry strings to
-                                    dataline.bdfit parameter values
-            gui_param_button ttk.Button, set initial parameters 
+            init_enabled    bool, if true the initial value gui button is active
             lines           list of InputLine objects
-            parent          pointer to parent object (frame)
-            run_label       label for showing which run is selected
-            run_label_title label for showing which run is selected
-            fitframe        mainframe for this tab.
+            row             position in list
+            view            fitline_row showing the title, None if not visible
     """
 
     collist = ['p0', 'blo', 'bhi', 'res', 'dres-', 'dres+', 'chi', 'fixed', 'shared']
 
     # ======================================================================= #
-    def __init__(self, bfit, parent, data, row):
+    def __init__(self, bfit, data, row):
         """
             Inputs:
                 bfit:       top level pointer
-                parent:     pointer to parent frame object
-                dataline:   fetch_files.dataline object corresponding to the
-                                data we want to fit
-                row:        grid position
+                data:       fitdata object corresponding to the data we want 
+                            to fit
+                row:        position in list
         """
 
         # get logger
@@ -48,88 +48,27 @@ class fitline(object):
 
         # initialize
         self.bfit = bfit
-        self.parent = parent
         self.data = data
         self.row = row
-        self.disable_entry_callback = False
+        self.init_enabled = True
         self.lines = []
+        self.view = None
 
         data.fitline = self
 
-        # get parent frame
-        fitframe = ttk.Frame(self.parent, pad=(5, 0))
-
-        frame_title = ttk.Frame(fitframe)
-
-        # label for displyaing run number
-        if type(self.data.bd) is bdata:
-            self.run_label = Label(frame_title,
-                            text='[ %d - %d ]' % (self.data.run,
-                                                  self.data.year),
-                           bg=colors.foreground, fg=colors.background)
-
-        elif type(self.data.bd) is bmerged:
-            runs = textwrap.wrap(str(self.data.run), 5)
-
-            self.run_label = Label(frame_title,
-                                text='[ %s ]' % ' + '.join(runs),
-                                bg=colors.foreground, fg=colors.background)
-
-        # title of run
-        self.run_label_title = Label(frame_title,
-                            text=self.data.title,
-                            justify='right', fg=colors.red)
-
-        # Parameter input labels
-        gui_param_button = ttk.Button(fitframe, text='Initial Value',
-                        command=lambda : self.bfit.fit_files.do_gui_param(id=self.data.id),
-                        pad=0)
-        result_comp_button = ttk.Button(fitframe, text='Result',
-                        command=self.draw_fn_composition, pad=0)
-
-        c = 0
-        ttk.Label(fitframe, text='Parameter').grid(     column=c, row=1, padx=5); c+=1
-        gui_param_button.grid(                          column=c, row=1, padx=5, pady=2); c+=1
-        ttk.Label(fitframe, text='Low Bound').grid(     column=c, row=1, padx=5); c+=1
-        ttk.Label(fitframe, text='High Bound').grid(    column=c, row=1, padx=5); c+=1
-        result_comp_button.grid(                        column=c, row=1, padx=5, pady=2, sticky=(E, W)); c+=1
-        ttk.Label(fitframe, text='Error (-)').grid(     column=c, row=1, padx=5); c+=1
-        ttk.Label(fitframe, text='Error (+)').grid(     column=c, row=1, padx=5); c+=1
-        ttk.Label(fitframe, text='ChiSq').grid(         column=c, row=1, padx=5); c+=1
-        ttk.Label(fitframe, text='Fixed').grid(         column=c, row=1, padx=5); c+=1
-        ttk.Label(fitframe, text='Shared').grid(        column=c, row=1, padx=5); c+=1
-        
-        self.run_label.grid(column=0, row=0, padx=5, pady=5, sticky=W)
-        self.run_label_title.grid(column=2, row=0, padx=5, pady=5, sticky=E)
-        frame_title.grid(column=0, row=0, columnspan=c, sticky=(E, W))
-        frame_title.columnconfigure(1, weight=1)
-
-        # save frame
-        self.fitframe = fitframe
-        self.gui_param_button = gui_param_button
-
-        # resizing
-        for i in range(c):
-            self.fitframe.grid_columnconfigure(i, weight=1)
-
     # ======================================================================= #
-    def __del__(self):
-
-        # kill buttons and frame
-        try:
-            for child in self.parent.winfo_children():
-                child.destroy()
-        except Exception:
-            pass
+    def _update_view(self):
+        """Show changes in the title row, if visible"""
+        if self.view is not None:
+            self.view.update()
 
-        if hasattr(self, 'parentry'):    del self.parentry
-        
     # ======================================================================= #
-    def get_new_parameters(self, force_modify=False):
+    def get_new_parameters(self, force_modify=False, values=None):
         """
             Fetch initial parameters from fitter, set to data.
 
-            plist: Dictionary of initial parameters {par_name:par_value}
+            values: DataFrame of initial parameters as from gen_init_par, if
+                    None get these from the fitter
         """
         
         # get pointer to fit files object
@@ -154,13 +93,14 @@ class fitline(object):
                     values_res = data.fitpar.copy()
         
         # get calcuated initial values
-        try:
-            values = fitter.gen_init_par(fn_title, ncomp, self.data.bd,
-                                    self.bfit.get_asym_mode(fit_files))
-        except Exception as err:
-            print(err)
-            self.logger.exception(err)
-            return
+        if values is None:
+            try:
+                values = fitter.gen_init_par(fn_title, ncomp, self.data,
+                                        self.bfit.get_asym_mode(fit_files))
+            except Exception as err:
+                print(err)
+                self.logger.exception(err)
+                return
                 
         # set p0 from old
         if values_res is not None:
@@ -175,18 +115,13 @@ class fitline(object):
         
     # ======================================================================= #
     def grid(self, row):
-        """Re-grid a dataline object so that it is in order by run number"""
+        """Place a fitline object in the list so that it is in order by run number"""
         self.row = row
-        self.fitframe.grid(column=0, row=row, sticky=(W, N))
-        self.fitframe.update_idletasks()
 
     # ======================================================================= #
     def degrid(self):
-        """Remove displayed dataline object from file selection. """
-
+        """Remove fitline object from the list. """
         self.logger.debug('Degridding fitline for run %s', self.data.id)
-        self.fitframe.grid_forget()
-        self.fitframe.update_idletasks()
 
     # ======================================================================= #
     def draw_fn_composition(self):
@@ -327,15 +262,36 @@ class fitline(object):
         bfit.draw_style.set(draw_mode)
 
     # ======================================================================= #
-    def populate(self, force_modify=False):
+    def get_chi(self):
+        """Get the chisquared of the fit, nan if not fitted"""
+        try:
+            return float(self.data.fitpar['chi'].values[0])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return np.nan
+
+    # ======================================================================= #
+    def get_items(self):
+        """Get list of rows to show: self as the title, then the parameters"""
+        return [self] + self.lines
+
+    # ======================================================================= #
+    def get_line(self, pname):
+        """Get the InputLine of a parameter, None if not found"""
+        for line in self.lines:
+            if line.pname == pname:
+                return line
+        return None
+
+    # ======================================================================= #
+    def populate(self, force_modify=False, values=None):
         """
-            Fill and grid new parameters. Reuse old fields if possible
+            Fill new parameters. Reuse old lines if possible
 
             force_modify: if true, clear and reset parameter inputs.
+            values: initial parameters passed to get_new_parameters
         """
 
-        # get data and frame
-        fitframe = self.fitframe
+        # get data
         fitdat = self.data
         fit_files = self.bfit.fit_files
         pop_constr = fit_files.pop_fitconstr
@@ -361,7 +317,7 @@ class fitline(object):
             
             # make a new parameter dataframe
             try:
-                self.get_new_parameters(force_modify)
+                self.get_new_parameters(force_modify, values)
             except KeyError as err:
                 return          # returns if no parameters found
             except RuntimeError as err:
@@ -376,27 +332,17 @@ class fitline(object):
         
         # get needed number of lines
         n_lines_total = len(plist)
-        n_lines_current = len(self.lines)
-        n_lines_needed = n_lines_total - n_lines_current
+        n_lines_needed = n_lines_total - len(self.lines)
         
         # drop unneeded lines
         if n_lines_needed < 0:
-            
-            unused = self.lines[n_lines_total:]
-            for rem in unused:
-                rem.degrid()
-                del rem
             self.lines = self.lines[:n_lines_total]
 
         # add new lines
         elif n_lines_needed > 0:
-            self.lines.extend([InputLine(fitframe, self.bfit, fitdat) \
+            self.lines.extend([InputLine(self.bfit, fitdat) \
                                                 for i in range(n_lines_needed)])
 
-        # reassign and regrid lines
-        for i, line in enumerate(self.lines):
-            line.grid(i+2)
-            
         # drop old parameters
         fitdat.drop_unused_param(plist)
         fitdat.fitpar.sort_index(inplace=True)
@@ -404,7 +350,8 @@ class fitline(object):
         
         # set parameters
         for i, k in enumerate(fitpar.index):
-            self.lines[i].set(k, **fitpar.loc[k].to_dict())
+            self.lines[i].set(k)
+        self._update_view()
                                      
     # ======================================================================= #
     def set(self, pname, **kwargs):
@@ -415,6 +362,12 @@ class fitline(object):
             if line.pname == pname:
                 line.set(**kwargs)
         
+    # ======================================================================= #
+    def set_init_enabled(self, state):
+        """Activate or deactivate the initial value gui button"""
+        self.init_enabled = state
+        self._update_view()
+        
     # ======================================================================= #
     def show_fit_result(self):
         self.logger.debug('Showing fit result for run %s', self.data.id)
@@ -434,4 +387,232 @@ class fitline(object):
             values = {r: data.fitpar.loc[line.pname, r] for r in ('res', 'dres-', 'dres+')}
             values['chi'] = chi
             line.set(**values)
+        self._update_view()
+
+# =========================================================================== #
+class fitline_row(object):
+    """
+        Widgets showing one row of the parameter table in the fit tab: either
+        the title of a run (fitline) or one of its parameters (InputLine). The
+        rows are reused for different lines as the table scrolls.
+
+        bfit:           pointer to top class
+        chi_label:      Label, chisquared of the fit
+        entry:          dict[col] = Entry or Checkbutton object
+        frame:          Frame holding the row
+        gui_param_button: Button, set initial parameters
+        is_binding:     if true, changes to variables are not user input
+        item:           fitline or InputLine shown, or None
+        par_frame:      Frame holding the parameter widgets
+        par_label:      Label, parameter name
+        result_comp_button: Button, draw function composition
+        run_label:      Label for showing which run is selected
+        run_label_title: Label for showing the run title
+        title_frame:    Frame holding the run title widgets
+        variable:       dict[col] = StringVar or BooleanVar of the entries
+    """
+
+    width = 13
+    width_label = 16
+    columns = ['p0', 'blo', 'bhi', 'res', 'dres-', 'dres+', 'fixed', 'shared']
+    headings = ['Parameter', 'Initial Value', 'Low Bound', 'High Bound', 
+                'Result', 'Error (-)', 'Error (+)', 'Fixed', 'Shared']
+
+    # ======================================================================= #
+    def __init__(self, parent, bfit):
+        """
+            parent: Frame in which to place the row
+        """
 
+        self.bfit = bfit
+        self.item = None
+        self.is_binding = False
+
+        self.frame = ttk.Frame(parent)
+
+        # run title ---------------------------------------------------------
+        self.title_frame = ttk.Frame(self.frame)
+
+        self.run_label = Label(self.title_frame, text='',
+                               bg=colors.foreground, fg=colors.background)
+        self.run_label_title = Label(self.title_frame, text='',
+                                     justify='right', fg=colors.red)
+        self.gui_param_button = ttk.Button(self.title_frame, 
+                        text='Initial Value', pad=0, 
+                        command=lambda : self.bfit.fit_files.do_gui_param(id=self.item.data.id))
+        self.result_comp_button = ttk.Button(self.title_frame, text='Result', 
+                        command=lambda : self.item.draw_fn_composition(), pad=0)
+        self.chi_label = ttk.Label(self.title_frame, text='')
+
+        c = 0
+        self.run_label.grid(column=c, row=0, padx=5, sticky=W); c+=1
+        self.run_label_title.grid(column=c, row=0, padx=5, sticky=W); c+=1
+        self.gui_param_button.grid(column=c, row=0, padx=5); c+=1
+        self.result_comp_button.grid(column=c, row=0, padx=5); c+=1
+        self.chi_label.grid(column=c, row=0, padx=5, sticky=E); c+=1
+        self.title_frame.grid_columnconfigure(1, weight=1)
+
+        # parameter ---------------------------------------------------------
+        self.par_frame = ttk.Frame(self.frame)
+        self.par_label = ttk.Label(self.par_frame, text='', anchor='e', 
+                                   width=self.width_label)
+
+        self.variable = {}
+        self.entry = {}
+        for key in self.columns:
+
+            # booleanvar
+            if key in ('fixed', 'shared'):
+                self.variable[key] = BooleanVar()
+                self.entry[key] = ttk.Checkbutton(self.par_frame, text='',
+                                                  variable=self.variable[key],
+                                                  onvalue=True, offvalue=False, 
+                                                  width=self.width//2)
+            # stringvar
+            else:
+                self.variable[key] = StringVar()
+                self.entry[key] = Entry(self.par_frame,
+                                        textvariable=self.variable[key],
+                                        width=self.width)
+
+            # set colors and state
+            if key in ('res', 'dres-', 'dres+'):
+                self.entry[key]['state'] = 'readonly'
+                self.entry[key]['foreground'] = colors.foreground
+
+            # copy user input to the parameter
+            else:
+                self.variable[key].trace_add('write', partial(self.on_edit, key))
+
+        self.par_label.grid(column=0, row=0, sticky='e')
+        for i, key in enumerate(self.columns):
+            self.entry[key].grid(column=i+1, row=0, padx=5)
+
+        # rows have the same height for both kinds of line
+        self.title_frame.grid(column=0, row=0, sticky=(N, S, E, W))
+        self.par_frame.grid(column=0, row=0, sticky=(N, S, E, W))
+        self.frame.grid_columnconfigure(0, weight=1)
+
+    # ======================================================================= #
+    @classmethod
+    def make_headings(cls, parent):
+        """Make a frame with the column headings of the parameter rows"""
+
+        frame = ttk.Frame(parent)
+        for i, text in enumerate(cls.headings):
+            width = cls.width_label if i == 0 else cls.width
+            if i > len(cls.headings)-3:
+                width = cls.width//2
+            ttk.Label(frame, text=text, width=width, anchor='center').grid(
+                                                column=i, row=0, padx=5)
+        return frame
+
+    # ======================================================================= #
+    def bind(self, item):
+        """Show a fitline or InputLine in this row"""
+
+        if item is self.item:
+            self.update()
+            return
+
+        self.unbind()
+        self.item = item
+        item.view = self
+        self.update()
+
+    # ======================================================================= #
+    def unbind(self):
+        """Stop showing the line"""
+        if self.item is not None and self.item.view is self:
+            self.item.view = None
+        self.item = None
+
+    # ======================================================================= #
+    def on_edit(self, col, *args):
+        """Copy user input to the parameter"""
+
+        if self.is_binding or not isinstance(self.item, InputLine):
+            return
+
+        try:
+            self.item.edit(col, self.variable[col].get())
+        except (ValueError, TclError):
+            pass
+
+    # ======================================================================= #
+    def update(self):
+        """Show the state of the line"""
+
+        if isinstance(self.item, fitline):
+            self._update_title()
+            self.title_frame.lift()
+        else:
+            self._update_par()
+            self.par_frame.lift()
+
+    # ======================================================================= #
+    def _update_par(self):
+        line = self.item
+        enabled = self.bfit.fit_files.input_state == 'normal'
+        state = 'normal' if enabled and not line.is_constrained else 'disabled'
+
+        self.is_binding = True
+        try:
+            self.par_label.config(text=line.pname)
+
+            for key in self.columns:
+                var = self.variable[key]
+                value = line.get_string(key)
+
+                # don't overwrite input which is still being typed
+                if key in ('p0', 'blo', 'bhi'):
+                    try:
+                        typed = float(var.get())
+                    except ValueError:
+                        typed = None
+                    model = line.get(key)
+                    if typed == model or (typed is not None and \
+                                          np.isnan(typed) and np.isnan(model)):
+                        continue
+
+                var.set(value)
+        finally:
+            self.is_binding = False
+
+        for key in self.columns:
+            if key in ('res', 'dres-', 'dres+'):
+                self.entry[key].configure(state='readonly' if enabled else 'disabled')
+            else:
+                self.entry[key].configure(state=state)
+
+    # ======================================================================= #
+    def _update_title(self):
+        fline = self.item
+        data = fline.data
+        enabled = self.bfit.fit_files.input_state == 'normal'
+
+        # label for displyaing run number
+        if type(data.bd) is bmerged:
+            runs = textwrap.wrap(str(data.run), 5)
+            self.run_label.config(text='[ %s ]' % ' + '.join(runs))
+        else:
+            self.run_label.config(text='[ %d - %d ]' % (data.run, data.year))
+
+        # title of run
+        self.run_label_title.config(text=data.title)
+
+        # buttons
+        state = 'normal' if enabled else 'disabled'
+        self.result_comp_button.config(state=state)
+        if not fline.init_enabled:
+            state = 'disabled'
+        self.gui_param_button.config(state=state)
+
+        # chisquared
+        chi = fline.get_chi()
+        if np.isnan(chi):
+            self.chi_label.config(text='')
+        else:
+            color = colors.red if chi > self.bfit.fit_files.chi_threshold \
+                    else colors.foreground
+            self.chi_label.config(text='ChiSq: %.2f' % chi, foreground=color)
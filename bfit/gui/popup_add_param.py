@@ -18,6 +18,7 @@ from bfit.backend.entry_color_set import on_focusout, on_entry_click
 from bfit.backend.raise_window import raise_window
 from bfit.fitting.fit_bdata import fit_bdata
 from bfit.backend.ParameterFunction import ParameterFunction as ParFnGenerator
+from bfit.backend.fitdata import fitdata
 from bfit.global_variables import KEYVARS
 from bfit.gui.template_fit_popup import template_fit_popup
 import bfit.backend.colors as colors
@@ -125,6 +126,11 @@ class popup_add_param(template_fit_popup):
         # reset draw comp
         self.bfit.fit_files.draw_components = list(self.bfit.draw_components)
 
+        # tabulated values of old definitions are out of date
+        if self.set_par:
+            for p in self.set_par.keys():
+                fitdata.param_table.drop(p)
+
         # set the parameters
         self.set_par = ''
         try:
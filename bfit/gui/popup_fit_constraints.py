@@ -8,9 +8,7 @@ from tkinter import ttk, messagebox
 from functools import partial
 
 import logging, re, os, warnings
-import jax
 import numpy as np
-import jax.numpy as jnp
 import pandas as pd
 import bdata as bd
 
@@ -18,9 +16,7 @@ from bfit.global_variables import KEYVARS
 from bfit.global_variables import KEYVARS
 from bfit.gui.template_fit_popup import template_fit_popup
 from bfit.gui.InputLine import InputLine
-
-jax.config.update('jax_platform_name', 'cpu')
-jax.config.update("jax_enable_x64", True)
+from bfit.backend.get_derror import get_function
 
 # ========================================================================== #
 class popup_fit_constraints(template_fit_popup):
@@ -117,8 +113,9 @@ class popup_fit_constraints(template_fit_popup):
             # replace numpy functions with jax.numpy functions
             f = f.replace('np.', 'jnp.')
                                       
-            # evaluate functions string to python handle
-            fns[defined] = (eval(f), new_par)
+            # evaluate functions string to python handle, reused for the
+            # same string such that jacobians are not recompiled
+            fns[defined] = (get_function(f), new_par)
             
         data.constrained = fns
         
@@ -299,12 +296,7 @@ class popup_fit_constraints(template_fit_popup):
         """
             Set the state of the gui_param_buttons in fit_lines
         """
-        if self.constraints_are_set:
-            state = 'disabled'
-        else:
-            state = 'normal'
-        
-        fline.gui_param_button.config(state=state)
+        fline.set_init_enabled(not self.constraints_are_set)
             
     # ====================================================================== #
     def show(self):
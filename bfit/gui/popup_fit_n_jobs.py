@@ -0,0 +1,132 @@
+# Number of fitting processes and fit budget window
+# Derek Fujimoto
+# Oct 2026
+
+from tkinter import *
+from tkinter import ttk
+from tkinter import messagebox
+from bfit import logger_name
+import multiprocessing
+import logging
+
+# ========================================================================== #
+class popup_fit_n_jobs(object):
+    """
+        Popup window for setting the number of processes used to fit runs
+        independently, and the budget of function calls and time for fitting
+        each run. Runs over budget are refit with a cheaper minimizer.
+
+        max_nfcn:   IntVar, max number of function calls (0 for no limit)
+        max_time:   DoubleVar, max time in s (0 for no limit)
+        text:       IntVar, number of processes
+    """
+
+    # ====================================================================== #
+    def __init__(self, parent):
+        self.parent = parent
+
+        # get logger
+        self.logger = logging.getLogger(logger_name)
+        self.logger.info('Initializing')
+
+        # make a new window
+        self.win = Toplevel(parent.mainframe)
+        self.win.title('Set Fitting Processes and Budget')
+        frame = ttk.Frame(self.win, relief='sunken', pad=5)
+        topframe = ttk.Frame(frame, pad=5)
+
+        # icon
+        self.parent.set_icon(self.win)
+
+        # Key bindings
+        self.win.bind('<Return>', self.set)
+        self.win.bind('<KP_Enter>', self.set)
+
+        # make objects: text entry
+        l1 = ttk.Label(topframe, text='Number of fitting processes:', pad=5,
+                       justify=LEFT)
+        self.text = IntVar()
+        self.text.set(parent.fit_n_jobs)
+        entry = Entry(topframe, textvariable=self.text, width=10, justify=RIGHT)
+        l2 = ttk.Label(topframe, text='of %d CPUs' % multiprocessing.cpu_count(),
+                       pad=5, justify=LEFT)
+
+        l3 = ttk.Label(topframe, text='Max function calls per run:', pad=5,
+                       justify=LEFT)
+        self.max_nfcn = IntVar()
+        self.max_nfcn.set(parent.fit_max_nfcn)
+        entry_nfcn = Entry(topframe, textvariable=self.max_nfcn, width=10,
+                           justify=RIGHT)
+
+        l4 = ttk.Label(topframe, text='Max time per run (s):', pad=5,
+                       justify=LEFT)
+        self.max_time = DoubleVar()
+        self.max_time.set(parent.fit_max_time)
+        entry_time = Entry(topframe, textvariable=self.max_time, width=10,
+                           justify=RIGHT)
+        l5 = ttk.Label(topframe, text='(0 for no limit)', pad=5, justify=LEFT)
+
+        # make objects: buttons
+        set_button = ttk.Button(frame, text='Set', command=self.set)
+        close_button = ttk.Button(frame, text='Cancel', command=self.cancel)
+
+        # grid
+        l1.grid(column=0, row=0)
+        entry.grid(column=1, row=0)
+        l2.grid(column=2, row=0)
+        l3.grid(column=0, row=1, sticky=W)
+        entry_nfcn.grid(column=1, row=1)
+        l4.grid(column=0, row=2, sticky=W)
+        entry_time.grid(column=1, row=2)
+        l5.grid(column=2, row=1, rowspan=2)
+        topframe.grid(column=0, row=0, columnspan=2, pady=10)
+        set_button.grid(column=0, row=1)
+        close_button.grid(column=1, row=1)
+
+        # grid frame
+        frame.grid(column=0, row=0)
+        self.logger.debug('Initialization success. Starting mainloop.')
+
+    # ====================================================================== #
+    def set(self, *args):
+        """Set entered values"""
+
+        try:
+            n_jobs = self.text.get()
+        except TclError:
+            n_jobs = 0
+
+        try:
+            max_nfcn = self.max_nfcn.get()
+            max_time = self.max_time.get()
+        except TclError:
+            max_nfcn = -1
+            max_time = -1
+
+        if n_jobs < 1:
+            messagebox.showerror('Bad input',
+                                 'Number of processes must be a positive integer')
+            return
+
+        if max_nfcn < 0 or max_time < 0:
+            messagebox.showerror('Bad input',
+                                 'Fit budget must be non-negative')
+            return
+
+        fitter = self.parent.fit_files.fitter
+
+        self.parent.fit_n_jobs = n_jobs
+        fitter.n_jobs = n_jobs
+        self.logger.info('Set number of fitting processes to %d', n_jobs)
+
+        self.parent.fit_max_nfcn = max_nfcn
+        self.parent.fit_max_time = max_time
+        fitter.max_nfcn = max_nfcn or None
+        fitter.max_time = max_time or None
+        self.logger.info('Set fit budget to %d function calls and %g s per run',
+                         max_nfcn, max_time)
+        self.win.destroy()
+
+    # ====================================================================== #
+    def cancel(self):
+        self.win.destroy()
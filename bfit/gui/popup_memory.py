@@ -0,0 +1,147 @@
+# Memory usage report and budget window
+# Derek Fujimoto
+# Oct 2026
+
+from tkinter import *
+from tkinter import ttk
+from tkinter import messagebox
+from bfit import logger_name
+import logging
+
+# ========================================================================== #
+class popup_memory(object):
+    """
+        Popup window for showing the memory used by fetched runs and setting the
+        memory budget. Over budget, runs which are not selected have their raw
+        histograms unloaded.
+
+        parent:     pointer to bfit
+        text:       IntVar, memory budget in MB (0 for no limit)
+        tree:       Treeview, table of memory use by run
+        win:        Toplevel
+    """
+
+    columns = ('Histograms', 'Cached', 'Loaded')
+
+    # ====================================================================== #
+    def __init__(self, parent):
+        self.parent = parent
+
+        # get logger
+        self.logger = logging.getLogger(logger_name)
+        self.logger.info('Initializing')
+
+        # make a new window
+        self.win = Toplevel(parent.mainframe)
+        self.win.title('Memory Usage')
+        frame = ttk.Frame(self.win, relief='sunken', pad=5)
+        topframe = ttk.Frame(frame, pad=5)
+
+        # icon
+        self.parent.set_icon(self.win)
+
+        # Key bindings
+        self.win.bind('<Return>', self.set)
+        self.win.bind('<KP_Enter>', self.set)
+
+        # make objects: memory table
+        self.tree = ttk.Treeview(frame, columns=self.columns, height=12)
+        self.tree.heading('#0', text='Run')
+        self.tree.column('#0', width=120)
+        for c in self.columns:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=100, anchor=E)
+        scroll = ttk.Scrollbar(frame, orient=VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scroll.set)
+        self.total = ttk.Label(frame, text='', pad=5, justify=LEFT)
+
+        # make objects: text entry
+        l1 = ttk.Label(topframe, text='Memory budget (MB, 0 for no limit):',
+                       pad=5, justify=LEFT)
+        self.text = IntVar()
+        self.text.set(parent.memory_budget)
+        entry = Entry(topframe, textvariable=self.text, width=10, justify=RIGHT)
+
+        # make objects: buttons
+        buttonframe = ttk.Frame(frame, pad=5)
+        set_button = ttk.Button(buttonframe, text='Set', command=self.set)
+        refresh_button = ttk.Button(buttonframe, text='Refresh',
+                                    command=self.refresh)
+        close_button = ttk.Button(buttonframe, text='Close', command=self.cancel)
+
+        # grid
+        self.tree.grid(column=0, row=0, sticky=(N, S, E, W))
+        scroll.grid(column=1, row=0, sticky=(N, S))
+        self.total.grid(column=0, row=1, columnspan=2, sticky=W)
+        l1.grid(column=0, row=0)
+        entry.grid(column=1, row=0)
+        topframe.grid(column=0, row=2, columnspan=2, pady=5)
+        set_button.grid(column=0, row=0)
+        refresh_button.grid(column=1, row=0)
+        close_button.grid(column=2, row=0)
+        buttonframe.grid(column=0, row=3, columnspan=2)
+
+        # grid frame
+        frame.grid(column=0, row=0, sticky=(N, S, E, W))
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(0, weight=1)
+        self.win.columnconfigure(0, weight=1)
+        self.win.rowconfigure(0, weight=1)
+
+        self.refresh()
+        self.logger.debug('Initialization success. Starting mainloop.')
+
+    # ====================================================================== #
+    def refresh(self, *args):
+        """Fill the table with the current memory use"""
+
+        self.tree.delete(*self.tree.get_children())
+
+        total = {'hist': 0, 'cache': 0}
+        for id in sorted(self.parent.data.keys()):
+            data = self.parent.data[id]
+            nbytes = data.get_nbytes()
+            for k in total.keys():
+                total[k] += nbytes[k]
+
+            self.tree.insert('', 'end', text=id,
+                             values=(format_nbytes(nbytes['hist']),
+                                     format_nbytes(nbytes['cache']),
+                                     'yes' if data.is_loaded else 'no'))
+
+        self.total['text'] = 'Total: %s (histograms %s, cached %s)' % \
+                             (format_nbytes(sum(total.values())),
+                              format_nbytes(total['hist']),
+                              format_nbytes(total['cache']))
+
+    # ====================================================================== #
+    def set(self, *args):
+        """Set entered values"""
+
+        try:
+            budget = self.text.get()
+        except TclError:
+            budget = -1
+
+        if budget < 0:
+            messagebox.showerror('Bad input',
+                                 'Memory budget must be a non-negative integer')
+            return
+
+        self.parent.memory_budget = budget
+        self.logger.info('Set memory budget to %d MB', budget)
+        self.parent.trim_memory()
+        self.refresh()
+
+    # ====================================================================== #
+    def cancel(self):
+        self.win.destroy()
+
+# ========================================================================== #
+def format_nbytes(nbytes):
+    """Get human-readable size string from size in bytes"""
+    for unit in ('B', 'kB', 'MB'):
+        if nbytes < 1024:
+            return '%.1f %s' % (nbytes, unit)
+        nbytes /= 1024
+    return '%.1f GB' % nbytes
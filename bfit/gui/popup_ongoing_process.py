@@ -3,7 +3,7 @@
 # Nov 2020
 
 from tkinter import *
-from tkinter import ttk
+from tkinter import ttk, messagebox
 import multiprocessing
 from queue import Empty
 
@@ -12,10 +12,12 @@ import bfit.backend.colors as colors
 class popup_ongoing_process(object):
     """
         bfit:       pointer to bfit object
+        callback:   function handle, called with each output in the queue
         do_disable: function to run to disable GUI elements on process start
         do_enable:  function to run to enable GUI elements on process end
         kill_status:BooleanVar, if true, the process was terminated
         message:    string, summary of process which is ongoing
+        pbar:       ttk.Progressbar
         process:    multiprocessing.Process
         root:       TopLevels
         target:     function handle, run this with no arguments
@@ -23,7 +25,8 @@ class popup_ongoing_process(object):
     """
     
     
-    def __init__(self, bfit, target, message, queue, do_disable=None, do_enable=None):
+    def __init__(self, bfit, target, message, queue, do_disable=None, do_enable=None,
+                 nsteps=None, callback=None):
         """
             bfit:       pointer to bfit object
             do_disable: function to run to disable GUI elements on process start
@@ -32,6 +35,13 @@ class popup_ongoing_process(object):
             root:       TopLevels
             target:     function handle, run this with no arguments
             queue:      multiprocessing.Queue: put output in here, gets returned
+            nsteps:     int, if not None show a determinate progress bar with
+                        this many steps
+            callback:   if None, return the first output in the queue.
+                        Else function handle called with each output in the
+                        queue as it arrives. Each None returned by callback
+                        advances the progress bar by one step, and the first 
+                        non-None value is returned.
         """
         
         # variables
@@ -42,6 +52,7 @@ class popup_ongoing_process(object):
         self.do_disable = do_disable
         self.do_enable = do_enable
         self.queue = queue
+        self.callback = callback
         self.kill_status = BooleanVar()
         self.kill_status.set(False)
         
@@ -60,9 +71,14 @@ class popup_ongoing_process(object):
                       pad=0)
         
         # make progress bar
-        pbar = ttk.Progressbar(root, orient=HORIZONTAL, 
-                               mode='indeterminate', length=200, maximum=20)
-        pbar.start()
+        if nsteps is None:
+            pbar = ttk.Progressbar(root, orient=HORIZONTAL, 
+                                   mode='indeterminate', length=200, maximum=20)
+            pbar.start()
+        else:
+            pbar = ttk.Progressbar(root, orient=HORIZONTAL, 
+                                   mode='determinate', length=200, maximum=nsteps)
+        self.pbar = pbar
         
         # make button to cancel the fit
         cancel = ttk.Button(root, 
@@ -134,9 +150,28 @@ class popup_ongoing_process(object):
                         if self.do_enable is not None:  
                             self.do_enable()
                         return 
+                    
+                    # process died without output
+                    if not self.process.is_alive() and self.queue.empty():
+                        if self.do_enable is not None:  
+                            self.do_enable()
+                        s = '%s failed: process exited with code %s' % \
+                            (self.message.strip('. '), self.process.exitcode)
+                        self.logger.error(s)
+                        messagebox.showerror('Error', s)
+                        return 
                         
                 # got someting in the queue
                 else:
+                    
+                    # streamed output: process and keep waiting
+                    if self.callback is not None:
+                        output = self.callback(output)
+                        
+                        if output is None:
+                            self.pbar['value'] += 1
+                            continue
+                    
                     self.process.join()
                     if self.do_enable is not None:  
                         self.do_enable()
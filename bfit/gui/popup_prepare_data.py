@@ -464,7 +464,7 @@ class popup_prepare_data(object):
         self.data.manually_updated_var = {'epics':{}, 'camp':{}, 'ppg':{}}
         
         # read data again
-        self.data.read()
+        self.data.read(force=True)
         
         # update fetch tab
         line = self.bfit.fetch_files.data_lines[self.data.id]
@@ -493,9 +493,7 @@ class popup_prepare_data(object):
         self.entry_label.insert(0, label)
         
         # reset color in fetch tab
-        line = self.bfit.fetch_files.data_lines[self.data.id]
-        entry = line.label_entry
-        entry.config(foreground=colors.entry_grey)
+        self.bfit.fetch_files.data_lines[self.data.id].set_label_default(True)
         
     # ====================================================================== #
     def set_bin_repair(self, *event):
@@ -560,6 +558,4 @@ class popup_prepare_data(object):
         """
             Remove the gray in the fetch tab label entry
         """
-        line = self.bfit.fetch_files.data_lines[self.data.id]
-        entry = line.label_entry
-        entry.config(foreground=colors.entry_white)
+        self.bfit.fetch_files.data_lines[self.data.id].set_label_default(False)
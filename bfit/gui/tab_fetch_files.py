@@ -9,10 +9,17 @@ import bdata as bd
 from bdata import bdata, bmerged
 from functools import partial
 from bfit.backend.fitdata import fitdata
+from bfit.backend.RunExporter import RunExporter
+from bfit.backend.RunFilter import RunFilter, get_table
+from bfit.backend.RunRefresher import RunRefresher
 from bfit.backend.entry_color_set import on_focusout, on_entry_click
 import bfit.backend.colors as colors
 from bfit.global_variables import KEYVARS
-from bfit.gui.dataline import dataline
+from bfit.gui.dataline import dataline, dataline_row
+from bfit.gui.popup_ongoing_process import popup_ongoing_process
+from bfit.gui.virtual_list import virtual_list
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing import Queue
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -29,25 +36,25 @@ class fetch_files(object):
             asym_type: StringVar, drawing style
             bfit: pointer to parent class
             base_bins = IntVar, number of bins to use as baseline on scan ends
-            canvas_frame_id: id number of frame in canvas
             check_rebin: IntVar for handling rebin aspect of checkall
             check_bin_remove: StringVar for handing omission of 1F data
             check_state: BooleanVar for handling check all
             check_state_data: BooleanVar for handling check_all_data
             check_state_fit: BooleanVar for handling check_all_fit
             check_state_res: BooleanVar for handling check_all_res
-            data_canvas: canvas object allowing for scrolling 
-            dataline_frame: frame holding all the data lines. Exists as a window
-                in the data_canvas
             data_lines: dictionary of dataline obj, keyed by run number
             data_lines_old: dictionary of removed dataline obj, keyed by run number
             entry_asym_type: combobox for asym calc and draw type
             entry_run: entry to put in run number string
             fet_entry_frame: frame of fetch tab
+            fetch_n_jobs: max number of runs read or exported concurrently
             filter_opt: StringVar, holds state of filter radio buttons
+            is_updating: BooleanVar, if true refresh changed runs periodically
+            line_list: virtual_list, scrolling list showing the data lines
             listbox_history: listbox for run input history
             max_number_fetched: max number of files you can fetch
             omit_state: BooleanVar, if true set omit all final incomplete scans
+            refresher: RunRefresher, re-reads changed runs in the background
             run: StringVar input to fetch runs.
             runmode_label: display run mode
             runmode: display run mode list of strings
@@ -69,6 +76,7 @@ class fetch_files(object):
     run_number_starter_line = '40001 40002+40003 40005-40010 (run numbers)'
     bin_remove_starter_line = '24 100-200 (bins)'
     max_number_fetched = 500
+    fetch_n_jobs = 4
     nhistory = 10
     
     # ======================================================================= #
@@ -87,6 +95,9 @@ class fetch_files(object):
         self.check_bin_remove = StringVar()
         self.check_state = BooleanVar()
         self.fetch_data_tab = fetch_data_tab
+        self.is_updating = BooleanVar()
+        self.is_updating.set(False)
+        self.refresher = RunRefresher(bfit, callback=self.refresh_lines)
         
         # Frame for specifying files -----------------------------------------
         fet_entry_frame = ttk.Labelframe(fetch_data_tab, text='Specify Files')
@@ -118,6 +129,9 @@ class fetch_files(object):
         # fetch button
         fetch = ttk.Button(fet_entry_frame, text='Fetch', command=self.get_data)
         update = ttk.Button(fet_entry_frame, text='Update', command=self.update_data)
+        auto_update = ttk.Checkbutton(fet_entry_frame, text='Auto-update', 
+                command=self.do_auto_update, variable=self.is_updating, 
+                onvalue=True, offvalue=False)
         
         # grid and labels
         fet_entry_frame.grid(column=0, row=0, sticky=(N, W, E), columnspan=2, padx=5, pady=5)
@@ -127,6 +141,7 @@ class fetch_files(object):
         entry_run.grid(column=3, row=0, sticky=W)
         fetch.grid(column=4, row=0, sticky=E)
         update.grid(column=5, row=0, sticky=E)
+        auto_update.grid(column=6, row=0, sticky=E)
         self.listbox_history.grid(column=3, row=1, sticky=W)
         
         # padding 
@@ -141,19 +156,8 @@ class fetch_files(object):
         
         self.runmode_label = ttk.Label(runmode_label_frame, text="", justify=CENTER)
         
-        # Scrolling frame to hold datalines
-        yscrollbar = ttk.Scrollbar(fetch_data_tab, orient=VERTICAL)         
-        self.data_canvas = Canvas(fetch_data_tab, bd=0,              # make a canvas for scrolling
-                yscrollcommand=yscrollbar.set,                      # scroll command receive
-                scrollregion=(0, 0, 5000, 5000), confine=True)       # default size
-        yscrollbar.config(command=self.data_canvas.yview)           # scroll command send
-        dataline_frame = ttk.Frame(self.data_canvas, pad=5)          # holds 
-        
-        self.canvas_frame_id = self.data_canvas.create_window((0, 0),    # make window which can scroll
-                window=dataline_frame, 
-                anchor='nw')
-        dataline_frame.bind("<Configure>", self.config_canvas) # bind resize to alter scrollable region
-        self.data_canvas.bind("<Configure>", self.config_dataline_frame) # bind resize to change size of contained frame
+        # Scrolling list of datalines: only visible lines have widgets
+        self.line_list = virtual_list(fetch_data_tab, make_row=dataline_row)
         
         # Frame to hold everything on the right ------------------------------
         bigright_frame = ttk.Frame(fetch_data_tab, pad=5)
@@ -271,8 +275,8 @@ class fetch_files(object):
         
         bigright_frame.grid(column=2, row=1, rowspan=2, sticky='new')
         
-        self.data_canvas.grid(column=0, row=1, sticky=(E, W, S, N), padx=5, pady=5)
-        yscrollbar.grid(column=1, row=1, sticky=(W, S, N), pady=5)
+        self.line_list.grid(column=0, row=1, columnspan=2, sticky=(E, W, S, N), 
+                            padx=5, pady=5)
         
         check_all_box.grid(        column=0, row=0, sticky=(N))
         check_data_box.grid(        column=1, row=0, sticky=(N))
@@ -329,16 +333,12 @@ class fetch_files(object):
             if i%2 == 0:    fet_entry_frame.grid_columnconfigure(i, weight=2)
         fet_entry_frame.grid_columnconfigure(3, weight=1)
             
-        self.data_canvas.grid_columnconfigure(0, weight=1)    # fetch frame 
-        self.data_canvas.grid_rowconfigure(0, weight=1)
-            
         # passing
         self.entry_run = entry_run
         self.entry_year = entry_year
         self.check_rebin_box = check_rebin_box
         self.check_bin_remove_entry = check_bin_remove_entry
         self.check_all_box = check_all_box
-        self.dataline_frame = dataline_frame
 
         self.logger.debug('Initialization success.')
     
@@ -358,41 +358,12 @@ class fetch_files(object):
             pass
         
     # ======================================================================= #
-    def _check_condition(self, data, string):
-        """Check whether a run satisfies the condition given as a string"""
-        
-        # determine what variable is being tested
-        keyvars = np.array(list(KEYVARS.keys()))
-        keylens = [len(k) for k in keyvars]
-        keyvars = keyvars[np.argsort(keylens)[::-1]]
-        
-        found = False
-        for key in keyvars:
-            if key in string:
-                found = True
-                break
-        
-        if not found:
-            msg = 'Variable not recognized in "%s"' % string
-            messagebox.showerror('Filter', msg)
-            raise RuntimeError(msg)
-        
-        # replace key with value
-        val, err = data.get_values(KEYVARS[key])
-        string = string.replace(key, str(val))
-        
-        # check for nan
-        if 'nan' in string:
-            string = string.replace('nan', 'np.nan')
-        
-        # evaluate
-        return eval(string)
-    
-    # ======================================================================= #
-    def _do_check_all(self, state, var, box):
+    def _do_check_all(self, state, var, needs_fit=False):
         """
             Force all tickboxes of a given type to be in a given state, assuming 
-            the tickbox is active
+            the tickbox is active. Acts on the data lines, not the widgets.
+            
+            needs_fit: if true, skip lines without a fit (inactive tickbox)
         """
         
         self.logger.info('Changing state of all %s tickboxes to %s', var, state)
@@ -402,12 +373,9 @@ class fetch_files(object):
             if not dline.check_state.get() and var != 'check_state':
                 continue
             
-            # check if tickbox is object variable
-            if hasattr(dline, box):
-                
-                # check if tickbox is disabled
-                if str(getattr(dline, box)['state']) == 'disabled':
-                    continue
+            # check if tickbox is disabled
+            if needs_fit and not dline.fit_enabled:
+                continue
                     
             # set value
             getattr(dline, var).set(state)
@@ -418,37 +386,57 @@ class fetch_files(object):
     
     # ======================================================================= #
     def canvas_scroll(self, event):
-        """Scroll canvas with files selected."""
+        """Scroll list with files selected."""
         if event.num == 4:
-            self.data_canvas.yview_scroll(-1, "units")
+            self.line_list.yview('scroll', -1, 'units')
         elif event.num == 5:
-            self.data_canvas.yview_scroll(1, "units")
+            self.line_list.yview('scroll', 1, 'units')
     
     # ======================================================================= #
     def check_all(self):  
-        self._do_check_all(self.check_state.get(), 'check_state', 'None')
+        self._do_check_all(self.check_state.get(), 'check_state')
         
     def check_all_data(self):  
-        self._do_check_all(self.check_state_data.get(), 'check_data', 'None')
+        self._do_check_all(self.check_state_data.get(), 'check_data')
         
     def check_all_fit(self):  
-        self._do_check_all(self.check_state_fit.get(), 'check_fit', 'draw_fit_checkbox')
+        self._do_check_all(self.check_state_fit.get(), 'check_fit', True)
     
     def check_all_res(self):  
-        self._do_check_all(self.check_state_res.get(), 'check_res', 'draw_res_checkbox')    
+        self._do_check_all(self.check_state_res.get(), 'check_res', True)
         
     # ======================================================================= #
-    def config_canvas(self, event):
-        """Alter scrollable region based on canvas bounding box size. 
-        (changes scrollbar properties)"""
-        self.data_canvas.configure(scrollregion=self.data_canvas.bbox("all"))
-    
+    def do_auto_update(self, *args):
+        """Start or stop refreshing changed runs in the background"""
+        
+        if self.is_updating.get():
+            self.refresher.start()
+        else:
+            self.refresher.stop()
+        
     # ======================================================================= #
-    def config_dataline_frame(self, event):
-        """Alter size of contained frame in canvas. Allows for inside window to 
-        be resized with mouse drag""" 
-        self.data_canvas.itemconfig(self.canvas_frame_id, width=event.width)
+    def _get_draw_key(self, figstyle):
+        """
+            Get the global settings which affect how all runs are drawn. If 
+            these change, all runs are redrawn. 
+        """
         
+        b = self.bfit
+        return (figstyle, 
+                self.asym_type.get(), 
+                b.correct_bkgd.get(), 
+                b.draw_prebin.get(), 
+                b.use_nbm.get(), 
+                b.deadtime_switch.get(), 
+                b.deadtime_global.get(), 
+                b.deadtime, 
+                b.draw_ppm.get(), 
+                b.draw_rel_peak0.get(), 
+                b.draw_standardized_res.get(), 
+                b.hist_select, 
+                b.ppm_reference, 
+                str(b.units))
+    
     # ======================================================================= #
     def draw_all(self, figstyle, ignore_check=False):
         """
@@ -462,11 +450,36 @@ class fetch_files(object):
         
         self.logger.debug('Drawing all data (ignore check: %s)', ignore_check)
         
+        lines = {k: line for k, line in self.data_lines.items() 
+                 if line.check_state.get() or ignore_check}
+        keys = {k: line.get_draw_key() for k, line in lines.items()}
+        global_key = self._get_draw_key(figstyle)
+        
         # condense drawing into a funtion
-        def draw_lines():
-            for k, line in self.data_lines.items():
-                if line.check_state.get() or ignore_check:
-                    line.draw(figstyle)
+        def draw_lines(drawn=None):
+            drawn = {} if drawn is None else drawn
+            
+            with self.bfit.plt.hold(figstyle):
+                for k, line in lines.items():
+                    if drawn.get(k, None) != keys[k]:
+                        line.draw(figstyle)
+            
+            # save what was drawn, such that unchanged runs are not redrawn
+            ax = self.bfit.plt.gca(figstyle)
+            if getattr(ax, 'draw_keys', (None,))[0] != global_key:
+                ax.draw_keys = (global_key, {})
+            ax.draw_keys[1].update(keys)
+        
+        # get what is drawn in the current figure, if drawn with same settings
+        drawn = None
+        if self.bfit.plt.active[figstyle] in self.bfit.plt.plots[figstyle]:
+            ax = self.bfit.plt.gca(figstyle)
+            draw_keys = getattr(ax, 'draw_keys', (None, {}))
+            
+            if draw_keys[0] == global_key:
+                draw_objs = getattr(ax, 'draw_objs', {})
+                drawn = {k: v for k, v in draw_keys[1].items() 
+                         if k in draw_objs.keys()}
                 
         # get draw style
         style = self.bfit.draw_style.get()
@@ -474,16 +487,23 @@ class fetch_files(object):
         
         # make new figure, draw stacked
         if style == 'stack':
-            draw_lines()
+            draw_lines(drawn)
             
         # overdraw in current figure, stacked
         elif style == 'redraw':
             self.bfit.draw_style.set('stack')
             
-            if self.bfit.plt.plots[figstyle]:
+            # remove runs not selected, redraw only those changed
+            if drawn is not None:
+                for k in tuple(draw_objs.keys()):
+                    if k.split('_')[0] not in lines.keys():
+                        self.bfit.plt.remove(figstyle, k)
+                        ax.draw_keys[1].pop(k, None)
+                        
+            elif self.bfit.plt.plots[figstyle]:
                 self.bfit.plt.clf(figstyle)
             
-            draw_lines()
+            draw_lines(drawn)
             self.bfit.draw_style.set('redraw')
             
         # make new figure, draw single
@@ -497,6 +517,9 @@ class fetch_files(object):
             messagebox.showerror(message=s)
             self.logger.error(s)
             raise ValueError(s)
+        
+        # histograms may have been reloaded for drawing
+        self.bfit.trim_memory()
     
         # remove legned if too many drawn values
         n_selected = sum([d.check_state.get() for d in self.data_lines.values()])
@@ -510,30 +533,41 @@ class fetch_files(object):
                 self.bfit.plt.tight_layout(figstyle)
         
     # ======================================================================= #
-    def export(self, directory=None):
-        """Export all data files as csv"""
+    def export(self, directory=None, filename=None):
+        """
+            Export all data files. If filename is None, write one csv file per
+            run to directory. Else write all runs to filename, see RunExporter.
+            Runs are calculated and written in parallel.
+        """
         
-        # filename
-        filename = self.bfit.fileviewer.default_export_filename
-        if not filename: return
-        self.logger.info('Exporting to file %s', filename)
+        # per-run filename
+        run_filename = self.bfit.fileviewer.default_export_filename
+        if not run_filename: return
         
-        if directory is None:
-            try:
-                filename = os.path.join(filedialog.askdirectory(), filename)
-            except TypeError:
-                pass
-        else:
-            filename = os.path.join(directory, filename)
+        if filename is not None:
+            self.logger.info('Exporting to file %s', filename)
+        elif directory is None:
+            directory = filedialog.askdirectory()
+            if not directory:
+                return
+        
+        if filename is None:
+            run_filename = os.path.join(directory, run_filename)
+            self.logger.info('Exporting to file %s', run_filename)
         
-        # get data and write
-        for k in self.bfit.data.keys():
+        # get settings on the main thread
+        exporter = RunExporter(n_jobs=self.fetch_n_jobs)
+        for k in sorted(self.bfit.data.keys()):
             d = self.bfit.data[k]
             omit = d.omit.get()
             if omit == self.bin_remove_starter_line:    omit = ''
-            self.bfit.export(d, filename%(d.year, d.run), rebin=d.rebin.get(), 
-                             omit=omit)
-        self.logger.debug('Success.')
+            calculate, header = self.bfit.get_export_job(d, rebin=d.rebin.get(), 
+                                                         omit=omit)
+            exporter.add(k, calculate, run_filename%(d.year, d.run), header)
+        
+        # calculate and write
+        if self.bfit.export_runs(exporter, filename) is not None:
+            self.logger.debug('Success.')
         
     # ======================================================================= #
     def filter_runs(self):
@@ -541,17 +575,24 @@ class fetch_files(object):
         
         # parse input string
         string = self.text_filter.get('1.0', END)
-        lines = [l for l in string.split('\n') if l]
+        lines = [l for l in string.split('\n') if l.strip()]
         
-        # iterate on fetched data
-        data_keep = []
+        try:
+            filters = [RunFilter(l) for l in lines]
+        except RuntimeError as err:
+            messagebox.showerror('Filter', str(err))
+            raise err from None
         
-        for k, d in self.bfit.data.items():
-            
-            # check conditions
-            satisfy = all([self._check_condition(d, line) for line in lines])
-            if satisfy:
-                data_keep.append(k)
+        # evaluate on all fetched data at once
+        ids = list(self.bfit.data.keys())
+        variables = set(v for f in filters for v in f.variables)
+        table = get_table(self.bfit.data, variables, ids)
+        
+        satisfy = np.ones(len(ids), dtype=bool)
+        for f in filters:
+            satisfy &= f.evaluate(table)
+        
+        data_keep = set(k for k, s in zip(ids, satisfy) if s)
             
         # do filtering by selection
         if self.filter_opt.get() == 'activate':
@@ -562,7 +603,8 @@ class fetch_files(object):
             keys = tuple(self.data_lines.keys())
             for k in keys:
                 if k not in data_keep:
-                    self.data_lines[k].degrid()
+                    self.data_lines[k].degrid(refresh=False)
+            self.update_lines()
     
     # ======================================================================= #
     def get_data(self):
@@ -583,52 +625,93 @@ class fetch_files(object):
         # get the selected year
         year = int(self.year.get())
         
-        # get data
-        all_data = {}
-        s = ['Failed to open run']
+        # runs already fetched and not merged: update only
+        merged = set(r for merge in merged_runs for r in merge)
+        to_read = []
         for r in run_numbers:
+            runkey = self.bfit.get_run_key(r=r, y=year)
+            if r not in merged and runkey in self.bfit.data.keys():
+                self.bfit.data[runkey].read()
+            else:
+                to_read.append(r)
+        
+        # update object data lists as runs arrive
+        data = {}
+        all_data = {}
+        failed = []
+        received = []
+        
+        def add_data(new_dat):
+            runkey = self.bfit.get_run_key(new_dat)
+            if runkey in self.bfit.data.keys():
+                self.bfit.data[runkey].read()
+            else:
+                data[runkey] = fitdata(self.bfit, new_dat)
+        
+        def add_run(output):
+            r, new_dat = output
+            received.append(r)
             
-            # read from archive
-            try:
-                all_data[r] = bdata(r, year=year)
-            except (RuntimeError, ValueError):
-                s.append("%d (%d)" % (r, year))
-                    
+            if new_dat is None:
+                failed.append(r)
+            elif r in merged:
+                all_data[r] = new_dat
+            else:
+                add_data(new_dat)
+            
+            # all runs done
+            if len(received) >= len(to_read):
+                return True
+        
+        # read from archive in the background
+        if to_read:
+            que = Queue()
+            n_jobs = min(self.fetch_n_jobs, len(to_read))
+            
+            def read_runs():
+                with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+                    jobs = [pool.submit(read_run, r, year) for r in to_read]
+                    for job in as_completed(jobs):
+                        que.put(job.result())
+            
+            popup = popup_ongoing_process(self.bfit, 
+                        target = read_runs, 
+                        message = "Fetching %d runs..." % len(to_read),
+                        queue = que,
+                        nsteps = len(to_read),
+                        callback = add_run,
+                        )
+            output = popup.run()
+            
+            # fetch cancelled
+            if output is None:
+                self.logger.info('Fetch cancelled')
+                return
+        
         # print error message
-        if len(s)>1:
+        if failed:
+            s = ['Failed to open run']
+            s.extend(["%d (%d)" % (r, year) for r in sorted(failed)])
             s = '\n'.join(s)
             print(s)
             self.logger.warning(s)
             messagebox.showinfo(message=s)
         
         # merge runs
-        new_data = []
         for merge in merged_runs: 
             
             # collect data
-            dat_to_merge = []
-            for r in merge: 
-                dat_to_merge.append(all_data.pop(r))
+            try:
+                dat_to_merge = [all_data.pop(r) for r in merge]
+            except KeyError:
+                continue
             
             # make bjoined object
-            new_data.append(bmerged(dat_to_merge))
-            
-        new_data.extend(list(all_data.values()))
+            add_data(bmerged(dat_to_merge))
         
-        # update object data lists
-        data = {}
-        for new_dat in new_data:
-            
-            # get key for data storage
-            runkey = self.bfit.get_run_key(new_dat)
-
-            # update data
-            if runkey in self.bfit.data.keys():
-                self.bfit.data[runkey].read()
-                
-            # new data
-            else:
-                data[runkey] = fitdata(self.bfit, new_dat)
+        # nothing fetched
+        if not data and not self.bfit.data:
+            return
     
         # check that data is all the same runtype
         run_types = [d.mode for d in self.bfit.data.values()]
@@ -698,8 +781,7 @@ class fetch_files(object):
                     self.data_lines[r] = dataline(\
                                             bfit = self.bfit, \
                                             lines_list = self.data_lines, \
-                                            lines_list_old = self.data_lines_old, 
-                                            fetch_tab_frame = self.dataline_frame, \
+                                            lines_list_old = self.data_lines_old, \
                                             bdfit = self.bfit.data[r], \
                                             row = n)
             self.data_lines[r].grid(n)
@@ -708,11 +790,15 @@ class fetch_files(object):
         # remove old runs, modes not selected
         for r in tuple(self.data_lines.keys()):
             if self.data_lines[r].bdfit.mode not in self.runmode:
-                self.data_lines[r].degrid()
+                self.data_lines[r].degrid(refresh=False)
+        self.update_lines()
             
         # set nbm variable
         self.set_nbm()
         
+        # keep within memory budget
+        self.bfit.trim_memory()
+        
         self.logger.info('Fetched runs %s', list(data.keys()))
         
     # ======================================================================= #
@@ -810,6 +896,34 @@ class fetch_files(object):
         if self.listbox_history.size()>self.nhistory:
             self.listbox_history.delete(END)            
     
+    # ======================================================================= #
+    def refresh_lines(self, ids):
+        """
+            Update the labels of refreshed runs, and redraw those which are
+            selected and drawn. Other data lines are untouched.
+            
+            ids: list of run ids which were read
+        """
+        
+        lines = [self.data_lines[k] for k in ids if k in self.data_lines.keys()]
+        
+        for line in lines:
+            line.set_check_text()
+            line.update_label()
+        
+        # redraw in place
+        if not self.bfit.plt.active['data']:
+            return
+        
+        draw_style = self.bfit.draw_style.get()
+        self.bfit.draw_style.set('stack')
+        try:
+            for line in lines:
+                if line.check_state.get():
+                    line.draw('data')
+        finally:
+            self.bfit.draw_style.set(draw_style)
+        
     # ======================================================================= #
     def remove_all(self):
         """Remove all data files from self.data_lines"""
@@ -821,7 +935,8 @@ class fetch_files(object):
                 del_list.append(self.data_lines[r])
         
         for d in del_list:
-            d.degrid()
+            d.degrid(refresh=False)
+        self.update_lines()
     
     # ======================================================================= #
     def return_binder(self):
@@ -934,7 +1049,7 @@ class fetch_files(object):
         msg += '     ' + ('\n     '.join(lines))
         
         # example
-        ex = 'ex: "10 < BIAS < 15"'
+        ex = 'ex: "10 < BIAS < 15"\n     "TEMP > 250 or not B0 < 1"'
         msg += '\n\n' + ex
         
         # make window
@@ -1022,20 +1137,44 @@ class fetch_files(object):
             state = not self.data_lines[k].check_state.get()
             self.data_lines[k].check_state.set(state)
 
+    # ======================================================================= #
+    def update_lines(self):
+        """Show the data lines in the list, in order"""
+        lines = sorted(self.data_lines.values(), key=lambda line: line.row)
+        self.line_list.set_items(lines)
+        
     # ======================================================================= #
     def update_data(self):
         """
-            Re-fetch all fetched runs.
+            Re-fetch all fetched runs, reading only files which have changed.
             Update labels
+            
+            Returns list of ids of runs which were read
         """
         
         self.logger.info('Updating data')
         
         # fetch
-        for dat in self.bfit.data.values():
-            dat.read()
+        changed = [k for k, dat in self.bfit.data.items() if dat.read()]
+        self.logger.info('Read %d changed runs', len(changed))
             
         # update text
         for line in self.data_lines.values():
             line.set_check_text()
             line.update_label()
+            
+        return changed
+
+# =========================================================================== #
+def read_run(run, year):
+    """
+        Read a run from the archive, for reading runs concurrently
+
+        Returns (run, bdata), with bdata None if the run could not be read
+    """
+    try:
+        return (run, bdata(run, year=year))
+    except Exception:
+        logging.getLogger(logger_name).exception('Failed to read run %d (%d)',
+                                                 run, year)
+        return (run, None)
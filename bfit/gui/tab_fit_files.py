@@ -17,7 +17,11 @@ from bfit.gui.popup_add_param import popup_add_param
 from bfit.gui.popup_ongoing_process import popup_ongoing_process
 from bfit.backend.entry_color_set import on_focusout, on_entry_click
 from bfit.backend.raise_window import raise_window
-from bfit.gui.fitline import fitline
+from bfit.backend.FitResults import FitResults, write_frame
+from bfit.backend.RunExporter import RunExporter
+from bfit.backend.fitdata import fitdata
+from bfit.gui.fitline import fitline, fitline_row
+from bfit.gui.virtual_list import virtual_list
 
 import numpy as np
 import pandas as pd
@@ -26,7 +30,7 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import bfit.backend.colors as colors
 
-import datetime, os, traceback, warnings, logging
+import datetime, os, signal, sys, traceback, warnings, logging
 
 register_matplotlib_converters()
 
@@ -37,26 +41,27 @@ class fit_files(object):
             annotation:     stringvar: name of quantity for annotating parameters
             annotation_combobox: box for choosing annotation label parameter
             asym_type:      asymmetry calculation type
-            canvas_frame_id:id number of frame in canvas
             chi_threshold:  if chi > thres, set color to red
             draw_components:list of titles for labels, options to export, draw.
             entry_asym_type:combobox for asym calculations
-            fit_canvas:     canvas object allowing for scrolling
             fit_data_tab:   containing frame (for destruction)
             fit_function_title: StringVar, title of fit function to use
             fit_function_title_box: combobox for fit function names
             fit_input:      fitting input values = (fn_name, ncomp, data_list)
             fit_lines:      Dict storing fitline objects
             fit_lines_old: dictionary of previously used fitline objects, keyed by run
+            fit_results:    FitResults, parameters of all fitted runs
             fit_routine_label: label for fit routine
             fitter:         fitting object from self.bfit.routine_mod
             gchi_label:     Label for global chisquared
+            input_state:    "normal" or "disabled", state of inputs while fitting
             mode:           what type of run is this.
 
             n_component:    number of fitting components (IntVar)
             n_component_box:Spinbox for number of fitting components
             par_label       StringVar, label for plotting parameter set
             par_label_entry:draw parameter label entry box
+            param_list:     virtual_list, table of fit parameters of all runs
             plt:            self.bfit.plt
 
             pop_addpar:     popup for ading parameters which are combinations of others
@@ -64,12 +69,10 @@ class fit_files(object):
             pop_fitconstr:  object for fitting with constrained functions
 
             probe_label:    Label for probe species
-            runframe:       frame for displaying fit results and inputs
             runmode_label:  display run mode
             set_as_group:   BooleanVar() if true, set fit parfor whole group
             set_prior_p0:   BooleanVar() if true, set P0 of newly added runs to
                             P0 of fit with largest run number
-            share_var:      BooleanVar() holds share checkbox for all fitlines
             use_rebin:      BoolVar() for rebinning on fitting
             xaxis:          StringVar() for parameter to draw on x axis
             yaxis:          StringVar() for parameter to draw on y axis
@@ -93,15 +96,19 @@ class fit_files(object):
         # initialize
         self.bfit = bfit
         self.fit_output = {}
-        self.share_var = {}
+        self.input_state = 'normal'
         self.fitter = self.bfit.routine_mod.fitter(keyfn = bfit.get_run_key,
-                                                   probe_species = bfit.probe_species.get())
+                                                   probe_species = bfit.probe_species.get(),
+                                                   n_jobs = bfit.fit_n_jobs,
+                                                   max_nfcn = bfit.fit_max_nfcn or None,
+                                                   max_time = bfit.fit_max_time or None)
         self.draw_components = list(bfit.draw_components)
         self.fit_data_tab = fit_data_tab
         self.plt = self.bfit.plt
 
         self.fit_lines = {}
         self.fit_lines_old = {}
+        self.fit_results = FitResults()
 
         self.pop_fitconstr = popup_fit_constraints(self.bfit, self)
 
@@ -117,7 +124,7 @@ class fit_files(object):
         fit_data_tab.grid_columnconfigure(0, weight=1)   # fitting space
         fit_data_tab.grid_rowconfigure(6, weight=1)      # push bottom window in right frame to top
         mid_fit_frame.grid_columnconfigure(0, weight=1)
-        mid_fit_frame.grid_rowconfigure(0, weight=1)
+        mid_fit_frame.grid_rowconfigure(1, weight=1)
 
         # TOP FRAME -----------------------------------------------------------
 
@@ -164,30 +171,14 @@ class fit_files(object):
 
         # MID FRAME -----------------------------------------------------------
 
-        # Scrolling frame to hold fitlines
-        yscrollbar = ttk.Scrollbar(mid_fit_frame, orient=VERTICAL)
-        self.fit_canvas = Canvas(mid_fit_frame, bd=0,                # make a canvas for scrolling
-                yscrollcommand=yscrollbar.set,                      # scroll command receive
-                scrollregion=(0, 0, 5000, 5000), confine=True)       # default size
-        yscrollbar.config(command=self.fit_canvas.yview)            # scroll command send
-        self.runframe = ttk.Frame(self.fit_canvas, pad=5)           # holds
-
-        self.canvas_frame_id = self.fit_canvas.create_window((0, 0),    # make window which can scroll
-                window=self.runframe,
-                anchor='nw')
-        self.runframe.bind("<Configure>", self.config_canvas) # bind resize to alter scrollable region
-        self.fit_canvas.bind("<Configure>", self.config_runframe) # bind resize to change size of contained frame
+        # Scrolling table of parameters: only visible rows have widgets
+        headings = fitline_row.make_headings(mid_fit_frame)
+        self.param_list = virtual_list(mid_fit_frame, 
+                            make_row=lambda parent: fitline_row(parent, self.bfit))
 
         # gridding
-        self.fit_canvas.grid(column=0, row=0, sticky=(E, W, S, N))
-        yscrollbar.grid(column=1, row=0, sticky=(W, S, N))
-
-        self.runframe.grid_columnconfigure(0, weight=1)
-        self.fit_canvas.grid_columnconfigure(0, weight=1)
-        self.fit_canvas.grid_rowconfigure(0, weight=1)
-
-        self.runframe.bind("<Configure>", self.config_canvas) # bind resize to alter scrollable region
-        self.fit_canvas.bind("<Configure>", self.config_runframe) # bind resize to change size of contained frame
+        headings.grid(column=0, row=0, sticky=(W, N), padx=5)
+        self.param_list.grid(column=0, row=1, sticky=(E, W, S, N))
 
         # RIGHT FRAME ---------------------------------------------------------
 
@@ -367,10 +358,6 @@ class fit_files(object):
         fn_select_frame.grid_columnconfigure(5, weight=1)  # set results as p0
         fn_select_frame.grid_columnconfigure(6, weight=1)  # reset p0
 
-        # fitting frame
-        self.fit_canvas.grid_columnconfigure(0, weight=1)    # fetch frame
-        self.fit_canvas.grid_rowconfigure(0, weight=1)
-
         # right frame
         for i in range(2):
             results_frame.grid_columnconfigure(i, weight=0)
@@ -417,23 +404,11 @@ class fit_files(object):
 
     # ======================================================================= #
     def canvas_scroll(self, event):
-        """Scroll canvas with files selected."""
+        """Scroll parameter table."""
         if event.num == 4:
-            self.fit_canvas.yview_scroll(-1, "units")
+            self.param_list.yview('scroll', -1, 'units')
         elif event.num == 5:
-            self.fit_canvas.yview_scroll(1, "units")
-
-    # ======================================================================= #
-    def config_canvas(self, event):
-        """Alter scrollable region based on canvas bounding box size.
-        (changes scrollbar properties)"""
-        self.fit_canvas.configure(scrollregion=self.fit_canvas.bbox("all"))
-
-    # ======================================================================= #
-    def config_runframe(self, event):
-        """Alter size of contained frame in canvas. Allows for inside window to
-        be resized with mouse drag"""
-        self.fit_canvas.itemconfig(self.canvas_frame_id, width=event.width)
+            self.param_list.yview('scroll', 1, 'units')
 
     # ======================================================================= #
     def populate(self, *args):
@@ -500,7 +475,7 @@ class fit_files(object):
 
                 # make new fit line
                 else:
-                    self.fit_lines[k] = fitline(self.bfit, self.runframe, dl[k].bdfit, n)
+                    self.fit_lines[k] = fitline(self.bfit, dl[k].bdfit, n)
 
             self.fit_lines[k].grid(n)
             n+=1
@@ -530,6 +505,7 @@ class fit_files(object):
             self.xaxis_combobox['values'] = []
             self.yaxis_combobox['values'] = []
             self.annotation_combobox['values'] = []
+            self.update_lines()
             return
 
         # set contraints flag
@@ -590,17 +566,30 @@ class fit_files(object):
         modify_all_value = self.set_as_group.get()
         self.set_as_group.set(False)
 
-        # regenerate fitlines
+        # regenerate fitlines, with initial parameters of all runs at once
+        init_par = {}
+        if force_modify:
+            init_par = self.gen_init_par(self.fit_lines.values())
+
         for fline in self.fit_lines.values():
-            fline.populate(force_modify=force_modify)
+            fline.populate(force_modify=force_modify,
+                           values=init_par.get(fline.data.id, None))
 
         for fline in self.fit_lines_old.values():
             if self.mode == fline.data.mode:
                 fline.populate(force_modify=force_modify)
 
+        # shared parameters are shared by all runs, including new ones
+        shared = set(line.pname for fline in self.fit_lines.values()
+                                for line in fline.lines if line.get('shared'))
+        for pname in shared:
+            self.set_lines(pname, 'shared', True)
+
         # reset modify all value
         self.set_as_group.set(modify_all_value)
 
+        self.update_lines()
+
     # ======================================================================= #
     def do_add_param(self, *args):
         """Launch popup for adding user-defined parameters to draw"""
@@ -630,8 +619,7 @@ class fit_files(object):
         # enable fit checkboxes on fetch files tab
         for k in self.bfit.fetch_files.data_lines.keys():
             dline = self.bfit.fetch_files.data_lines[k]
-            dline.draw_fit_checkbox['state'] = 'normal'
-            dline.draw_res_checkbox['state'] = 'normal'
+            dline.set_fit_enabled(True)
             dline.check_fit.set(True)
         self.bfit.fetch_files.check_state_fit.set(True)
 
@@ -740,53 +728,47 @@ class fit_files(object):
         que = Queue()
 
         def run_fit():
+
+            # stop any worker processes if cancelled
+            signal.signal(signal.SIGTERM, lambda *args: sys.exit())
+
             try:
-                # fit_output keyed as {run:[key/par/cov/chi/fnpointer]}
-                fit_output = fitter(fn_name=fn_name,
+                # send results of each run as they finish
+                for key, df, diagnostics in fitter.iter_fit(fn_name=fn_name,
                                     ncomp=ncomp,
                                     data_list=data_list,
                                     hist_select=self.bfit.hist_select,
                                     asym_mode=self.bfit.get_asym_mode(self),
-                                    xlims=xlims)
+                                    xlims=xlims):
+                    que.put(('run', key, df, diagnostics))
+
             except Exception as errmsg:
                 self.logger.exception('Fitting error')
                 que.put(str(errmsg))
                 raise errmsg from None
 
-            que.put(fit_output)
+            que.put(('done', ))
 
         # log fitting
         for d in data_list:
             self.logger.info('Fitting run %s: %s', self.bfit.get_run_key(d[0]), d[1:])
 
-        # start fit
-        popup = popup_ongoing_process(self.bfit,
-                    target = run_fit,
-                    message="Fitting in progress...",
-                    queue = que,
-                    do_disable = lambda : self.input_enable_disable(self.fit_data_tab, state='disabled'),
-                    do_enable = lambda : self.input_enable_disable(self.fit_data_tab, state='normal'),
-                    )
-        output = popup.run()
-
-        # fit success
-        if type(output) is tuple:
-            fit_output, gchi = output
+        # get fit functions
+        fns = fitter.get_fit_fn(fn_name, ncomp, data_list)
 
-        # error message
-        elif type(output) is str:
-            messagebox.showerror("Error", output)
-            return
+        # running global chi, failed runs, and runs over budget
+        chisq = [0., 0]
+        failed = []
+        fallback = []
 
-        # fit cancelled
-        elif output is None:
-            return
+        def set_result(output):
+            """Set the results of a single run as they arrive"""
 
-        # get fit functions
-        fns = fitter.get_fit_fn(fn_name, ncomp, data_list)
+            # error message or fit complete
+            if type(output) is str or output[0] == 'done':
+                return output
 
-        # set output results
-        for key, df in fit_output.items(): # iterate run ids
+            _, key, df, diagnostics = output
 
             # get fixed and shared
             fs = {'fixed':[], 'shared':[], 'parnames':[]}
@@ -798,21 +780,79 @@ class fit_files(object):
 
             df2 = pd.concat((df, pd.DataFrame(fs).set_index('parnames')), axis='columns')
 
+            # global chi
+            if 'gchi' in diagnostics:
+                gchi = diagnostics['gchi']
+            else:
+                chisq[0] += diagnostics['chisq']
+                chisq[1] += diagnostics['dof']
+                gchi = chisq[0]/chisq[1] if chisq[1] else np.nan
+
             # make output
             new_output = {'results': df2,
                           'fn': fns[key],
                           'gchi': gchi}
 
-            self.bfit.data[key].set_fitresult(new_output)
-            self.bfit.data[key].fit_title = self.fit_function_title.get()
-            self.bfit.data[key].ncomp = self.n_component.get()
+            data = self.bfit.data[key]
+            data.set_fitresult(new_output)
+            data.fit_title = self.fit_function_title.get()
+            data.ncomp = self.n_component.get()
+
+            # store results
+            self.fit_results.append(key, df2, meta={'Run Number': data.run,
+                                                    'Year': data.year,
+                                                    'Fit Function': data.fit_title,
+                                                    'Number of Components': data.ncomp,
+                                                    })
 
-        # display run results
-        for key in self.fit_lines.keys():
+            # display run results
             self.fit_lines[key].show_fit_result()
+            self.gchi_label['text'] = str(np.around(gchi, 2))
 
-        # show global chi
-        self.gchi_label['text'] = str(np.around(gchi, 2))
+            # report problems
+            if diagnostics['message'] is not None:
+                self.logger.warning(diagnostics['message'])
+
+            if diagnostics['error'] is not None:
+                msg = 'Run %s: %s' % (key, diagnostics['error'])
+                self.logger.error('Fit failed for %s', msg)
+                failed.append(msg)
+
+            if diagnostics.get('fallback', None) is not None:
+                fallback.append('Run %s: used %s' % (key, diagnostics['fallback']))
+
+        # start fit
+        popup = popup_ongoing_process(self.bfit,
+                    target = run_fit,
+                    message="Fitting in progress...",
+                    queue = que,
+                    do_disable = lambda : self.input_enable_disable(self.fit_data_tab, state='disabled'),
+                    do_enable = lambda : self.input_enable_disable(self.fit_data_tab, state='normal'),
+                    nsteps = len(data_list),
+                    callback = set_result,
+                    )
+        output = popup.run()
+
+        # error message
+        if type(output) is str:
+            messagebox.showerror("Error", output)
+            return
+
+        # fit cancelled: keep finished results
+        elif output is None:
+            return
+
+        # failed runs
+        if len(failed) == len(data_list):
+            messagebox.showerror("Error", '\n'.join(failed))
+            return
+
+        elif failed:
+            messagebox.showwarning("Fit failed for some runs", '\n'.join(failed))
+
+        if fallback:
+            messagebox.showwarning("Fit budget exceeded for some runs",
+                                   '\n'.join(fallback))
 
         self.do_end_of_fit()
 
@@ -866,6 +906,33 @@ class fit_files(object):
                 val = line.get('res')
                 line.set(p0=val)
 
+    # ======================================================================= #
+    def gen_init_par(self, flines):
+        """
+            Get initial parameters of many runs in one call to the fitter.
+
+            flines: list of fitline objects
+
+            Returns dict {run id: DataFrame}, empty if this fails, such that
+            each fitline gets its own parameters.
+        """
+
+        flines = list(flines)
+        if not flines:
+            return {}
+
+        try:
+            values = self.fitter.gen_init_par_batch(
+                                            self.fit_function_title.get(),
+                                            self.n_component.get(),
+                                            [f.data for f in flines],
+                                            self.bfit.get_asym_mode(self))
+        except Exception as err:
+            self.logger.debug('Batch initial parameters failed: %s', err)
+            return {}
+
+        return {f.data.id: v for f, v in zip(flines, values)}
+
     # ======================================================================= #
     def do_reset_initial(self, *args):
         """Reset initial parmeters to defaults"""
@@ -873,8 +940,10 @@ class fit_files(object):
         self.logger.info('Reset initial parameters')
 
         # reset lines
+        init_par = self.gen_init_par(self.fit_lines.values())
         for fline in self.fit_lines.values():
-            fline.get_new_parameters(force_modify=True)
+            fline.get_new_parameters(force_modify=True,
+                                     values=init_par.get(fline.data.id, None))
             fitpar = fline.data.fitpar
             for line in fline.lines:
                 values = {c: fitpar.loc[line.pname, c] for c in fitpar.columns}
@@ -1134,13 +1203,39 @@ class fit_files(object):
 
     # ======================================================================= #
     def export(self, savetofile=True, filename=None):
-        """Export the fit parameter and file headers"""
+        """
+            Export the fit parameter and file headers. Fit parameters are taken
+            from self.fit_results, if these are the current results of the run.
+            The file format is set by the extension of filename, see
+            FitResults.write_frame.
+        """
+
+        # fit results of the drawn runs, in the order of get_values
+        dlines = self.bfit.fetch_files.data_lines
+        runs = sorted([dlines[k].id for k in dlines if dlines[k].check_state.get()])
+
+        # drop results of old fits, such as after changing the fit function
+        for id in runs:
+            if id in self.fit_results and \
+                    not self.fit_results.matches(id, self.bfit.data[id].fitpar):
+                self.fit_results.remove(id)
+
+        results = self.fit_results.to_frame(runs)
+        is_stored = all(id in self.fit_results for id in runs)
+
         # get values and errors
         val = {}
 
         for v in self.xaxis_combobox['values']:
             if v == '': continue
 
+            # fit parameters, if stored for all runs
+            if is_stored and v in results.columns and 'Error- '+v in results.columns:
+                val[v] = results[v].values
+                val['Error- '+v] = results['Error- '+v].values
+                val['Error+ '+v] = results['Error+ '+v].values
+                continue
+
             try:
                 v2 = self.get_values(v)
 
@@ -1161,22 +1256,17 @@ class fit_files(object):
                     val['Error '+v] = v2[1]
 
         # get fixed and shared, if fitted
-        keylist = []
+        parnames = []
         for k, line in self.fit_lines.items():
-            keylist.append(k)
             data = line.data
 
             if not all(data.fitpar['res'].isna()):
+                parnames.extend([p for p in data.fitpar.index if p not in parnames])
 
-                for kk in data.fitpar.index:
-
-                    name = 'fixed '+kk
-                    if name not in val.keys(): val[name] = []
-                    val[name].append(data.fitpar.loc[kk, 'fixed'])
-
-                    name = 'shared '+kk
-                    if name not in val.keys(): val[name] = []
-                    val[name].append(data.fitpar.loc[kk, 'shared'])
+        for p in parnames:
+            for c in ('fixed '+p, 'shared '+p):
+                if c in results.columns:
+                    val[c] = results[c].values
 
         # make data frame for output
         df = pd.DataFrame(val)
@@ -1192,6 +1282,8 @@ class fit_files(object):
             # get file name
             if filename is None:
                 filename = filedialog.asksaveasfilename(filetypes=[('csv', '*.csv'),
+                                                                   ('parquet', '*.parquet'),
+                                                                   ('hdf5', '*.h5'),
                                                                    ('allfiles', '*')],
                                                     defaultextension='.csv')
                 if not filename:
@@ -1227,62 +1319,68 @@ class fit_files(object):
             header.extend(['#\n# Generated by bfit v%s on %s' % (__version__, datetime.datetime.now()),
                           '#\n#\n'])
 
-            with open(filename, 'w') as fid:
-                fid.write('\n'.join(header))
-
             # write data
-            df.to_csv(filename, mode='a+')
+            write_frame(df, filename, header)
             self.logger.debug('Export success')
         else:
             self.logger.info('Returned exported parameters')
             return df
 
     # ======================================================================= #
-    def export_fit(self, savetofile=True, directory=None):
-        """Export the fit lines as csv files"""
+    def export_fit(self, savetofile=True, directory=None, filename=None):
+        """
+            Export the fit lines. If filename is None, write one csv file per
+            run to directory. Else write all runs to filename, see RunExporter.
+            Fit curves are calculated and written in parallel.
+        """
 
-        # filename
-        filename = self.bfit.fileviewer.default_export_filename
-        filename = '_fit'.join(os.path.splitext(filename))
+        # per-run filename
+        run_filename = self.bfit.fileviewer.default_export_filename
+        run_filename = '_fit'.join(os.path.splitext(run_filename))
 
-        if directory is None:
+        if directory is None and filename is None:
             directory = filedialog.askdirectory()
             if not directory:
                 return
 
-        filename = os.path.join(directory, filename)
+        if filename is None:
+            run_filename = os.path.join(directory, run_filename)
 
         # asymmetry type
         asym_mode = self.bfit.get_asym_mode(self)
 
-        # get data and write
+        # get settings on the main thread
+        exporter = RunExporter(n_jobs=self.bfit.fetch_files.fetch_n_jobs)
         for id in self.fit_lines.keys():
 
             # get data
             data = self.bfit.data[id]
-            t, a, da = data.asym(asym_mode)
 
             # get fit data
-            fitx = np.linspace(min(t), max(t), self.n_fitx_pts)
-
             try:
                 fit_par = data.fitpar.loc[data.parnames, 'res']
             except AttributeError:
                 continue
             dfit_par_l = data.fitpar.loc[data.parnames, 'dres-']
             dfit_par_h = data.fitpar.loc[data.parnames, 'dres+']
-            fity = data.fitfn(fitx, *fit_par)
 
             if data.mode in self.bfit.units:
-                unit = self.bfit.units[data.mode]
-                fitxx = fitx*unit[0]
-                xlabel = self.bfit.xlabel_dict[self.mode] % unit[1]
+                xlabel = self.bfit.xlabel_dict[self.mode] % self.bfit.units[data.mode][1]
             else:
-                fitxx = fitx
                 xlabel = self.bfit.xlabel_dict[self.mode]
 
+            # fit curve over the range of the data, cached with the drawn curve
+            options = data.get_asym_options()
+            def calculate(data=data, options=options, xlabel=xlabel,
+                          npts=self.n_fitx_pts):
+                t = data.asym(asym_mode, options=options)[0]
+                fitx, fity = data.get_fit_curve(min(t), max(t), npts,
+                                                asym_mode=asym_mode)
+                return pd.DataFrame({'asymmetry':fity},
+                                    index=pd.Index(fitx, name=xlabel))
+
             # write header
-            fname = filename%(data.year, data.run)
+            fname = run_filename%(data.year, data.run)
             header = ['# %s' % data.id,
                       '# %s' % data.title,
                       '# Fit function : %s' % data.fit_title,
@@ -1299,13 +1397,12 @@ class fit_files(object):
                       '# Generated by bfit v%s on %s' % (__version__, datetime.datetime.now()),
                       '#']
 
-            with open(fname, 'w') as fid:
-                fid.write('\n'.join(header) + '\n')
+            exporter.add(id, calculate, fname, header)
 
-            # write data
-            df = pd.DataFrame({xlabel:fitx, 'asymmetry':fity})
-            df.to_csv(fname, index=False, mode='a+')
-            self.logger.info('Exporting fit to %s', fname)
+        # calculate and write
+        self.logger.info('Exporting %d fits to %s', len(exporter),
+                         run_filename if filename is None else filename)
+        self.bfit.export_runs(exporter, filename)
 
     # ======================================================================= #
     def get_values(self, select):
@@ -1320,15 +1417,21 @@ class fit_files(object):
 
         self.logger.debug('Fetching parameter %s', select)
 
-        # get values
-        out = np.array([data[r].get_values(select) for r in runs], dtype=object)
+        # user-defined parameters: all runs at once
+        set_par = getattr(getattr(self, 'pop_addpar', None), 'set_par', {})
+        if select in set_par and select not in self.bfit.draw_components:
+            try:
+                parnames = self.fitter.gen_param_names(
+                                            self.fit_function_title.get(),
+                                            self.n_component.get())
+            except KeyError:
+                parnames = ()
 
-        val = out[:, 0]
-        err = np.array(out[:, 1].tolist())
-        if len(err.shape) > 1:
-            err = (err[:, 0], err[:, 1])
+            if select not in parnames:
+                return set_par[select].get_values(runs)
 
-        return (val, err)
+        # get values, calculating only those not already in the table
+        return fitdata.param_table.get(select, data, runs)
 
     # ======================================================================= #
     def input_enable_disable(self, parent, state, first=True):
@@ -1341,6 +1444,10 @@ class fit_files(object):
 
         if first:
 
+            # disable parameter table
+            self.input_state = state
+            self.param_list.refresh()
+
             # disable tabs
             self.bfit.notebook.tab(1, state=state)
 
@@ -1367,7 +1474,8 @@ class fit_files(object):
             if child in (self.xaxis_combobox,
                          self.yaxis_combobox,
                          self.annotation_combobox,
-                         self.par_label_entry):
+                         self.par_label_entry,
+                         self.param_list.frame):
                 continue
 
 
@@ -1416,8 +1524,9 @@ class fit_files(object):
     # ======================================================================= #
     def set_lines(self, pname, col, value, skipline=None):
         """
-            Modify all input fields of each line to match the altered one
-            conditional on self.set_as_group
+            Modify a parameter of all runs to match the altered one. Values are
+            assigned to the fit parameters of each run, and only the visible 
+            rows of the table are redrawn. 
 
             pname: string, parameter being changed
             col:   str, column being changed
@@ -1425,17 +1534,10 @@ class fit_files(object):
             skipline: if this line, don't modify
         """
 
-        for fitline in self.fit_lines.values():
-
-            # trivial case
-            if not fitline.lines:
-                return
-
-            # get line id
-            id = [line.pname for line in fitline.lines].index(pname)
-            line = fitline.lines[id]
+        for fline in self.fit_lines.values():
+            line = fline.get_line(pname)
 
-            if line == skipline:
+            if line is None or line is skipline:
                 continue
 
             # set
@@ -1466,6 +1568,13 @@ class fit_files(object):
         else:
             p.show()
 
+    # ======================================================================= #
+    def update_lines(self):
+        """Show the fit lines in the parameter table, in order"""
+        flines = sorted(self.fit_lines.values(), key=lambda fline: fline.row)
+        self.param_list.set_items([item for fline in flines 
+                                        for item in fline.get_items()])
+
     # ======================================================================= #
     def update_param(self, *args):
         """Update all figures with parameters drawn with new fit results"""
@@ -0,0 +1,151 @@
+# Scrolling list which only makes widgets for the visible items
+# Derek Fujimoto
+# Oct 2026
+
+from tkinter import *
+from tkinter import ttk
+
+# =========================================================================== #
+class virtual_list(object):
+    """
+        Scrolling list of items, such as datalines, where only the visible items
+        have widgets. A fixed pool of row views is made to fill the height of
+        the list, and the rows are bound to different items while scrolling.
+
+        Row views are made by make_row(parent) and have attribute frame, the
+        Frame holding the row widgets, and methods bind(item), to show an item,
+        and unbind(), to release it.
+
+        first:      index of the item shown in the first row
+        frame:      Frame holding the rows and the scrollbar
+        items:      list of items in display order
+        make_row:   function handle to make a new row view
+        nvisible:   number of rows which fit in the list
+        row_frame:  Frame holding the rows
+        row_height: height of one row in pixels, None until the first row is
+                    made
+        rows:       list of row views
+        scrollbar:  Scrollbar
+    """
+
+    # ======================================================================= #
+    def __init__(self, parent, make_row, pad=5):
+
+        self.make_row = make_row
+        self.items = []
+        self.rows = []
+        self.first = 0
+        self.nvisible = 1
+        self.row_height = None
+
+        # build objects
+        self.frame = ttk.Frame(parent)
+        self.row_frame = ttk.Frame(self.frame, pad=pad)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=VERTICAL,
+                                       command=self.yview)
+
+        # size of the list is set by the parent, not the rows
+        self.row_frame.grid_propagate(False)
+        self.row_frame.bind('<Configure>', self.resize)
+
+        # grid
+        self.row_frame.grid(column=0, row=0, sticky=(N, S, E, W))
+        self.scrollbar.grid(column=1, row=0, sticky=(N, S))
+
+        # resizing
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.row_frame.grid_columnconfigure(0, weight=1)
+
+    # ======================================================================= #
+    def __len__(self):
+        return len(self.items)
+
+    # ======================================================================= #
+    def _add_row(self):
+        """Make a new row view, measuring the row height from the first"""
+
+        row = self.make_row(self.row_frame)
+        self.rows.append(row)
+
+        if self.row_height is None:
+            row.frame.update_idletasks()
+            self.row_height = max(1, row.frame.winfo_reqheight())
+            self.row_frame.config(width=row.frame.winfo_reqwidth())
+            self.nvisible = self._get_nvisible()
+
+    # ======================================================================= #
+    def _get_nvisible(self):
+        return max(1, self.row_frame.winfo_height() // self.row_height)
+
+    # ======================================================================= #
+    def grid(self, **kwargs):
+        """Grid the list in its parent"""
+        self.frame.grid(**kwargs)
+
+    # ======================================================================= #
+    def refresh(self):
+        """Bind the rows to the visible items"""
+
+        n = len(self.items)
+
+        # make rows as needed
+        if n > 0 and not self.rows:
+            self._add_row()
+        while len(self.rows) < min(self.nvisible, n):
+            self._add_row()
+
+        self.first = max(0, min(self.first, n-self.nvisible))
+
+        for i, row in enumerate(self.rows):
+            idx = self.first+i
+            if i < self.nvisible and idx < n:
+                row.bind(self.items[idx])
+                row.frame.grid(column=0, row=i, sticky=(W, N))
+            else:
+                row.unbind()
+                row.frame.grid_remove()
+
+        # set scrollbar
+        if n > 0:
+            self.scrollbar.set(self.first/n, min(1, (self.first+self.nvisible)/n))
+        else:
+            self.scrollbar.set(0, 1)
+
+    # ======================================================================= #
+    def resize(self, *args):
+        """Set the number of rows from the height of the list"""
+
+        if self.row_height is None:
+            return
+
+        nvisible = self._get_nvisible()
+        if nvisible != self.nvisible:
+            self.nvisible = nvisible
+            self.refresh()
+
+    # ======================================================================= #
+    def set_items(self, items):
+        """Set the list of items to show, in display order"""
+        self.items = list(items)
+        self.refresh()
+
+    # ======================================================================= #
+    def yview(self, *args):
+        """
+            Scroll the list, as the yview of a Scrollable widget.
+
+            args: ('moveto', fraction) or ('scroll', number, 'units' or 'pages')
+        """
+
+        n = len(self.items)
+
+        if args[0] == 'moveto':
+            self.first = int(round(float(args[1])*n))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.nvisible
+            self.first += step
+
+        self.refresh()
@@ -0,0 +1,74 @@
+# test asymmetry cache
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.AsymCache import AsymCache
+from bfit.backend.fitdata import fitdata
+import numpy as np
+import pandas as pd
+
+def calc():
+    return (np.arange(10.), np.ones(10), np.ones(10)*0.1)
+
+def test_reuse():
+    cache = AsymCache()
+    a1 = cache.get(('run1', 'c', 1), calc)
+    a2 = cache.get(('run1', 'c', 1), calc)
+    assert_array_equal(a1[1], a2[1], err_msg='cached asymmetry value')
+    assert_equal(cache.nhits, 1, err_msg='cache hit count')
+    assert_equal(cache.nmisses, 1, err_msg='cache miss count')
+
+def test_copy():
+    cache = AsymCache()
+    a1 = cache.get(('run1', 'c', 1), calc)
+    a1[1][:] = 0
+    a2 = cache.get(('run1', 'c', 1), calc)
+    assert_array_equal(a2[1], np.ones(10), err_msg='cached asymmetry modified by caller')
+
+def test_invalidate():
+    cache = AsymCache()
+    cache.get(('run1', 'c', 1), calc)
+    cache.get(('run1', 'c', 2), calc)
+    cache.get(('run2', 'c', 1), calc)
+    cache.invalidate('run1')
+    assert_equal(len(cache), 1, err_msg='invalidate run entries')
+    assert ('run2', 'c', 1) in cache, 'invalidate kept other runs'
+    assert_equal(cache.nbytes, 240, err_msg='invalidate memory count')
+
+def test_budget():
+    cache = AsymCache(max_bytes=500)
+    cache.get(('run1', 'c', 1), calc)
+    cache.get(('run2', 'c', 1), calc)
+    cache.get(('run1', 'c', 1), calc)   # run1 most recent
+    cache.get(('run3', 'c', 1), calc)
+    assert ('run2', 'c', 1) not in cache, 'least recently used not dropped'
+    assert ('run1', 'c', 1) in cache, 'recently used dropped'
+    assert cache.nbytes <= 500, 'memory budget exceeded'
+
+def test_fit_curve():
+
+    # stand-in fitted run, counting function calls
+    ncalls = []
+    def fn(x, a, b):
+        ncalls.append(1)
+        return a*np.exp(-b*x)
+
+    data = fitdata.__new__(fitdata)
+    data.id = '2021.40001'
+    data.parnames = ['amp', '1_T1']
+    data.fitpar = pd.DataFrame({'res': [0.1, 2]}, index=data.parnames)
+    data.fitfn = fn
+    data.fit_cache = AsymCache()
+
+    x1, y1 = data.get_fit_curve(0, 4, 50, asym_mode='c')
+    x2, y2 = data.get_fit_curve(0, 4, 50, asym_mode='c')
+    assert_allclose(y2, 0.1*np.exp(-2*x1), err_msg='fit curve value')
+    assert_equal(len(ncalls), 1, err_msg='fit curve reused')
+
+    data.fitpar.loc['1_T1', 'res'] = 3
+    data.get_fit_curve(0, 4, 50, asym_mode='c')
+    assert_equal(len(ncalls), 2, err_msg='fit curve with new parameters')
+
+    data.fit_cache.invalidate(data.id)
+    assert_equal(len(data.fit_cache), 0, err_msg='fit curve invalidate')
@@ -0,0 +1,70 @@
+# test vectorized batch fitter
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.fitting.batch_fitter import batch_fitter
+from bfit.fitting.functions import pulsed_exp
+from scipy.optimize import curve_fit
+import numpy as np
+
+fn = lambda x, a, b, c: a*np.exp(-b*x)+c
+x = np.linspace(0, 4, 100)
+rng = np.random.default_rng(0)
+ptrue = np.column_stack([rng.uniform(0.5, 2, 20), rng.uniform(0.2, 3, 20),
+                         rng.uniform(-0.1, 0.1, 20)])
+dy = np.full((20, len(x)), 0.01)
+y = np.array([fn(x, *p) for p in ptrue]) + rng.normal(0, 0.01, dy.shape)
+bounds = ([0, 0, -1], [10, 10, 1])
+
+def test_matches_curve_fit():
+    par, cov, std, chi, success, niter = batch_fitter(fn, x, y, dy,
+                                            np.tile([1, 1, 0], (20, 1)),
+                                            bounds=bounds)
+
+    assert all(success), 'batch fitter convergence'
+
+    for i in range(20):
+        p, c = curve_fit(fn, x, y[i], p0=[1, 1, 0], sigma=dy[i],
+                         absolute_sigma=True, bounds=bounds)
+        ch = np.sum(np.square((y[i]-fn(x, *p))/dy[i]))/(len(x)-3)
+        assert_allclose(par[i], p, rtol=1e-5, atol=1e-7,
+                        err_msg='batch fitter parameters run %d' % i)
+        assert_allclose(std[i], np.diag(c)**0.5, rtol=1e-4,
+                        err_msg='batch fitter errors run %d' % i)
+        assert_allclose(chi[i], ch, rtol=1e-6,
+                        err_msg='batch fitter chisq run %d' % i)
+
+def test_fixed():
+    p0 = ptrue.copy()
+    p0[:, :2] = 1
+    par, cov, std, chi, success, niter = batch_fitter(fn, x, y, dy, p0,
+                                            fixed=[False, False, True])
+
+    assert_array_equal(par[:, 2], ptrue[:, 2], err_msg='batch fitter fixed values')
+    assert all(np.isnan(std[:, 2])), 'batch fitter fixed errors'
+    assert_allclose(par[:, :2], ptrue[:, :2], rtol=0.05,
+                    err_msg='batch fitter parameters with fixed')
+
+def test_function_list():
+    # pulsed functions do not broadcast and are evaluated one run at a time
+    f = pulsed_exp(lifetime=1.2096, pulse_len=4)
+    t = np.linspace(0.1, 10, 100)
+    p = np.array([[1, 0.1], [2, 0.05], [0.5, 0.08]])
+    yp = np.array([f(t, *pp) for pp in p])
+    par = batch_fitter([f]*3, t, yp, np.full(yp.shape, 0.001),
+                       np.tile([1, 0.1], (3, 1)))[0]
+    assert_allclose(par, p, rtol=1e-5, err_msg='batch fitter function list')
+
+def test_stalled():
+    # first model is undefined in the direction of decreasing chisquared, so
+    # every step is rejected
+    f_bad = lambda x, a: x*(1-1000*a) if a >= 0 else np.full(len(x), np.nan)
+    f_good = lambda x, a: x*a
+    par, cov, std, chi, success, niter = batch_fitter([f_bad, f_good], x,
+                                            np.array([x*2, x*3]), dy[:2],
+                                            np.zeros((2, 1)), max_iter=100)
+
+    assert_array_equal(success, [False, True], err_msg='batch fitter stalled success')
+    assert niter[0] < 100, 'batch fitter stalled iterations'
+    assert_allclose(par[1], 3, err_msg='batch fitter stalled other run')
@@ -39,7 +39,8 @@ def check_line_names(fittab, names):
 
 def check_line_state(fittab, disabled_pnames):
     for fline in fittab.fit_lines.values():
-        states = {line.pname: line.entry['p0']['state'] for line in fline.lines}
+        states = {line.pname: 'disabled' if line.is_constrained else 'normal' 
+                  for line in fline.lines}
         
         for pname, state in states.items():
             
@@ -57,7 +58,7 @@ def check_line_p0(fittab):
     
     for fline in fittab.fit_lines.values():
         for line in fline.lines:
-            assert line.entry['p0'].get() != '', \
+            assert line.variable['p0'].get() != '', \
                 '"{pname}" of {run} has no p0'.format(pname=line.pname, run=fline.data.id)
 
 @with_bfit
@@ -0,0 +1,119 @@
+# test fit_bdata with independent runs
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.fitting.fit_bdata import fit_bdata, iter_fit_bdata
+import numpy as np
+import warnings
+
+# stand-in for bdata object: only asym is needed for fitting
+class fake_data(object):
+
+    def __init__(self, run, a, b, fail=False):
+        self.year = 2021
+        self.run = run
+        self.a = a
+        self.b = b
+        self.fail = fail
+
+    def asym(self, *args, **kwargs):
+        if self.fail:
+            raise RuntimeError('bad run')
+        x = np.linspace(0, 4, 50)
+        y = self.a*np.exp(-self.b*x)
+        dy = np.full(len(x), 0.01)
+        return (x, y, dy)
+
+fn = lambda x, amp, rate: amp*np.exp(-rate*x)
+
+data = [fake_data(40000+i, 1+0.1*i, 0.5+0.2*i) for i in range(6)]
+truth = np.array([[d.a, d.b] for d in data])
+
+def test_serial():
+    par = fit_bdata(data, fn, p0=[1, 1], minimizer='trf', n_jobs=1)[0]
+    assert_almost_equal(par, truth, decimal=5, err_msg='fit_bdata serial fit')
+
+def test_parallel():
+    par = fit_bdata(data, fn, p0=[1, 1], minimizer='trf', n_jobs=3)[0]
+    assert_almost_equal(par, truth, decimal=5,
+                        err_msg='fit_bdata parallel fit order or values')
+
+def test_parallel_migrad():
+    par = fit_bdata(data, fn, p0=[1, 1], minimizer='migrad', n_jobs=3)[0]
+    assert_almost_equal(par, truth, decimal=4,
+                        err_msg='fit_bdata parallel migrad fit')
+
+def test_failed_run():
+    bad = list(data)
+    bad[2] = fake_data(40099, 1, 1, fail=True)
+
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        par, std_l, std_h, cov, chi, gchi = fit_bdata(bad, fn, p0=[1, 1],
+                                                minimizer='trf', n_jobs=2)
+
+    assert any('40099' in str(wi.message) for wi in w), \
+        'fit_bdata failed run not reported'
+    assert all(np.isnan(par[2])), 'fit_bdata failed run not NaN'
+    assert_almost_equal(np.delete(par, 2, axis=0), np.delete(truth, 2, axis=0),
+                        decimal=5, err_msg='fit_bdata runs after failure')
+
+def test_all_failed():
+    bad = [fake_data(40099, 1, 1, fail=True)]*2
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        assert_raises(RuntimeError, fit_bdata, bad, fn, p0=[1, 1],
+                      minimizer='trf', n_jobs=2)
+
+def test_batch():
+    par = fit_bdata(data, fn, p0=[1, 1], minimizer='batch')[0]
+    assert_almost_equal(par, truth, decimal=5, err_msg='fit_bdata batch fit')
+
+def test_batch_matches_trf():
+    out_trf = fit_bdata(data, fn, p0=[1, 1], minimizer='trf')
+    out_batch = fit_bdata(data, fn, p0=[1, 1], minimizer='batch')
+    for a, b, name in zip(out_trf, out_batch, ('par', 'std_l', 'std_h', 'cov', 'chi')):
+        assert_allclose(b, a, rtol=1e-4, atol=1e-12,
+                        err_msg='fit_bdata batch and trf %s' % name)
+
+def test_iter():
+    out = list(iter_fit_bdata(data, fn, p0=[1, 1], minimizer='trf', n_jobs=3))
+    assert_equal(sorted(o[0] for o in out), np.arange(len(data)),
+                 err_msg='iter_fit_bdata runs yielded')
+    for i, par, std_l, std_h, cov, chi, diagnostics in out:
+        assert_almost_equal(par, truth[i], decimal=5,
+                            err_msg='iter_fit_bdata parameters run %d' % i)
+        assert diagnostics['error'] is None, 'iter_fit_bdata error run %d' % i
+
+def test_iter_close():
+    gen = iter_fit_bdata(data, fn, p0=[1, 1], minimizer='trf', n_jobs=2)
+    i, par = next(gen)[:2]
+    gen.close()
+    assert_almost_equal(par, truth[i], decimal=5,
+                        err_msg='iter_fit_bdata result before close')
+
+def test_iter_shared():
+    out = list(iter_fit_bdata(data[:2], fn, p0=[1, 1], shared=[False, True],
+                              minimizer='trf'))
+    assert_equal(len(out), 2, err_msg='iter_fit_bdata shared runs yielded')
+    assert 'gchi' in out[0][-1], 'iter_fit_bdata shared global chi'
+    assert_almost_equal(out[0][1][1], out[1][1][1],
+                        err_msg='iter_fit_bdata shared parameter')
+
+def test_budget_fallback():
+    out = list(iter_fit_bdata(data, fn, p0=[1, 1], minimizer='migrad',
+                              max_nfcn=45))
+    for i, par, std_l, std_h, cov, chi, diagnostics in out:
+        assert diagnostics['fallback'] == 'trf', 'budget fallback run %d' % i
+        assert diagnostics['message'] is not None, 'budget fallback message run %d' % i
+        assert_almost_equal(par, truth[i], decimal=5,
+                            err_msg='budget fallback parameters run %d' % i)
+
+def test_budget_exceeded():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        assert_raises(RuntimeError, fit_bdata, data, fn, p0=[1, 1],
+                      minimizer='migrad', max_time=0)
+        assert_raises(RuntimeError, fit_bdata, data, fn, p0=[1, 1],
+                      minimizer='trf', max_nfcn=2)
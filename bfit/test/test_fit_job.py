@@ -0,0 +1,108 @@
+# test fitting from job files without the gui
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.fitting.fit_job import read_job, run_job, write_table
+from bfit.fitting.functions import lorentzian
+import numpy as np
+import pandas as pd
+import subprocess
+import yaml
+import sys
+
+# stand-in for bdata object
+class fake_data(object):
+
+    def __init__(self, run, peak):
+        self.year = 2021
+        self.run = run
+        self.mode = '1f'
+        self.peak = peak
+
+    def asym(self, *args, **kwargs):
+        x = np.linspace(-10, 10, 101)
+        y = lorentzian(x, self.peak, 2, 0.05) + 0.1
+        dy = np.full(len(x), 0.001)
+        return (x, y, dy)
+
+peaks = (-1, 0, 1)
+data = {'2021.%d' % (40000+i): fake_data(40000+i, p) for i, p in enumerate(peaks)}
+
+def get_job(tmp_path, **kwargs):
+    job = {'fit_fit_function_title': 'Lorentzian',
+           'minimizer': 'bfit.fitting.fitter_curve_fit',
+           'data': {k: {'run': d.run, 'year': d.year} for k, d in data.items()},
+           'fitpar': {k: {'p0': {'peak': d.peak+0.2, 'fwhm': 1, 'height': 0.01,
+                                 'baseline': 0},
+                          'blo': {'peak': -np.inf, 'fwhm': 0, 'height': 0,
+                                  'baseline': -np.inf},
+                          'bhi': {'peak': np.inf, 'fwhm': np.inf,
+                                  'height': np.inf, 'baseline': np.inf},
+                         } for k, d in data.items()},
+           **kwargs}
+    filename = str(tmp_path / 'job.yaml')
+    with open(filename, 'w') as fid:
+        yaml.dump(job, fid)
+    return filename
+
+def test_read_job(tmp_path):
+    job = read_job(get_job(tmp_path))
+    assert_equal(job['fit_n_component'], 1, err_msg='read_job default value')
+    assert_equal(len(job['data']), len(data), err_msg='read_job data')
+
+def test_read_job_missing(tmp_path):
+    filename = str(tmp_path / 'bad.yaml')
+    with open(filename, 'w') as fid:
+        yaml.dump({'data': {}}, fid)
+    assert_raises(RuntimeError, read_job, filename)
+
+def test_run_job(tmp_path):
+    job = read_job(get_job(tmp_path))
+    df, gchi = run_job(job, data=data, n_jobs=2)
+
+    assert_equal(list(df.index), list(data.keys()), err_msg='run_job run order')
+    assert_almost_equal(df['peak'].values, peaks, decimal=5,
+                        err_msg='run_job peak values')
+    assert_almost_equal(df['fwhm'].values, 2, decimal=5,
+                        err_msg='run_job fwhm values')
+    assert all(df['Error- peak'] > 0), 'run_job errors'
+    assert_equal(df['Run Number'].values, [d.run for d in data.values()],
+                 err_msg='run_job run numbers')
+
+def test_run_job_fixed(tmp_path):
+    job = read_job(get_job(tmp_path))
+    for k in job['data']:
+        job['fitpar'][k]['p0']['baseline'] = 0.1
+        job['fitpar'][k]['fixed'] = {'baseline': True}
+    df = run_job(job, data=data)[0]
+    assert_equal(df['baseline'].values, 0.1, err_msg='run_job fixed value')
+    assert all(df['fixed baseline']), 'run_job fixed flag'
+
+def test_write_table(tmp_path):
+    job = read_job(get_job(tmp_path))
+    df, gchi = run_job(job, data=data)
+    filename = str(tmp_path / 'par.csv')
+    write_table(df, filename, job, gchi)
+
+    df2 = pd.read_csv(filename, comment='#', index_col=0)
+    assert_almost_equal(df2['peak'].values, df['peak'].values,
+                        err_msg='write_table values')
+
+def test_no_tkinter():
+    code = 'import sys, bfit.fitting.fit_job; print("tkinter" in sys.modules)'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                         text=True).stdout.strip()
+    assert_equal(out, 'False', err_msg='fit_job imports tkinter')
+
+def test_run_job_budget(tmp_path):
+    job = read_job(get_job(tmp_path, minimizer='bfit.fitting.fitter_migrad_hesse',
+                           fit_max_nfcn=50))
+    fallback = {}
+    df = run_job(job, data=data,
+                 callback=lambda id, diag: fallback.update({id: diag['fallback']}))[0]
+
+    assert_equal(list(fallback.values()), ['trf']*len(data),
+                 err_msg='run_job fit budget fallback')
+    assert_almost_equal(df['peak'].values, peaks, decimal=5,
+                        err_msg='run_job fit budget values')
@@ -0,0 +1,119 @@
+# test columnar fit result store
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.FitResults import FitResults, write_frame
+import numpy as np
+import pandas as pd
+import pytest
+
+def get_df(par, fixed=False):
+    return pd.DataFrame({'res': par,
+                         'dres-': np.multiply(par, 0.1),
+                         'dres+': np.multiply(par, 0.2),
+                         'chi': 1.5,
+                         'fixed': fixed,
+                         'shared': False,
+                        }, index=['amp', 'rate'][:len(par)])
+
+def test_append():
+    res = FitResults()
+    res.append('a', get_df([1, 2]), meta={'Run Number':1})
+    res.append('b', get_df([3, 4], fixed=True), meta={'Run Number':2})
+    df = res.to_frame()
+
+    assert_equal(list(df.index), ['a', 'b'], err_msg='FitResults index')
+    assert_equal(df['amp'].values, [1, 3], err_msg='FitResults values')
+    assert_equal(df['Error+ rate'].values, [0.4, 0.8], err_msg='FitResults errors')
+    assert_equal(df['fixed amp'].values, [False, True], err_msg='FitResults flags')
+    assert_equal(df['Chi-Squared'].values, 1.5, err_msg='FitResults chi')
+    assert_equal(df['Run Number'].values, [1, 2], err_msg='FitResults meta')
+    assert df['fixed amp'].dtype == bool, 'FitResults flag dtype'
+
+def test_replace():
+    res = FitResults()
+    res.append('a', get_df([1, 2]))
+    res.append('b', get_df([3, 4]))
+    res.append('a', get_df([5]))
+    df = res.to_frame()
+
+    assert_equal(len(res), 2, err_msg='FitResults replaced row count')
+    assert_equal(df['amp'].values, [5, 3], err_msg='FitResults replaced values')
+    assert np.isnan(df.loc['a', 'rate']), 'FitResults replaced old parameter'
+
+def test_new_column():
+    res = FitResults()
+    res.append('a', get_df([1]))
+    res.append('b', get_df([3, 4]))
+    df = res.to_frame()
+    assert np.isnan(df.loc['a', 'rate']), 'FitResults new column fill'
+    assert not df.loc['a', 'fixed rate'], 'FitResults new flag fill'
+
+def test_to_frame_ids():
+    res = FitResults()
+    res.append('a', get_df([1, 2]))
+    res.append('b', get_df([3, 4]))
+    df = res.to_frame(['b', 'c', 'a'])
+
+    assert_equal(df['amp'].values, [3, np.nan, 1], err_msg='FitResults selected rows')
+    assert df['shared amp'].dtype == bool, 'FitResults selected flag dtype'
+
+def test_matches():
+    res = FitResults()
+    res.append('a', get_df([1, 2]))
+    assert res.matches('a', get_df([1, 2])), 'FitResults current fit'
+    assert not res.matches('a', get_df([1, 3])), 'FitResults refit'
+    assert not res.matches('b', get_df([1, 2])), 'FitResults missing run'
+
+    # fit function changed, not yet fitted
+    fitpar = pd.DataFrame({'res': np.nan}, index=['amp', 'beta'])
+    assert not res.matches('a', fitpar), 'FitResults new parameters'
+
+    # unfitted extra parameters
+    fitpar = pd.concat((get_df([1, 2]), pd.DataFrame({'res': [np.nan]}, index=['c'])))
+    assert res.matches('a', fitpar), 'FitResults unfitted parameter'
+
+def test_remove():
+    res = FitResults()
+    res.append('a', get_df([1, 2]))
+    res.append('b', get_df([3, 4]))
+    res.append('c', get_df([5, 6]))
+    res.remove('b')
+    res.remove('d')
+
+    assert_equal(len(res), 2, err_msg='FitResults remove count')
+    assert_equal(res.to_frame()['amp'].values, [1, 5], err_msg='FitResults remove values')
+
+    res.append('b', get_df([7]))
+    assert_equal(res.to_frame(['a', 'b', 'c'])['amp'].values, [1, 7, 5],
+                 err_msg='FitResults append after remove')
+
+def test_write_csv(tmp_path):
+    res = FitResults()
+    res.append('a', get_df([1, 2]))
+    filename = str(tmp_path / 'par.csv')
+    res.export(filename, header=['# test header\n'])
+
+    with open(filename, 'r') as fid:
+        assert fid.readline().startswith('# test header'), 'FitResults csv header'
+
+    df = pd.read_csv(filename, comment='#', index_col=0)
+    assert_equal(df.loc['a', 'rate'], 2, err_msg='FitResults csv values')
+
+@pytest.mark.parametrize('ext', ['.parquet', '.h5'])
+def test_write_binary(tmp_path, ext):
+    res = FitResults()
+    res.append('a', get_df([1, 2]))
+    filename = str(tmp_path / ('par'+ext))
+
+    try:
+        res.export(filename)
+    except RuntimeError:
+        pytest.skip('no %s writer installed' % ext)
+
+    if ext == '.h5':
+        df = pd.read_hdf(filename, 'fit_results')
+    else:
+        df = pd.read_parquet(filename)
+    assert_equal(df.loc['a', 'rate'], 2, err_msg='FitResults %s values' % ext)
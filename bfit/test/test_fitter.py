@@ -0,0 +1,65 @@
+# test fitter function factory
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.fitting.fitter import fitter
+import numpy as np
+
+def test_get_fn_cached():
+    f = fitter(keyfn=str)
+    fn1 = f.get_fn('Exp', 2, 4, 1.2096)
+    fn2 = f.get_fn('Exp', 2, 4, 1.2096)
+    fn3 = f.get_fn('Exp', 2, 2, 1.2096)
+    assert fn1 is fn2, 'get_fn not reused for same inputs'
+    assert fn1 is not fn3, 'get_fn reused for different pulse length'
+
+def test_get_fn_species():
+    f = fitter(keyfn=str, probe_species='Li8')
+    fn1 = f.get_fn('QuadLorentz', 1)
+    f.probe_species = 'Mg31'
+    fn2 = f.get_fn('QuadLorentz', 1)
+    assert fn1 is not fn2, 'get_fn reused after probe species change'
+
+def test_get_fn_constraints():
+    f = fitter(keyfn=str)
+    constr1 = {'fwhm': (eval('lambda a : a*2'), ['a'])}
+    constr2 = {'fwhm': (eval('lambda a : a*2'), ['a'])}
+    constr3 = {'fwhm': (eval('lambda a : a*3'), ['a'])}
+
+    fn1 = f.get_fn('Lorentzian', 1, constr=constr1)
+    fn2 = f.get_fn('Lorentzian', 1, constr=constr2)
+    fn3 = f.get_fn('Lorentzian', 1, constr=constr3)
+
+    assert fn1 is fn2, 'get_fn not reused for identical constraints'
+    assert fn1 is not fn3, 'get_fn reused for different constraints'
+
+    x = np.linspace(-1, 1, 5)
+    # constrained parameter order: peak, height, baseline, a
+    assert_allclose(fn3(x, 0, 1, 0, 1), f.get_fn('Lorentzian', 1)(x, 0, 3, 1, 0),
+                    err_msg='get_fn constrained function value')
+
+def test_get_fn_constraints_constant_type():
+    f = fitter(keyfn=str)
+    constr1 = {'fwhm': (eval('lambda a : a*1'), ['a'])}
+    constr2 = {'fwhm': (eval('lambda a : a*1.0'), ['a'])}
+
+    fn1 = f.get_fn('Lorentzian', 1, constr=constr1)
+    fn2 = f.get_fn('Lorentzian', 1, constr=constr2)
+    assert fn1 is not fn2, 'get_fn reused for constants of different type'
+
+def test_get_fn_cache_size():
+    f = fitter(keyfn=str)
+    f.fn_cache_size = 3
+
+    fn1 = f.get_fn('Exp', 1, 4, 1)
+    for i in range(2, 5):
+        f.get_fn('Exp', 1, 4, i)
+
+    assert_equal(len(f._fn_cache), 3, err_msg='get_fn cache size')
+    assert f.get_fn('Exp', 1, 4, 1) is not fn1, 'get_fn oldest function kept'
+
+    # recently used functions are kept
+    fn4 = f.get_fn('Exp', 1, 4, 4)
+    f.get_fn('Exp', 1, 4, 5)
+    assert f.get_fn('Exp', 1, 4, 4) is fn4, 'get_fn recent function dropped'
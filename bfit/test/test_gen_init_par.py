@@ -0,0 +1,166 @@
+# test initial parameter generation
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.fitting.gen_init_par import gen_init_par, gen_init_par_batch, \
+                                      _init_quadlorentz
+from bfit.fitting.fitter_migrad_hesse import fitter
+from bfit.fitting.functions import pulsed_exp, qp_1st_order
+from bfit.fitting.minuit import minuit
+import bdata as bd
+import numpy as np
+
+life = bd.life['Li8']
+
+# stand-ins for bdata objects
+class fake_slr(object):
+
+    def __init__(self, rate, amp, seed=0):
+        self.mode = '20'
+        self.pulse_s = 4.
+        rng = np.random.default_rng(seed)
+        self.x = np.arange(0.005, 14, 0.01)
+        fn = pulsed_exp(life, self.pulse_s)
+        self.y = np.sum([fn(self.x, r, a) for r, a in
+                         zip(np.atleast_1d(rate), np.atleast_1d(amp))], axis=0)
+        self.dy = np.full(len(self.x), 0.005)
+        self.y += rng.normal(0, 0.005, len(self.x))
+
+    def asym(self, *args, **kwargs):
+        return (self.x, self.y, self.dy)
+
+class fake_1f(object):
+
+    def __init__(self, fn_name, par, seed=0):
+        self.mode = '1f'
+        rng = np.random.default_rng(seed)
+        self.x = np.linspace(-10, 10, 201)
+        ncomp = (len(par)-1)//3
+        self.y = fitter(keyfn=id).get_fn(fn_name, ncomp)(self.x, *par)
+        self.dy = np.full(len(self.x), 0.001)
+        self.y += rng.normal(0, 0.001, len(self.x))
+
+    def asym(self, *args, **kwargs):
+        return (self.x, self.y, self.dy)
+
+def get_nfcn(fn_name, ncomp, data, method):
+    """
+        Number of function calls for migrad to converge from initial
+        parameters, and the chisquared at the minimum
+    """
+    f = fitter(keyfn=id)
+    par = gen_init_par(fn_name, ncomp, data, 'c', method=method)
+    names = list(f.gen_param_names(fn_name, ncomp))
+    fn = f.get_fn(fn_name, ncomp, pulse_len=getattr(data, 'pulse_s', -1),
+                  lifetime=life)
+    m = minuit(fn, data.x, data.y, data.dy, name=names,
+               start=par.loc[names, 'p0'].values.astype(float),
+               limit=par.loc[names, ['blo', 'bhi']].values.astype(float),
+               print_level=0)
+    m.migrad()
+    return (m.nfcn, m.fval/(len(data.x)-len(names)))
+
+def test_exp_regression():
+    par = gen_init_par('Exp', 1, fake_slr(0.5, 0.1), 'c')
+    assert_allclose(par.loc['1_T1', 'p0'], 0.5, rtol=0.05, err_msg='regression T1')
+    assert_allclose(par.loc['amp', 'p0'], 0.1, rtol=0.05, err_msg='regression amp')
+
+def test_exp_negative():
+    par = gen_init_par('Exp', 1, fake_slr(0.5, -0.1), 'n')
+    assert_allclose(par.loc['amp', 'p0'], -0.1, rtol=0.05,
+                    err_msg='regression negative amp')
+
+def test_batch():
+    data = [fake_slr(r, 0.1, seed=i) for i, r in enumerate((0.1, 1, 5))]
+    batch = gen_init_par_batch('Exp', 1, data, 'c')
+    for d, b in zip(data, batch):
+        assert_allclose(b['p0'].values.astype(float),
+                        gen_init_par('Exp', 1, d, 'c')['p0'].values.astype(float),
+                        err_msg='batch matches single run')
+    assert_allclose([b.loc['1_T1', 'p0'] for b in batch], (0.1, 1, 5), rtol=0.1,
+                    err_msg='batch rates')
+
+def test_two_rates():
+    data = fake_slr((0.5, 10), (0.05, 0.05))
+    par = gen_init_par('Bi Exp', 1, data, 'c')
+    assert_allclose(par.loc['1_T1', 'p0'], 0.5, rtol=0.1, err_msg='bi exp slow rate')
+    assert_allclose(par.loc['1_T1b', 'p0'], 10, rtol=0.5, err_msg='bi exp fast rate')
+    assert_allclose(par.loc['fraction_b', 'p0'], 0.5, atol=0.1,
+                    err_msg='bi exp fraction')
+
+    par = gen_init_par('Exp', 2, data, 'c')
+    assert_allclose(par.loc[['amp_0', 'amp_1'], 'p0'].values.astype(float),
+                    0.05, atol=0.01, err_msg='exp 2 components amplitudes')
+
+def test_heuristic():
+    par = gen_init_par('Exp', 2, fake_slr(0.5, 0.1), 'c', method='heuristic')
+    assert_equal(par.loc['1_T1_0', 'p0'], par.loc['1_T1_1', 'p0'],
+                 err_msg='heuristic components')
+    assert_raises(RuntimeError, gen_init_par, 'Exp', 1, fake_slr(0.5, 0.1), 'c',
+                  method='bad')
+
+def test_lorentzian_peaks():
+    data = fake_1f('Lorentzian', (-3, 1, 0.02, 4, 2, 0.01, 0.1))
+    par = gen_init_par('Lorentzian', 2, data, 'c')
+    assert_allclose(par.loc['peak_0', 'p0'], -3, atol=0.2, err_msg='first peak')
+    assert_allclose(par.loc['peak_1', 'p0'], 4, atol=0.2, err_msg='second peak')
+    assert_allclose(par.loc['baseline', 'p0'], 0.1, atol=0.005, err_msg='baseline')
+
+def test_nfcn():
+    data = fake_1f('Lorentzian', (-3, 1, 0.02, 4, 2, 0.01, 0.1))
+    assert get_nfcn('Lorentzian', 2, data, 'regression')[0] < \
+           get_nfcn('Lorentzian', 2, data, 'heuristic')[0], 'nfcn not reduced'
+
+def test_quadlorentz_spin():
+    x = np.linspace(-10, 10, 201)
+    nu_0, nu_q = 1, 2
+
+    for spin in (0.5, 1, 1.5, 2, 2.5, 3):
+        ms = np.arange(-(spin-1), spin+1)[:4]
+        lines = [nu_0+nu_q*qp_1st_order(1, 0, 0, 0, m) for m in ms]
+
+        # four peaks found, for any number of lines
+        peaks = [(p, 1-0.1*i, 0.5) for i, p in enumerate(np.linspace(-6, 6, 4))]
+        par = _init_quadlorentz(x, 1, peaks, spin, 'regression')
+        assert 0 < par['nu_q'][0] < 20, 'quadlorentz nu_q spin %g' % spin
+
+        # one peak per line: regression finds the splitting
+        peaks = [(p, 1, 0.5) for p in lines]
+        par = _init_quadlorentz(x, 1, peaks, spin, 'regression')
+        if len(lines) >= 2:
+            assert_almost_equal(par['nu_q'][0], nu_q,
+                                err_msg='quadlorentz regression nu_q spin %g' % spin)
+            assert_almost_equal(par['nu_0'][0], nu_0,
+                                err_msg='quadlorentz regression nu_0 spin %g' % spin)
+
+        # fewer peaks than lines: heuristic
+        par = _init_quadlorentz(x, 1, peaks[:1], spin, 'regression')
+        assert_almost_equal(par['nu_q'][0], 20/12,
+                            err_msg='quadlorentz heuristic nu_q spin %g' % spin)
+
+def benchmark():
+    """
+        Print the number of function calls and chisquared of migrad fits from
+        each set of initial parameters. Run as a script.
+    """
+
+    cases = [('Exp', 1, fake_slr(0.5, 0.1)),
+             ('Exp', 2, fake_slr((0.5, 10), (0.05, 0.05))),
+             ('Bi Exp', 1, fake_slr((0.5, 10), (0.05, 0.05))),
+             ('Str Exp', 1, fake_slr(0.5, 0.1)),
+             ('Lorentzian', 1, fake_1f('Lorentzian', (1, 2, 0.02, 0.1))),
+             ('Lorentzian', 2, fake_1f('Lorentzian', (-3, 1, 0.02, 4, 2, 0.01, 0.1))),
+             ('Gaussian', 2, fake_1f('Gaussian', (-3, 1, 0.02, 4, 2, 0.01, 0.1))),
+            ]
+
+    print('%-12s %5s %10s %10s %10s %10s %10s' % ('function', 'ncomp',
+            'heuristic', 'regression', 'reduction', 'chi (h)', 'chi (r)'))
+    for fn_name, ncomp, data in cases:
+        old, chi_old = get_nfcn(fn_name, ncomp, data, 'heuristic')
+        new, chi_new = get_nfcn(fn_name, ncomp, data, 'regression')
+        print('%-12s %5d %10d %10d %9.0f%% %10.2f %10.2f' % (fn_name, ncomp,
+                old, new, 100*(1-new/old), chi_old, chi_new))
+
+if __name__ == '__main__':
+    benchmark()
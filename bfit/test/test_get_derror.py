@@ -0,0 +1,77 @@
+# test error propagation
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.get_derror import get_derror, get_derror_batch, get_jacobian, \
+                                    get_function
+from bfit.backend.ParameterFunction import ParameterFunction
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import subprocess
+import sys
+
+fn = lambda a, b: a*b**2
+
+def test_get_derror():
+    err = get_derror(fn, [2, 3], [0.1, 0.2])
+    assert_almost_equal(err, np.sqrt((9*0.1)**2+(12*0.2)**2),
+                        err_msg='get_derror single')
+
+def test_get_derror_batch():
+    par = np.array([[2, 3], [1, 1], [4, 0.5]])
+    err = np.array([[0.1, 0.2], [0.3, 0.1], [0.2, 0.2]])
+    out = get_derror_batch(fn, par, err)
+    assert_allclose(out, [get_derror(fn, p, e) for p, e in zip(par, err)],
+                    err_msg='get_derror_batch matches single')
+
+def test_cache():
+    get_derror(fn, [2, 3], [0.1, 0.2])
+    hits = get_jacobian.cache_info().hits
+    get_derror_batch(fn, [[2, 3], [1, 1]], [[0.1, 0.2], [0.1, 0.2]])
+    assert_equal(get_jacobian.cache_info().hits, hits+1,
+                 err_msg='get_derror jacobian cache')
+
+def test_get_function():
+    f1 = get_function('lambda a, b : a*jnp.exp(b)')
+    get_derror(f1, [2, 0], [0.1, 0.2])
+    hits = get_jacobian.cache_info().hits
+
+    f2 = get_function('lambda a, b : a*jnp.exp(b)')
+    assert f1 is f2, 'get_function reuse handle'
+    assert_almost_equal(get_derror(f2, [2, 0], [0.1, 0.2]), np.sqrt(0.1**2+0.4**2),
+                        err_msg='get_function error')
+    assert_equal(get_jacobian.cache_info().hits, hits+1,
+                 err_msg='get_function jacobian cache')
+
+def test_lazy_import():
+    code = 'import sys, bfit.backend.get_derror; print("jax" in sys.modules)'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                         text=True).stdout.strip()
+    assert_equal(out, 'False', err_msg='get_derror imports jax')
+
+    code = 'import sys, bfit.gui.bfit; print("jax" in sys.modules)'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                         text=True).stdout.strip().split('\n')[-1]
+    assert_equal(out, 'False', err_msg='gui imports jax')
+
+def test_parameter_function():
+
+    # stand-in for bfit object with fitted runs
+    data = {}
+    for i, (a, b) in enumerate(((2, 3), (1, 1), (4, 0.5))):
+        fitpar = pd.DataFrame({'res': [a, b], 'dres+': [0.1, 0.2],
+                               'dres-': [0.1, 0.2]}, index=['amp', '1_T1'])
+        data[i] = SimpleNamespace(fitpar=fitpar)
+    bfit = SimpleNamespace(data=data,
+                           fit_files=SimpleNamespace(draw_components=[]))
+
+    parfn = ParameterFunction('new', 'amp*1_T1**2', ['amp', '1_T1'], bfit)
+    val, err = parfn.get_values([0, 1, 2])
+
+    assert_allclose(val, [18, 1, 1], err_msg='ParameterFunction values')
+    assert_allclose(err, [get_derror(fn, data[i].fitpar['res'], [0.1, 0.2])
+                          for i in range(3)],
+                    err_msg='ParameterFunction errors')
+    assert_allclose(parfn(1), (1, err[1]), err_msg='ParameterFunction single run')
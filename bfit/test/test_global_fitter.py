@@ -5,6 +5,7 @@
 from bfit.fitting.global_fitter import global_fitter
 from numpy.testing import *
 import numpy as np
+import pytest
 
 # make data sets to fit
 fn = [lambda x, a, b: a*x + b, lambda x, a, b: a*x + b]
@@ -139,3 +140,83 @@ def test_chi2():
     assert(gchi > 0), 'Failed: global fitter chisquared calculation error'
     assert(all(chi > 0)), 'Failed: global fitter chisquared calculation error'
     
+def test_fitting_sparse():
+    
+    gf = global_fitter(fn, x, y, dy, shared=shared)
+    gf.fit(minimizer='sparse')
+    par, std_l, std_h, cov = gf.get_par()
+    
+    assert_almost_equal(abs(par[0, 0] - par[1, 0]), 0, err_msg = "global fitter sparse shared parameter equal")
+    assert_almost_equal(abs(par[0, 0] - 5), 0, err_msg = "global fitter sparse parameter 0 result")
+    assert_almost_equal(abs(par[0, 1] - 1), 0, err_msg = "global fitter sparse parameter 1 result")
+    assert_almost_equal(abs(par[1, 1] - 8), 0, err_msg = "global fitter sparse parameter 2 result")
+    
+def test_fitting_sparse_matches_dense():
+    
+    # many noisy data sets 
+    rng = np.random.default_rng(1)
+    nsets = 20
+    xs = [np.arange(10.)]*nsets
+    ys = [xi*5+i+rng.normal(0, 0.1, 10) for i, xi in enumerate(xs)]
+    dys = [np.full(10, 0.1)]*nsets
+    
+    gf = global_fitter(fn[0], xs, ys, dys, shared=shared)
+    
+    # jacobian structure: one shared column and one column per data set 
+    sparsity = gf._get_jac_sparsity()
+    assert_equal(sparsity.shape, (10*nsets, nsets+1), "global fitter sparsity shape")
+    assert_equal(sparsity.nnz, 2*10*nsets, "global fitter sparsity non-zero elements")
+    
+    par_s, std_s, _, _ = gf.fit(minimizer='sparse')
+    par_d, std_d, _, _ = gf.fit(minimizer='trf')
+    
+    assert_almost_equal(par_s, par_d, decimal=5, err_msg = "global fitter sparse parameters match trf")
+    assert_almost_equal(std_s, std_d, decimal=5, err_msg = "global fitter sparse errors match trf")
+    
+def test_fitting_alternating():
+    
+    gf = global_fitter(fn, x, y, dy, shared=shared)
+    gf.fit(minimizer='alternating')
+    par, std_l, std_h, cov = gf.get_par()
+    
+    assert_almost_equal(abs(par[0, 0] - par[1, 0]), 0, err_msg = "global fitter alternating shared parameter equal")
+    assert_almost_equal(abs(par[0, 0] - 5), 0, decimal=3, err_msg = "global fitter alternating parameter 0 result")
+    assert_almost_equal(abs(par[0, 1] - 1), 0, decimal=3, err_msg = "global fitter alternating parameter 1 result")
+    assert_almost_equal(abs(par[1, 1] - 8), 0, decimal=3, err_msg = "global fitter alternating parameter 2 result")
+    
+def test_fitting_alternating_fitargs():
+    
+    gf = global_fitter(fn, x, y, [np.full(10, 0.1)]*2, shared=shared)
+    
+    # least_squares options are used in the block fits
+    par_a, _, _, _ = gf.fit(minimizer='alternating', ftol=1e-12, xtol=1e-12, 
+                            tol=1e-12)
+    par_m, _, _, _ = gf.fit(minimizer='migrad', print_level=0)
+    assert_almost_equal(par_a, par_m, decimal=4, err_msg = "global fitter alternating with fitargs")
+    
+    gf.fit(minimizer='alternating', max_nfev=1, max_iter=1)
+    assert_equal(gf._alternating_fitargs, {'max_nfev':1}, "global fitter alternating fitargs forwarded")
+    
+    with pytest.raises(RuntimeError):
+        gf.fit(minimizer='alternating', method='lm')
+    
+def test_fitting_alternating_matches_migrad():
+    
+    # many noisy data sets 
+    rng = np.random.default_rng(2)
+    nsets = 10
+    xs = [np.arange(10.)]*nsets
+    ys = [xi*5+i+rng.normal(0, 0.1, 10) for i, xi in enumerate(xs)]
+    dys = [np.full(10, 0.1)]*nsets
+    
+    gf = global_fitter(fn[0], xs, ys, dys, shared=shared)
+    par_m, std_m, _, _ = gf.fit(minimizer='migrad', print_level=0)
+    par_a, std_a, _, _ = gf.fit(minimizer='alternating', n_jobs=2, tol=1e-12)
+    
+    assert_almost_equal(par_a, par_m, decimal=4, err_msg = "global fitter alternating parameters match migrad")
+    assert_almost_equal(std_a, std_m, decimal=4, err_msg = "global fitter alternating errors match migrad")
+    
+    par_s, std_s, _, _ = gf.fit(minimizer='alternating', errors='sparse')
+    assert_almost_equal(par_s, par_m, decimal=4, err_msg = "global fitter alternating sparse errors parameters match migrad")
+    assert_almost_equal(std_s, std_m, decimal=4, err_msg = "global fitter alternating sparse errors match migrad")
+    
@@ -0,0 +1,72 @@
+# test unloading run histograms to save memory
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.AsymCache import AsymCache
+from bfit.backend.fitdata import fitdata
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+def get_hist():
+    return {h: SimpleNamespace(data=np.ones(1000)) for h in ('F+', 'F-', 'B+', 'B-')}
+
+def get_data(id='2021.40001'):
+    """Stand-in fitted run, counting file reads"""
+    data = fitdata.__new__(fitdata)
+    data.id = id
+    data.bd = SimpleNamespace(hist=get_hist(), title='test')
+    data.logger = SimpleNamespace(info=lambda *a: None)
+    data.nopen = 0
+
+    def _open():
+        data.nopen += 1
+        return SimpleNamespace(hist=get_hist())
+    data._open = _open
+
+    return data
+
+def test_unload():
+    data = get_data()
+    data.asym_cache = AsymCache()
+    data.fit_cache = AsymCache()
+    data.asym_cache.get((data.id, 'c'), lambda: np.ones(100))
+
+    nbytes = data.get_nbytes()
+    assert_equal(nbytes['hist'], 4*8000, err_msg='histogram size')
+    assert_equal(nbytes['cache'], 800, err_msg='cached asymmetry size')
+
+    data.unload()
+    assert not data.is_loaded, 'unload histograms'
+    assert_equal(data.get_nbytes(), {'hist': 0, 'cache': 800},
+                 err_msg='size after unload')
+    assert_equal(data.title, 'test', err_msg='header after unload')
+    assert_equal(data.nopen, 0, err_msg='header access read file')
+
+def test_reload():
+    data = get_data()
+    data.unload()
+
+    hist = data.hist
+    assert data.is_loaded, 'reload histograms on access'
+    assert_equal(len(hist), 4, err_msg='reloaded histograms')
+    assert_equal(data.nopen, 1, err_msg='reload read file')
+
+    data.load()
+    assert_equal(data.nopen, 1, err_msg='load of loaded run read file')
+
+def test_counts_after_unload():
+    data = get_data()
+    data.parnames = []
+    data.bd.area = 'BNMR'
+    data.bd.duration = 10
+    data.unload()
+
+    val, err = data.get_values('Sample Counts')
+    assert_equal(data.nopen, 1, err_msg='counts reload read file')
+    assert_equal(val, 4000, err_msg='counts after unload')
+
+    val, err = data.get_values('Sample Rate (count/s)')
+    assert_equal(data.nopen, 1, err_msg='rate of loaded run read file')
+    assert_equal(val, 400, err_msg='rate after unload')
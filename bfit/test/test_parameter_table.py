@@ -0,0 +1,67 @@
+# test table of plottable values
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.ParameterTable import ParameterTable
+import numpy as np
+
+class fake_data(object):
+    """Stand-in for fitdata, counting calls to get_values"""
+
+    def __init__(self, id, value):
+        self.id = id
+        self.value = value
+        self.ncalls = 0
+
+    def get_values(self, select):
+        self.ncalls += 1
+        if select == 'asym':
+            return (self.value, (0.1, 0.2))
+        return (self.value, 0.1*self.value)
+
+def get_data():
+    return {'%d.40001' % i: fake_data('%d.40001' % i, i+1) for i in range(3)}
+
+def test_get():
+    data = get_data()
+    table = ParameterTable()
+    ids = sorted(data.keys())
+
+    val, err = table.get('T', data, ids)
+    assert_equal(val, [1, 2, 3], err_msg='ParameterTable values')
+    assert_allclose(err, [0.1, 0.2, 0.3], err_msg='ParameterTable errors')
+    assert_equal(table.nmisses, 3, err_msg='ParameterTable misses')
+
+    val, err = table.get('T', data, ids[::-1])
+    assert_equal(val, [3, 2, 1], err_msg='ParameterTable reordered values')
+    assert_equal(table.nhits, 3, err_msg='ParameterTable hits')
+    assert_equal([d.ncalls for d in data.values()], [1, 1, 1],
+                 err_msg='ParameterTable recalculated values')
+
+def test_invalidate():
+    data = get_data()
+    table = ParameterTable()
+    ids = sorted(data.keys())
+
+    table.get('T', data, ids)
+    data[ids[1]].value = 10
+    table.invalidate(ids[1])
+    assert ('T', ids[1]) not in table, 'ParameterTable invalidate'
+
+    val, err = table.get('T', data, ids)
+    assert_equal(val, [1, 10, 3], err_msg='ParameterTable invalidated values')
+    assert_equal([d.ncalls for d in data.values()], [1, 2, 1],
+                 err_msg='ParameterTable invalidated calls')
+
+    table.drop('T')
+    assert_equal(len(table), 0, err_msg='ParameterTable drop')
+
+def test_asymmetric_errors():
+    data = get_data()
+    table = ParameterTable()
+
+    val, err = table.get('asym', data, sorted(data.keys()))
+    assert isinstance(err, tuple), 'ParameterTable asymmetric errors'
+    assert_allclose(err[0], 0.1, err_msg='ParameterTable lower errors')
+    assert_allclose(err[1], 0.2, err_msg='ParameterTable upper errors')
@@ -0,0 +1,39 @@
+# test figure tracking
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.PltTracker import PltTracker
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+def test_remove():
+    tracker = PltTracker()
+    tracker.figure('data')
+    x = np.arange(5)
+    tracker.errorbar('data', 'run1', x, x, x*0.1, label='run1')
+    tracker.errorbar('data', 'run2', x, x+1, x*0.1, label='run2')
+
+    ax = tracker.gca('data')
+    tracker.remove('data', 'run1')
+    assert_equal(list(ax.draw_objs.keys()), ['run2'], err_msg='remove drawn id')
+    assert_equal(len(ax.containers), 1, err_msg='remove errorbar artists')
+    plt.close('all')
+
+def test_hold():
+    tracker = PltTracker()
+    tracker.figure('data')
+    x = np.arange(5)
+
+    with tracker.hold('data'):
+        for i in range(3):
+            tracker.errorbar('data', 'run%d' % i, x, x+i, label='run%d' % i)
+            tracker.legend('data')
+            assert tracker.gca('data').get_legend() is None, 'legend not deferred'
+
+    legend = tracker.gca('data').get_legend()
+    assert_equal(len(legend.get_texts()), 3, err_msg='deferred legend')
+    assert_equal(tracker.held, {}, err_msg='hold released')
+    plt.close('all')
@@ -0,0 +1,84 @@
+# test parallel export of many runs
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.RunExporter import RunExporter, write_bundle
+from queue import Queue
+import numpy as np
+import pandas as pd
+import pytest
+
+def get_exporter(tmp_path, nruns=5):
+    exp = RunExporter(n_jobs=3)
+    for i in range(nruns):
+        x = np.arange(10)*(i+1)
+        df = pd.DataFrame({'asym': x**2}, index=pd.Index(x, name='time_s'))
+        exp.add('2020.%d' % i, lambda df=df: df,
+                filename=str(tmp_path / ('%d.csv' % i)),
+                header=['# run %d' % i, '#'])
+    return exp
+
+def test_csv(tmp_path):
+    exp = get_exporter(tmp_path)
+    assert_equal(exp.run(), [], err_msg='RunExporter csv failed runs')
+
+    for i in range(len(exp)):
+        fname = tmp_path / ('%d.csv' % i)
+        with open(fname, 'r') as fid:
+            assert_equal(fid.readline(), '# run %d\n' % i,
+                         err_msg='RunExporter csv header')
+
+        df = pd.read_csv(fname, comment='#')
+        assert_equal(list(df.columns), ['time_s', 'asym'],
+                     err_msg='RunExporter csv columns')
+        assert_array_equal(df['asym'], df['time_s']**2,
+                           err_msg='RunExporter csv values')
+
+def test_npz(tmp_path):
+    exp = get_exporter(tmp_path)
+    fname = str(tmp_path / 'all.npz')
+    exp.run(fname)
+
+    with np.load(fname) as npz:
+        for i in range(len(exp)):
+            x = np.arange(10)*(i+1)
+            assert_array_equal(npz['2020.%d/time_s' % i], x,
+                               err_msg='RunExporter npz index')
+            assert_array_equal(npz['2020.%d/asym' % i], x**2,
+                               err_msg='RunExporter npz values')
+            assert_equal(str(npz['2020.%d/header' % i]), '# run %d\n#' % i,
+                         err_msg='RunExporter npz header')
+
+    # no per-run files
+    assert not (tmp_path / '0.csv').exists(), 'RunExporter npz wrote csv'
+
+def test_progress(tmp_path):
+    exp = get_exporter(tmp_path)
+
+    def fail():
+        raise RuntimeError('bad run')
+    exp.add('bad', fail, filename=str(tmp_path / 'bad.csv'))
+
+    out = Queue()
+    failed = exp.run(out=out)
+    assert_equal(failed, ['bad'], err_msg='RunExporter failed runs')
+
+    messages = [out.get_nowait() for i in range(out.qsize())]
+    assert_equal(len(messages), len(exp)+1, err_msg='RunExporter progress count')
+    assert_equal(messages[-1], ('done', ['bad']), err_msg='RunExporter done message')
+    assert_equal(sorted(m[1] for m in messages[:-1]), sorted(j[0] for j in exp.jobs),
+                 err_msg='RunExporter progress ids')
+
+def test_bad_extension(tmp_path):
+    with pytest.raises(RuntimeError):
+        write_bundle({}, str(tmp_path / 'all.csv'))
+
+def test_write_error(tmp_path):
+    exp = get_exporter(tmp_path)
+    fname = str(tmp_path / 'missing' / 'all.npz')
+
+    out = Queue()
+    exp.run(fname, out=out)
+    messages = [out.get_nowait() for i in range(out.qsize())]
+    assert_equal(messages[-1][0], 'error', err_msg='RunExporter write error message')
@@ -0,0 +1,43 @@
+# test run filter expressions
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.RunFilter import RunFilter
+import numpy as np
+import pytest
+
+table = {'BIAS': np.array([10, 14, 16, 21.]),
+         'TEMP': np.array([280, 285, np.nan, 300]),
+         'RUN':  np.array([40123, 40124, 40125, 40126])}
+
+def test_compare():
+    assert_equal(RunFilter('13 < BIAS < 20')(table), [False, True, True, False],
+                 err_msg='chained comparison')
+    assert_equal(RunFilter('TEMP>281')(table), [False, True, False, True],
+                 err_msg='comparison with nan')
+    assert_equal(RunFilter('RUN == 40124')(table), [False, True, False, False],
+                 err_msg='equality')
+
+def test_logic():
+    f = RunFilter('BIAS > 15 and TEMP > 290 or RUN % 2 == 1 and not BIAS > 20')
+    assert_equal(f(table), [True, False, True, True], err_msg='boolean logic')
+    assert_equal(f.variables, ['BIAS', 'TEMP', 'RUN'], err_msg='filter variables')
+
+def test_arithmetic():
+    f = RunFilter('-(BIAS*2 - 1) < -25 or TEMP != TEMP')
+    assert_equal(f(table), [False, True, True, True], err_msg='arithmetic')
+
+def test_constant():
+    assert_equal(RunFilter('BIAS < inf')(table), [True]*4, err_msg='constant inf')
+
+def test_unsafe():
+    for expr in ('__import__("os").system("ls")',
+                 'BIAS.__class__',
+                 'TEMP > 1 if BIAS else 0',
+                 '[BIAS]',
+                 'BIAS > "a"',
+                 'FOO > 1',
+                 'BIAS >'):
+        with pytest.raises(RuntimeError):
+            RunFilter(expr)
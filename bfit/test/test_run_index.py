@@ -0,0 +1,138 @@
+# test run header index and search database
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend import RunIndex as run_index
+from bfit.backend.RunIndex import RunIndex
+from bfit.backend.search import database, condition
+import numpy as np
+import os
+import pytest
+
+runs = (40001, 40002, 40003)
+years = (2020, 2021)
+
+# count of files read
+nread = []
+
+# runs only on the remote server: {(run, year): (title, temperature)}
+remote = {}
+
+def fake_header(filename):
+    """Stand-in for read_header, from the file contents"""
+    nread.append(filename)
+    with open(filename, 'r') as fid:
+        title, temperature = fid.read().split(',')
+    return {'title': title, 'temperature': float(temperature), 'mode': '20'}
+
+def write_run(archive, run, year, title, temperature):
+    directory = os.path.join(archive, str(year))
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, '%06d.msr' % run)
+    with open(filename, 'w') as fid:
+        fid.write('%s,%f' % (title, temperature))
+    return filename
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    archive = str(tmp_path / 'bnmr')
+    for i, r in enumerate(runs):
+        write_run(archive, r, 2021, 'run %d sample' % i, 10*(i+1))
+    monkeypatch.setenv('BNMR_ARCHIVE', archive)
+    monkeypatch.setattr(run_index, 'read_header', fake_header)
+
+    def fake_download(run, year):
+        """Stand-in for download, of runs in remote"""
+        if (run, year) not in remote:
+            raise RuntimeError('Attempted download from musr.ca failed.')
+        return write_run(archive, run, year, *remote[(run, year)])
+    monkeypatch.setattr(run_index, 'download', fake_download)
+
+    nread.clear()
+    remote.clear()
+    return archive
+
+def test_update(archive, tmp_path):
+    index = RunIndex(str(tmp_path / 'index.sqlite'))
+    assert_equal(index.update(runs, years), len(runs), err_msg='RunIndex new runs')
+    assert_equal(len(index), len(runs), err_msg='RunIndex size')
+
+    df = index.to_frame()
+    assert_equal(df['run'].values, runs, err_msg='RunIndex runs')
+    assert_equal(df['temperature'].values, [10, 20, 30], err_msg='RunIndex values')
+
+    # no changes
+    assert_equal(index.update(runs, years), 0, err_msg='RunIndex unchanged runs')
+
+def test_download(archive, tmp_path, caplog):
+    remote[(40004, 2020)] = ('remote run', 40)
+    index = RunIndex(str(tmp_path / 'index.sqlite'))
+    assert_equal(index.update(runs + (40004,), years), len(runs)+1,
+                 err_msg='RunIndex download')
+
+    df = index.to_frame(runs=[40004])
+    assert_equal(df['title'].values, ['remote run'], err_msg='RunIndex downloaded run')
+    assert '40001 (2020)' in caplog.text, 'RunIndex missing run not logged'
+
+    # downloaded file is now local
+    assert_equal(index.update(runs + (40004,), years), 0,
+                 err_msg='RunIndex downloaded run unchanged')
+
+def test_update_mtime(archive, tmp_path):
+    index = RunIndex(str(tmp_path / 'index.sqlite'))
+    index.update(runs, years)
+
+    filename = write_run(archive, runs[1], 2021, 'new title', 50)
+    os.utime(filename, (0, 1e9))
+    assert_equal(index.update(runs, years), 1, err_msg='RunIndex changed runs')
+
+    df = index.to_frame(runs=[runs[1]])
+    assert_equal(df['title'].values, ['new title'], err_msg='RunIndex refresh')
+
+def test_update_parallel(archive, tmp_path):
+    index = RunIndex(str(tmp_path / 'index.sqlite'))
+    assert_equal(index.update(runs, years, n_jobs=2), len(runs),
+                 err_msg='RunIndex parallel update')
+    assert_equal(index.to_frame()['temperature'].values, [10, 20, 30],
+                 err_msg='RunIndex parallel values')
+
+def test_persistent(archive, tmp_path):
+    filename = str(tmp_path / 'index.sqlite')
+    RunIndex(filename).update(runs, years)
+    nread.clear()
+
+    db = database(runs, years, index=filename)
+    assert_equal(len(nread), 0, err_msg='database read indexed files')
+    assert_equal(db.get_runs()[:, 0], runs, err_msg='database runs')
+
+def test_search(archive, tmp_path):
+    db = database(runs, years, index=str(tmp_path / 'index.sqlite'))
+
+    found = db.search('temperature', (15, 35))
+    assert_equal(found.get_runs()[:, 0], runs[1:], err_msg='database range search')
+
+    found = found.search('title', 'run 2')
+    assert_equal(found.get_runs()[:, 0], runs[2:], err_msg='database string search')
+
+def test_query(archive, tmp_path):
+    db = database(runs, years, index=str(tmp_path / 'index.sqlite'))
+
+    where = (condition('temperature', between=(10, 20)) |
+             condition('title', match=r'run [2-9]')) & \
+            ~condition('temperature', eq=20)
+    df = db.query(where, order_by='temperature', ascending=False)
+    assert_equal(df['run'].values, [runs[2], runs[0]], err_msg='query compound')
+    assert_equal(list(df.columns), ['year', 'run', 'temperature'],
+                 err_msg='query columns')
+
+    df = db.query(condition('title', contains='SAMPLE', case=False), limit=2)
+    assert_equal(df['run'].values, runs[:2], err_msg='query substring and limit')
+    assert_equal(len(nread), len(runs), err_msg='query read run files')
+
+def test_select(archive, tmp_path):
+    db = database(runs, years, index=str(tmp_path / 'index.sqlite'))
+    found = db.select(condition('temperature', ge=20), order_by='run',
+                      ascending=False)
+    assert_equal(found.get_runs()[:, 0], runs[:0:-1], err_msg='select order')
+    assert_raises(RuntimeError, condition, 'temperature', bad=1)
@@ -0,0 +1,77 @@
+# test background refresh of fetched runs
+# Derek Fujimoto
+# Oct 2026
+
+from numpy.testing import *
+from bfit.backend.RunRefresher import RunRefresher
+from types import SimpleNamespace
+
+class fake_root(object):
+    """Stand-in for tkinter root, running callbacks on request"""
+
+    def __init__(self):
+        self.pending = {}
+        self.n = 0
+
+    def after(self, ms, fn):
+        self.n += 1
+        self.pending[self.n] = fn
+        return self.n
+
+    def after_cancel(self, id):
+        self.pending.pop(id, None)
+
+    def run_next(self, refresher):
+        if refresher.thread is not None:
+            refresher.thread.join()
+        id = min(self.pending.keys())
+        self.pending.pop(id)()
+
+class fake_data(object):
+    """Stand-in for fitdata with a file which may change"""
+
+    def __init__(self, id):
+        self.id = id
+        self.stats = [(100, 1.)]
+        self.file_stats = list(self.stats)
+        self.bd = 'old'
+        self.nopen = 0
+
+    def get_file_stats(self):
+        return list(self.stats)
+
+    def _open(self):
+        self.nopen += 1
+        return 'new'
+
+    def set_bd(self, bd, file_stats=None):
+        self.bd = bd
+        self.file_stats = file_stats
+
+def test_refresh():
+    data = {k: fake_data(k) for k in ('2021.40001', '2021.40002')}
+    root = fake_root()
+    bfit = SimpleNamespace(data=data, root=root, update_period=1)
+
+    updated = []
+    refresher = RunRefresher(bfit, callback=updated.append)
+    refresher.start()
+
+    # no changes
+    root.run_next(refresher)    # check
+    root.run_next(refresher)    # apply
+    assert_equal(updated, [], err_msg='refresh of unchanged runs')
+    assert_equal([d.nopen for d in data.values()], [0, 0],
+                 err_msg='unchanged runs read')
+
+    # one changed run
+    data['2021.40002'].stats = [(200, 2.)]
+    root.run_next(refresher)
+    root.run_next(refresher)
+    assert_equal(updated, [['2021.40002']], err_msg='refreshed runs')
+    assert_equal(data['2021.40002'].bd, 'new', err_msg='refreshed bdata')
+    assert_equal(data['2021.40001'].bd, 'old', err_msg='unchanged bdata')
+    assert_equal(len(root.pending), 1, err_msg='next check scheduled')
+
+    refresher.stop()
+    assert_equal(len(root.pending), 0, err_msg='stop refresh')
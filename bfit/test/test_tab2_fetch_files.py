@@ -79,6 +79,43 @@ def test_remove(tab=None, b=None):
     tab.remove_all()
     assert_equal(len(list(tab.data_lines.keys())), 0, 'fetch tab remove all')
     
+@with_bfit    
+def test_virtual_list(tab=None, b=None):
+    
+    # get some data
+    tab.year.set(2020)
+    tab.run.set('40123-40130')
+    tab.get_data()
+    
+    lines = tab.line_list
+    assert_equal(len(lines), 8, 'fetch tab list items')
+    assert len(lines.rows) <= lines.nvisible, 'fetch tab list rows made for visible lines only'
+    
+    # rows are bound to the visible lines in order
+    keys = sorted(tab.data_lines.keys())
+    for i, row in enumerate(lines.rows):
+        if row.line is not None:
+            assert_equal(row.line.id, keys[lines.first+i], 'fetch tab list row order')
+            assert_equal(row.line.view is row, True, 'fetch tab list row bound')
+    
+    # scroll to end
+    lines.yview('moveto', 1)
+    assert_equal(lines.rows[0].line.id, keys[max(0, 8-lines.nvisible)], 'fetch tab list scroll')
+    
+    # check all acts on lines which are not shown
+    tab.check_state.set(False)
+    tab.check_all()
+    assert_equal([d.check_state.get() for d in tab.data_lines.values()], [False]*8, 
+                 'fetch tab check all with virtual list')
+    
+    # remove
+    tab.remove_all()
+    assert_equal(len(lines), 8, 'fetch tab list remove unchecked')
+    tab.check_state.set(True)
+    tab.check_all()
+    tab.remove_all()
+    assert_equal(len(lines), 0, 'fetch tab list remove all')
+    
 @with_bfit    
 def test_draw(tab=None, b=None):
     
@@ -214,3 +251,28 @@ def test_flip(tab=None, b=None):
     assert np.mean(asym['c'][:10]) > 0, 'Run incorrect orientation no flip (dict)'
     
     
+
+@with_bfit
+def test_update_unchanged(tab=None, b=None):
+    
+    # get data
+    tab.year.set(2020)
+    tab.run.set('40123 40124')
+    tab.get_data()
+    
+    # no files changed
+    assert_equal(tab.update_data(), [], 'update read unchanged files')
+    
+    # force read
+    data = b.data['2020.40123']
+    assert data.read(force=True), 'forced read of unchanged file'
+
+def test_read_run_error(monkeypatch):
+    import bfit.gui.tab_fetch_files as tab_fetch_files
+    
+    def fail(run, year):
+        raise KeyError('bad header')
+    monkeypatch.setattr(tab_fetch_files, 'bdata', fail)
+    
+    assert_equal(tab_fetch_files.read_run(40123, 2020), (40123, None), 
+                 'fetch tab read run error')
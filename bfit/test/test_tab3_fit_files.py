@@ -295,6 +295,30 @@ def test_fit_ncomp(b=None, tab=None, tab2=None):
     # check ncomp
     assert_equal(tab.fit_input[1], 2, "Number of components passing to fitter")
 
+@with_bfit
+def test_param_list(b=None, tab=None, tab2=None):
+    
+    tab.populate()
+    line = tab.fit_lines['2020.40123']
+    line2 = tab.fit_lines['2020.40127']
+    
+    # one title row per run and one row per parameter
+    items = tab.param_list.items
+    assert_equal(len(items), 2+len(line.lines)+len(line2.lines), 'parameter table items')
+    assert items[0] is line, 'parameter table title row'
+    assert len(tab.param_list.rows) <= tab.param_list.nvisible, \
+        'parameter table rows made for visible lines only'
+    
+    # group edit sets the parameters of all runs
+    tab.set_as_group.set(True)
+    line.lines[0].edit('p0', '3')
+    assert_equal(line2.data.fitpar.loc[line.lines[0].pname, 'p0'], 3, 
+                 'parameter table group edit')
+    tab.set_as_group.set(False)
+    line.lines[0].edit('p0', '4')
+    assert_equal(line2.data.fitpar.loc[line.lines[0].pname, 'p0'], 3, 
+                 'parameter table single edit')
+
 @with_bfit
 def test_shared(b=None, tab=None, tab2=None):
     
@@ -449,20 +473,20 @@ def test_result_as_p0(b=None, tab=None, tab2=None):
 def check_sharing_assignment(tab, fline, test_name):
     
     # check all shared param independent
-    for k1, v1 in tab.share_var.items():
-        for k2, v2 in tab.share_var.items():
-            if k1 != k2: 
-                assert v1 != v2, \
-                    'share_var BooleanVar equal for '+\
-                    '"{}" and "{}" during {}'.format(k1, k2, test_name)
-                
-    # check all lines param assigned correctly
-    for l1 in fline.lines:
-        for l2 in fline.lines:
-            if l1 != l2:
-                assert l1.variable['shared'] != l2.variable['shared'], \
-                    'line variable[shared] BooleanVar equal for '+\
-                    '"{}" and "{}" during {}'.format(k1, k2, test_name)
+    fline.lines[0].variable['shared'].set(True)
+    for l in fline.lines[1:]:
+        assert not l.get('shared'), \
+            'shared "{}" set with "{}" during {}'.format(l.pname, 
+                                                         fline.lines[0].pname, 
+                                                         test_name)
+    
+    # check shared param set in all runs
+    for fline2 in tab.fit_lines.values():
+        assert fline2.lines[0].get('shared'), \
+            'shared "{}" not set in run {} during {}'.format(fline.lines[0].pname, 
+                                                             fline2.data.id, 
+                                                             test_name)
+    fline.lines[0].variable['shared'].set(False)
     
 @with_bfit
 def test_sharing_assignment(b=None, tab=None, tab2=None):